@@ -1,12 +1,18 @@
-import re
+import hashlib
 from django.contrib.auth import authenticate
-from django.http import JsonResponse, HttpRequest
+from django.db import transaction
+from django.http import JsonResponse, HttpRequest, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
-from django.db.models import Count
-from core.models import UsuarioPerfilOptimizador, Cliente, Proyecto, AuditLog, OptimizationRun
+from django.db.models import Count, Exists, OuterRef
+from core.models import UsuarioPerfilOptimizador, Cliente, Proyecto, AuditLog, OptimizationRun, PiezaColocada, VistaOperador
+from core.resultados import (
+    actualizar_estados, asegurar_normalizado, guardar_vista_operador, incrementar_version_vista, progreso_piezas,
+    vista_con_estados,
+)
 from core.auth_utils import jwt_encode, get_auth_context
 
 
@@ -238,95 +244,94 @@ def operador_proyectos_api(request: HttpRequest):
 @login_required
 @require_http_methods(["GET"])
 def operador_proyecto_detalle_api(request: HttpRequest, proyecto_id: int):
-    """GET /api/operador/proyectos/<id>: retorna diseño optimizado normalizado para UI Operador."""
+    """GET /api/operador/proyectos/<id>: retorna diseño optimizado normalizado para UI Operador.
+
+    El payload se precalcula al guardar el resultado (VistaOperador) y aquí sólo se le
+    superponen los estados de pieza. Responde con ETag (versión de la vista + datos del
+    proyecto): con `If-None-Match` vigente devuelve 304 sin leer el payload.
+    """
     ctx = get_auth_context(request)
-    base_qs = Proyecto.objects.select_related('cliente')
+    base_qs = (Proyecto.objects.select_related('cliente', 'vista_operador')
+               .defer('resultado_optimizacion', 'configuracion', 'vista_operador__datos'))
     if not (ctx.get('organization_is_general') or ctx.get('is_support')):
         base_qs = base_qs.filter(organizacion_id=ctx.get('organization_id'))
     p = get_object_or_404(base_qs, id=proyecto_id)
     if ctx.get('role') == 'operador' and p.operador_id != request.user.id:
         return JsonResponse({'success': False, 'message': 'Forbidden'}, status=403)
 
-    # Parsear resultado
-    res = p.resultado_optimizacion
-    if not res:
-        return JsonResponse({'success': False, 'message': 'Proyecto sin resultado'}, status=404)
     try:
-        resd = _json.loads(res) if isinstance(res, str) else res
-    except Exception:
-        resd = res if isinstance(res, dict) else None
-    if not isinstance(resd, (dict,)):
-        return JsonResponse({'success': False, 'message': 'Resultado inválido'}, status=500)
-
-    # Soporte: resultado puede ser un único material (raíz) o materiales[]
-    materiales = resd.get('materiales') if isinstance(resd.get('materiales'), list) else [resd]
-    # Normalizar TODOS los materiales (para selector en UI)
-    normalized_materiales = []
-    for m_idx, mat in enumerate(materiales, start=1):
-        try:
-            kerf = (mat.get('config') or {}).get('kerf', mat.get('desperdicio_sierra'))
-        except Exception:
-            kerf = None
-        try:
-            margen_x = (mat.get('margenes') or {}).get('margen_x', (mat.get('config') or {}).get('margen_x'))
-            margen_y = (mat.get('margenes') or {}).get('margen_y', (mat.get('config') or {}).get('margen_y'))
-        except Exception:
-            margen_x = margen_y = None
-        material_nombre = (mat.get('material') or {}).get('nombre') or None
-        tableros = mat.get('tableros') or []
-        normalized_tableros_m = []
-        for t_idx, t in enumerate(tableros, start=1):
-            piezas = []
-            for i, pi in enumerate(t.get('piezas') or [], start=1):
-                # PID único incluyendo índice de material
-                pieza_id = f"m{m_idx}t{t_idx}p{i}"
-                pieza = {
-                    'pieza_id': pieza_id,
-                    'tablero_num': t_idx,
-                    'nombre': pi.get('nombre') or pi.get('id_unico') or f"P{i}",
-                    'x': pi.get('x'), 'y': pi.get('y'),
-                    'ancho': pi.get('ancho'), 'largo': pi.get('largo'),
-                    'rotada': bool(pi.get('rotada')),
-                    'estado': pi.get('estado') or 'pendiente',
-                    'tapacantos': pi.get('tapacantos') or {},
-                }
-                piezas.append(pieza)
-            normalized_tableros_m.append({
-                'num': t_idx,
-                'ancho_mm': t.get('ancho') or mat.get('tablero_ancho_original') or mat.get('tablero_ancho_efectivo'),
-                'largo_mm': t.get('largo') or mat.get('tablero_largo_original') or mat.get('tablero_largo_efectivo'),
-                'piezas': piezas,
-                'eficiencia': t.get('eficiencia_tablero'),
-                'cortes': t.get('cortes') or [],
-            })
-        normalized_materiales.append({
-            'indice': m_idx,
-            'nombre': material_nombre,
-            'meta': {
-                'material': material_nombre,
-                'kerf': kerf,
-                'margen_x': margen_x,
-                'margen_y': margen_y,
+        version = p.vista_operador.version
+    except VistaOperador.DoesNotExist:
+        # Proyectos guardados antes de la vista precalculada: construirla una vez
+        if not asegurar_normalizado(p):
+            return JsonResponse({'success': False, 'message': 'Proyecto sin resultado'}, status=404)
+        if not VistaOperador.objects.filter(proyecto=p).exists():
+            guardar_vista_operador(p)
+        version = VistaOperador.objects.values_list('version', flat=True).get(proyecto=p)
+
+    cliente = getattr(p.cliente, 'nombre', None)
+    firma = hashlib.sha1(f"{p.estado}|{p.public_id}|{p.codigo}|{p.nombre}|{cliente}".encode('utf-8')).hexdigest()[:12]
+    etag = quote_etag(f"op-{p.id}-{version}-{firma}")
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        datos = VistaOperador.objects.values_list('datos', flat=True).get(proyecto=p)
+        normalized_materiales = vista_con_estados(p, datos)
+        # Mantener compatibilidad: exponer también el PRIMER material al nivel raíz
+        first = normalized_materiales[0] if normalized_materiales else {'meta': {}, 'tableros': []}
+        response = JsonResponse({
+            'success': True,
+            'proyecto': {
+                'id': p.id,
+                'public_id': p.public_id,
+                'codigo': p.codigo,
+                'nombre': p.nombre,
+                'cliente': cliente,
+                'estado': p.estado,
             },
-            'tableros': normalized_tableros_m,
+            'tableros': first.get('tableros', []),  # legacy
+            'meta': first.get('meta', {}),          # legacy
+            'materiales': normalized_materiales,    # nuevo para selector
         })
+    response['ETag'] = etag
+    # El navegador debe revalidar siempre (If-None-Match) en vez de usar su copia
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+ESTADOS_PIEZA = ('pendiente', 'en_corte', 'cortada', 'descartada')
+# Tope de piezas por PATCH masivo
+MAX_PIEZAS_PATCH = 2000
+
+
+def _proyecto_operador(request: HttpRequest, proyecto_id: int):
+    """Proyecto visible para el usuario sin cargar los JSON grandes (se leen bajo demanda).
+    Devuelve (proyecto, None) o (None, respuesta de error)."""
+    ctx = get_auth_context(request)
+    base_qs = Proyecto.objects.defer('resultado_optimizacion', 'configuracion')
+    if not (ctx.get('organization_is_general') or ctx.get('is_support')):
+        base_qs = base_qs.filter(organizacion_id=ctx.get('organization_id'))
+    p = get_object_or_404(base_qs, id=proyecto_id)
+    if ctx.get('role') == 'operador' and p.operador_id != request.user.id:
+        return None, JsonResponse({'success': False, 'message': 'Forbidden'}, status=403)
+    if not asegurar_normalizado(p):
+        return None, JsonResponse({'success': False, 'message': 'Proyecto sin resultado'}, status=404)
+    return p, None
 
-    # Mantener compatibilidad: exponer también el PRIMER material al nivel raíz
-    first = normalized_materiales[0] if normalized_materiales else {'meta': {}, 'tableros': []}
-    return JsonResponse({
-        'success': True,
-        'proyecto': {
-            'id': p.id,
-            'public_id': p.public_id,
-            'codigo': p.codigo,
-            'nombre': p.nombre,
-            'cliente': getattr(p.cliente, 'nombre', None),
-            'estado': p.estado,
-        },
-        'tableros': first.get('tableros', []),  # legacy
-        'meta': first.get('meta', {}),          # legacy
-        'materiales': normalized_materiales,    # nuevo para selector
-    })
+
+def _auditar_piezas(request: HttpRequest, p, changes):
+    try:
+        AuditLog.objects.create(
+            actor=request.user,
+            organizacion_id=p.organizacion_id,
+            verb='EDIT',
+            target_model='Proyecto',
+            target_id=str(p.id),
+            target_repr=p.codigo,
+            changes=changes,
+        )
+    except Exception:
+        pass
 
 
 @csrf_exempt
@@ -335,96 +340,62 @@ def operador_proyecto_detalle_api(request: HttpRequest, proyecto_id: int):
 def operador_pieza_estado_api(request: HttpRequest, proyecto_id: int, pieza_id: str):
     """PATCH /api/operador/proyectos/<id>/piezas/<pieza_id>
     Body: { estado: 'pendiente'|'en_corte'|'cortada'|'descartada' }
-    Persiste el estado dentro del JSON de resultado.
+    Persiste el estado con un UPDATE atómico de la fila de la pieza (PiezaColocada), sin
+    reescribir el JSON de resultado.
     """
-    ctx = get_auth_context(request)
-    base_qs = Proyecto.objects
-    if not (ctx.get('organization_is_general') or ctx.get('is_support')):
-        base_qs = base_qs.filter(organizacion_id=ctx.get('organization_id'))
-    p = get_object_or_404(base_qs, id=proyecto_id)
-    if ctx.get('role') == 'operador' and p.operador_id != request.user.id:
-        return JsonResponse({'success': False, 'message': 'Forbidden'}, status=403)
-
     try:
         payload = _json.loads(request.body.decode('utf-8') or '{}')
     except Exception:
         return JsonResponse({'success': False, 'message': 'Payload inválido'}, status=400)
     estado = (payload.get('estado') or '').strip()
-    if estado not in ('pendiente','en_corte','cortada','descartada'):
+    if estado not in ESTADOS_PIEZA:
         return JsonResponse({'success': False, 'message': 'Estado inválido'}, status=400)
 
-    res = p.resultado_optimizacion
-    if not res:
-        return JsonResponse({'success': False, 'message': 'Proyecto sin resultado'}, status=404)
-    try:
-        resd = _json.loads(res) if isinstance(res, str) else res
-    except Exception:
-        return JsonResponse({'success': False, 'message': 'Resultado inválido'}, status=500)
-
-    materiales = resd.get('materiales') if isinstance(resd.get('materiales'), list) else [resd]
-    updated = False
-    # Intentar formato nuevo: m{m}t{t}p{i}
-    mti = re.match(r'^m(\d+)t(\d+)p(\d+)$', pieza_id or '')
-    if mti:
-        target_m = int(mti.group(1))
-        target_t = int(mti.group(2))
-        target_p = int(mti.group(3))
-        for m_idx, mat in enumerate(materiales, start=1):
-            if m_idx != target_m:
-                continue
-            tableros = mat.get('tableros') or []
-            for t_idx, t in enumerate(tableros, start=1):
-                if t_idx != target_t:
-                    continue
-                piezas = t.get('piezas') or []
-                for i, pi in enumerate(piezas, start=1):
-                    if i == target_p:
-                        pi['estado'] = estado
-                        updated = True
-                        break
-                break
-            break
-    else:
-        # Compatibilidad: formato antiguo t{t}p{i} (sin material)
-        for mat in materiales:
-            tableros = mat.get('tableros') or []
-            for t_idx, t in enumerate(tableros, start=1):
-                piezas = t.get('piezas') or []
-                for i, pi in enumerate(piezas, start=1):
-                    pid = f"t{t_idx}p{i}"
-                    if pid == pieza_id:
-                        pi['estado'] = estado
-                        updated = True
-                        break
-            if updated:
-                break
-        # no-op
-
+    p, error = _proyecto_operador(request, proyecto_id)
+    if error:
+        return error
+    updated, _ = actualizar_estados(p, {pieza_id: estado})
     if not updated:
         return JsonResponse({'success': False, 'message': 'Pieza no encontrada'}, status=404)
 
-    # Persistir
-    if 'materiales' in resd:
-        p.resultado_optimizacion = _json.dumps(resd, ensure_ascii=False)
-    else:
-        p.resultado_optimizacion = _json.dumps(materiales[0], ensure_ascii=False)
-    p.save(update_fields=['resultado_optimizacion'])
+    _auditar_piezas(request, p, {'pieza_id': pieza_id, 'estado': estado})
+    return JsonResponse({'success': True})
+
 
-    # Auditoría
+@csrf_exempt
+@login_required
+@require_http_methods(["PATCH"])
+def operador_piezas_estado_api(request: HttpRequest, proyecto_id: int):
+    """PATCH /api/operador/proyectos/<id>/piezas
+    Body: { piezas: [{pieza_id: 'm1t1p1', estado: 'cortada'}, ...] }
+    Cambia el estado de varias piezas en una llamada (un UPDATE atómico por estado). Las piezas
+    inexistentes no detienen al resto: vuelven en `no_encontradas`.
+    """
     try:
-        AuditLog.objects.create(
-            actor=request.user,
-            organizacion=p.organizacion,
-            verb='EDIT',
-            target_model='Proyecto',
-            target_id=str(p.id),
-            target_repr=p.codigo,
-            changes={'pieza_id': pieza_id, 'estado': estado},
-        )
+        payload = _json.loads(request.body.decode('utf-8') or '{}')
     except Exception:
-        pass
-
-    return JsonResponse({'success': True})
+        return JsonResponse({'success': False, 'message': 'Payload inválido'}, status=400)
+    piezas = payload.get('piezas')
+    if not isinstance(piezas, list) or not piezas:
+        return JsonResponse({'success': False, 'message': 'Faltan piezas'}, status=400)
+    if len(piezas) > MAX_PIEZAS_PATCH:
+        return JsonResponse({'success': False, 'message': f'Máximo {MAX_PIEZAS_PATCH} piezas por llamada'}, status=400)
+    cambios = {}
+    for item in piezas:
+        pieza_id = str(item.get('pieza_id') or '') if isinstance(item, dict) else ''
+        estado = (item.get('estado') or '').strip() if isinstance(item, dict) else ''
+        if not pieza_id or estado not in ESTADOS_PIEZA:
+            return JsonResponse({'success': False, 'message': f'Pieza o estado inválido: {item}'}, status=400)
+        cambios[pieza_id] = estado
+
+    p, error = _proyecto_operador(request, proyecto_id)
+    if error:
+        return error
+    updated, no_encontradas = actualizar_estados(p, cambios)
+
+    if updated:
+        _auditar_piezas(request, p, {'piezas': cambios, 'actualizadas': updated})
+    return JsonResponse({'success': True, 'updated': updated, 'no_encontradas': no_encontradas})
 
 
 @csrf_exempt
@@ -474,15 +445,9 @@ def operador_proyecto_estado_api(request: HttpRequest, proyecto_id: int):
 def operador_proyecto_marcar_todas_cortadas_api(request: HttpRequest, proyecto_id: int):
     """POST /api/operador/proyectos/<id>/piezas/marcar-todas
     Body: { estado: 'cortada' }  (por ahora solo soporta 'cortada')
-    Marca TODAS las piezas del resultado como 'cortada' y persiste el JSON.
+    Marca TODAS las piezas del resultado como 'cortada' con un solo UPDATE sobre PiezaColocada
+    y devuelve los contadores de progreso por material y tablero.
     """
-    ctx = get_auth_context(request)
-    base_qs = Proyecto.objects
-    if not (ctx.get('organization_is_general') or ctx.get('is_support')):
-        base_qs = base_qs.filter(organizacion_id=ctx.get('organization_id'))
-    p = get_object_or_404(base_qs, id=proyecto_id)
-    if ctx.get('role') == 'operador' and p.operador_id != request.user.id:
-        return JsonResponse({'success': False, 'message': 'Forbidden'}, status=403)
     try:
         payload = _json.loads(request.body.decode('utf-8') or '{}')
     except Exception:
@@ -490,40 +455,16 @@ def operador_proyecto_marcar_todas_cortadas_api(request: HttpRequest, proyecto_i
     estado = (payload.get('estado') or 'cortada').strip()
     if estado != 'cortada':
         return JsonResponse({'success': False, 'message': 'Solo se permite marcar como cortada.'}, status=400)
-    res = p.resultado_optimizacion
-    if not res:
-        return JsonResponse({'success': False, 'message': 'Proyecto sin resultado'}, status=404)
-    try:
-        resd = _json.loads(res) if isinstance(res, str) else res
-    except Exception:
-        return JsonResponse({'success': False, 'message': 'Resultado inválido'}, status=500)
-    materiales = resd.get('materiales') if isinstance(resd.get('materiales'), list) else [resd]
-    count = 0
-    for mat in materiales:
-        for t in (mat.get('tableros') or []):
-            for pi in (t.get('piezas') or []):
-                if pi.get('estado') != 'cortada':
-                    pi['estado'] = 'cortada'
-                    count += 1
-    # Persistir
-    if 'materiales' in resd:
-        p.resultado_optimizacion = _json.dumps(resd, ensure_ascii=False)
-    else:
-        p.resultado_optimizacion = _json.dumps(materiales[0], ensure_ascii=False)
-    p.save(update_fields=['resultado_optimizacion'])
-    try:
-        AuditLog.objects.create(
-            actor=request.user,
-            organizacion=p.organizacion,
-            verb='EDIT',
-            target_model='Proyecto',
-            target_id=str(p.id),
-            target_repr=p.codigo,
-            changes={'bulk_piezas': 'cortada', 'count': count},
-        )
-    except Exception:
-        pass
-    return JsonResponse({'success': True, 'updated': count})
+    p, error = _proyecto_operador(request, proyecto_id)
+    if error:
+        return error
+    with transaction.atomic():
+        count = PiezaColocada.objects.filter(proyecto=p).exclude(estado='cortada').update(estado='cortada')
+        if count:
+            incrementar_version_vista(p)
+    progreso = progreso_piezas(p)
+    _auditar_piezas(request, p, {'bulk_piezas': 'cortada', 'count': count, 'total': progreso['total']})
+    return JsonResponse({'success': True, 'updated': count, 'progreso': progreso})
 
 
 @csrf_exempt
@@ -531,47 +472,31 @@ def operador_proyecto_marcar_todas_cortadas_api(request: HttpRequest, proyecto_i
 @require_http_methods(["POST"])
 def operador_proyecto_completar_api(request: HttpRequest, proyecto_id: int):
     """POST /api/operador/proyectos/<id>/completar
-    Valida que todas las piezas estén 'cortada' y marca el proyecto como 'completado'.
+    Marca el proyecto como 'completado' si todas sus piezas están 'cortada'. La validación va
+    en el mismo UPDATE (NOT EXISTS pieza sin cortar), sin recorrer las piezas.
     """
-    ctx = get_auth_context(request)
-    base_qs = Proyecto.objects
-    if not (ctx.get('organization_is_general') or ctx.get('is_support')):
-        base_qs = base_qs.filter(organizacion_id=ctx.get('organization_id'))
-    p = get_object_or_404(base_qs, id=proyecto_id)
-    if ctx.get('role') == 'operador' and p.operador_id != request.user.id:
-        return JsonResponse({'success': False, 'message': 'Forbidden'}, status=403)
-    res = p.resultado_optimizacion
-    if not res:
-        return JsonResponse({'success': False, 'message': 'Proyecto sin resultado'}, status=404)
-    try:
-        resd = _json.loads(res) if isinstance(res, str) else res
-    except Exception:
-        return JsonResponse({'success': False, 'message': 'Resultado inválido'}, status=500)
-    materiales = resd.get('materiales') if isinstance(resd.get('materiales'), list) else [resd]
-    missing = 0
-    total = 0
-    for mat in materiales:
-        for t in (mat.get('tableros') or []):
-            for pi in (t.get('piezas') or []):
-                total += 1
-                if pi.get('estado') != 'cortada':
-                    missing += 1
-    if missing > 0:
-        return JsonResponse({'success': False, 'message': f'Faltan {missing} pieza(s) por cortar de {total}.'}, status=400)
-    # Ok: completar
-    p.estado = 'completado'
-    p.save(update_fields=['estado'])
+    p, error = _proyecto_operador(request, proyecto_id)
+    if error:
+        return error
+    sin_cortar = PiezaColocada.objects.filter(proyecto=OuterRef('pk')).exclude(estado='cortada')
+    completado = Proyecto.objects.filter(id=p.id).filter(~Exists(sin_cortar)).update(estado='completado')
+    progreso = progreso_piezas(p)
+    if not completado:
+        return JsonResponse({
+            'success': False,
+            'message': f"Faltan {progreso['pendientes']} pieza(s) por cortar de {progreso['total']}.",
+            'progreso': progreso,
+        }, status=400)
     try:
         AuditLog.objects.create(
             actor=request.user,
-            organizacion=p.organizacion,
+            organizacion_id=p.organizacion_id,
             verb='UPDATE',
             target_model='Proyecto',
             target_id=str(p.id),
             target_repr=p.codigo,
-            changes={'estado': 'completado'},
+            changes={'estado': 'completado', 'piezas': progreso['total']},
         )
     except Exception:
         pass
-    return JsonResponse({'success': True})
-
+    return JsonResponse({'success': True, 'progreso': progreso})
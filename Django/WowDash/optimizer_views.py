@@ -7,11 +7,16 @@ from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
+import hashlib
 import json
+import logging
+import os
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter, landscape
 from reportlab.lib.units import mm
@@ -25,8 +30,21 @@ from django.utils.text import slugify
 from django.contrib.staticfiles import finders
 from core.models import Proyecto, Cliente, Material, Tapacanto, OptimizationRun, AuditLog
 from core.auth_utils import get_auth_context
+from core import optimizer_cache
+from core.exportacion_json import respuesta_json_streaming
+from core.fases import fase, medidor_actual, medir_fases
+from core.historial import asegurar_historial, listar_folios, migrar_historial_embebido, reconstruir_folio, registrar_folio
+from core.resultados import (
+    actualizar_piezas, guardar_vista_operador, materiales_de, resultado_compatible, sincronizar_resultado,
+)
+from optimizer import (  # noqa: F401  (OptimizationEngine y np se re-exportan para scripts)
+    PARAMETROS_CONFIGURACION, OptimizationEngine, ejecutar_configuracion, motor_desde_configuracion, np,
+    optimizar_portafolio, procesos_maximos,
+)
 import math
 
+logger = logging.getLogger(__name__)
+
 def _normalize_rut(rut: str) -> str:
     """Normaliza un RUT/identificador para comparación: quita puntos, guiones y espacios, y pasa a mayúsculas.
     Evita duplicados por formato (ej. 12.345.678-9 vs 12345678-9).
@@ -45,208 +63,45 @@ def _normalize_rut(rut: str) -> str:
 class TipoMaterial:
     TABLERO = 'tablero'
 
-class OptimizationEngine:
-    """Motor de optimización simplificado que evita superposiciones"""
-    def __init__(self, tablero_ancho, tablero_largo, margen_x, margen_y, desperdicio_sierra):
-        self.tablero_ancho_original = tablero_ancho
-        self.tablero_largo_original = tablero_largo
-        self.tablero_ancho = tablero_ancho - (2 * margen_x)
-        self.tablero_largo = tablero_largo - (2 * margen_y)
-        self.margen_x = margen_x
-        self.margen_y = margen_y
-        self.desperdicio_sierra = desperdicio_sierra
-        self.tableros = []
-
-    def optimizar_piezas(self, piezas):
-        """Algoritmo de optimización principal con timeout y colocación Bottom-Left"""
-        import time
-        tiempo_inicio = time.time()
-        timeout_segundos = 30
-
-        # Expandir piezas por cantidad
-        piezas_individuales = []
-        for pieza in piezas:
-            for i in range(pieza.get('cantidad', 1)):
-                pi = pieza.copy(); pi['id_unico'] = f"{pieza['nombre']}_{i+1}"; pi['cantidad'] = 1
-                piezas_individuales.append(pi)
-
-        # Orden: primero áreas mayores
-        def criterio(p):
-            area = p['ancho'] * p['largo']
-            max_dim = max(p['ancho'], p['largo'])
-            return (-area, -max_dim)
-        piezas_individuales.sort(key=criterio)
-
-        piezas_no_colocadas = []
-
-        for i, pieza in enumerate(piezas_individuales):
-            if time.time() - tiempo_inicio > timeout_segundos:
-                piezas_no_colocadas.extend(piezas_individuales[i:])
-                break
-
-            colocada = False
-            # Probar primero en tableros existentes (más llenos primero)
-            tableros_ordenados = sorted(self.tableros, key=lambda t: len(t['piezas']), reverse=True)
-            for tablero in tableros_ordenados:
-                if self._colocar_pieza_en_tablero(tablero, pieza):
-                    colocada = True
-                    break
-                if time.time() - tiempo_inicio > timeout_segundos:
-                    break
-
-            # Crear nuevo tablero si no cupo
-            if not colocada and time.time() - tiempo_inicio <= timeout_segundos:
-                nuevo = self._crear_nuevo_tablero()
-                if self._colocar_pieza_en_tablero(nuevo, pieza):
-                    self.tableros.append(nuevo)
-                    colocada = True
-                else:
-                    piezas_no_colocadas.append(pieza)
-            elif not colocada:
-                piezas_no_colocadas.append(pieza)
-
-        # Generar resultado y ajustar métricas
-        resultado = self._generar_resultado()
-        resultado['piezas_no_colocadas'] = len(piezas_no_colocadas)
-        resultado['tiempo_optimizacion'] = time.time() - tiempo_inicio
+def _optimizar_con_config(conf_mat, ancho_tablero, largo_tablero, margen_x, margen_y, desperdicio_sierra, piezas,
+                          progreso=None):
+    """Ejecuta el motor según la configuración del material: pasada única con
+    `estrategia`/`heuristica`/`orden` (mejorada hasta `tiempo_limite` segundos si se indica),
+    o `modo: 'portafolio'` con `presupuesto_segundos`.
+
+    Los resultados se guardan en la caché direccionada por contenido (`core.optimizer_cache`):
+    la misma entrada devuelve el resultado guardado, marcado con `desde_cache`. Las
+    configuraciones no reproducibles (orden aleatorio sin semilla) no usan la caché."""
+    if not optimizer_cache.es_cacheable(conf_mat):
+        return ejecutar_configuracion(conf_mat, ancho_tablero, largo_tablero, margen_x, margen_y,
+                                      desperdicio_sierra, piezas, progreso)
+    clave = optimizer_cache.clave_resultado(
+        OptimizationEngine.VERSION, ancho_tablero, largo_tablero, margen_x, margen_y,
+        desperdicio_sierra, piezas, conf_mat,
+    )
+    resultado = optimizer_cache.obtener(clave)
+    if resultado is not None:
+        resultado['desde_cache'] = True
         return resultado
+    resultado = ejecutar_configuracion(conf_mat, ancho_tablero, largo_tablero, margen_x, margen_y,
+                                       desperdicio_sierra, piezas, progreso)
+    optimizer_cache.guardar(clave, resultado)
+    return resultado
+
+def _reoptimizar_con_config(conf_mat, ancho_tablero, largo_tablero, margen_x, margen_y, desperdicio_sierra, piezas,
+                           previo, progreso=None):
+    """Re-optimización incremental sobre el resultado anterior `previo` (ver
+    `OptimizationEngine.reoptimizar`). No usa la caché: el resultado depende del layout anterior.
+    Si `previo` no corresponde a la configuración actual se optimiza completo."""
+    conf_mat = conf_mat or {}
+    try:
+        engine = motor_desde_configuracion(conf_mat, ancho_tablero, largo_tablero, margen_x, margen_y,
+                                           desperdicio_sierra)
+        return engine.reoptimizar(previo, piezas, progreso=progreso)
+    except ValueError:
+        return _optimizar_con_config(conf_mat, ancho_tablero, largo_tablero, margen_x, margen_y,
+                                     desperdicio_sierra, piezas, progreso=progreso)
 
-    def _colocar_pieza_en_tablero(self, tablero, pieza):
-        # Validar si cabe o intentar rotación si veta libre
-        if (pieza['ancho'] > self.tablero_ancho or pieza['largo'] > self.tablero_largo):
-            if (pieza.get('veta_libre', False) and pieza['largo'] <= self.tablero_ancho and pieza['ancho'] <= self.tablero_largo):
-                orientaciones = [(pieza['largo'], pieza['ancho'], True)]
-            else:
-                return False
-        else:
-            orientaciones = [(pieza['ancho'], pieza['largo'], False)]
-            if (pieza.get('veta_libre', False) and pieza['largo'] <= self.tablero_ancho and pieza['ancho'] <= self.tablero_largo):
-                orientaciones.append((pieza['largo'], pieza['ancho'], True))
-
-        for ancho, largo, rotada in orientaciones:
-            pos = self._encontrar_posicion_libre(tablero, ancho, largo)
-            if pos:
-                x, y = pos['x'], pos['y']
-                if (x + ancho <= self.tablero_ancho and y + largo <= self.tablero_largo):
-                    nueva = {
-                        'nombre': pieza['nombre'],
-                        'id_unico': pieza.get('id_unico', pieza['nombre']),
-                        'x': x, 'y': y,
-                        'ancho': ancho, 'largo': largo,
-                        'rotada': rotada,
-                        'tapacantos': pieza.get('tapacantos', {}),
-                        'veta_libre': pieza.get('veta_libre', False)
-                    }
-                    tablero['piezas'].append(nueva)
-                    return True
-        return False
-
-    def _encontrar_posicion_libre(self, tablero, ancho, largo):
-        if ancho > self.tablero_ancho or largo > self.tablero_largo:
-            return None
-        if not tablero['piezas']:
-            return {'x': 0, 'y': 0}
-
-        posiciones = set()
-        posiciones.add((0, 0))
-        for p in tablero['piezas']:
-            x_der = p['x'] + p['ancho'] + self.desperdicio_sierra
-            y_sup = p['y'] + p['largo'] + self.desperdicio_sierra
-            if x_der + ancho <= self.tablero_ancho:
-                if p['y'] + largo <= self.tablero_largo:
-                    posiciones.add((x_der, p['y']))
-                if y_sup + largo <= self.tablero_largo:
-                    posiciones.add((x_der, y_sup))
-            if y_sup + largo <= self.tablero_largo:
-                if p['x'] + ancho <= self.tablero_ancho:
-                    posiciones.add((p['x'], y_sup))
-                x_der2 = p['x'] + p['ancho'] + self.desperdicio_sierra
-                if x_der2 + ancho <= self.tablero_ancho:
-                    posiciones.add((x_der2, y_sup))
-            # Alineadas
-            if p['x'] + ancho <= self.tablero_ancho and p['y'] + largo <= self.tablero_largo:
-                posiciones.add((p['x'], p['y']))
-
-        pos_list = list(posiciones)
-        pos_list.sort(key=lambda pos: (pos[1], pos[0]))
-        for (x, y) in pos_list:
-            if self._posicion_libre(tablero, x, y, ancho, largo):
-                return {'x': x, 'y': y}
-        # Búsqueda sistemática si no hubo suerte
-        # Volver a la lógica anterior: paso fijo de 15 mm
-        paso = 15
-        for y in range(0, self.tablero_largo - largo + 1, paso):
-            for x in range(0, self.tablero_ancho - ancho + 1, paso):
-                if self._posicion_libre(tablero, x, y, ancho, largo):
-                    return {'x': x, 'y': y}
-        return None
-
-    def _posicion_libre(self, tablero, x, y, ancho, largo):
-        if (x < 0 or y < 0 or x + ancho > self.tablero_ancho or y + largo > self.tablero_largo):
-            return False
-        for p in tablero['piezas']:
-            nuevo_x1, nuevo_y1 = x, y
-            nuevo_x2, nuevo_y2 = x + ancho, y + largo
-            exist_x1, exist_y1 = p['x'], p['y']
-            exist_x2, exist_y2 = p['x'] + p['ancho'], p['y'] + p['largo']
-            margen = self.desperdicio_sierra
-            overlap_x = not (nuevo_x2 + margen <= exist_x1 or exist_x2 + margen <= nuevo_x1)
-            overlap_y = not (nuevo_y2 + margen <= exist_y1 or exist_y2 + margen <= nuevo_y1)
-            if overlap_x and overlap_y:
-                return False
-        return True
-
-    def _crear_nuevo_tablero(self):
-        return {
-            'id': len(self.tableros) + 1,
-            'ancho': self.tablero_ancho,
-            'largo': self.tablero_largo,
-            'piezas': [],
-            'area_usada': 0
-        }
-
-    def _generar_resultado(self):
-        total_area_tableros = len(self.tableros) * (self.tablero_ancho * self.tablero_largo)
-        area_utilizada = 0
-        total_piezas = 0
-        for tablero in self.tableros:
-            area_tablero = 0
-            for pieza in tablero['piezas']:
-                area_pieza = pieza['ancho'] * pieza['largo']
-                area_utilizada += area_pieza
-                area_tablero += area_pieza
-                total_piezas += 1
-            tablero['area_usada'] = area_tablero
-            tablero['area_total'] = self.tablero_ancho * self.tablero_largo
-            tablero['area_utilizada'] = area_tablero
-            tablero['eficiencia_tablero'] = (area_tablero / (self.tablero_ancho * self.tablero_largo)) * 100
-            # Ajustes para visualización (incluir márgenes)
-            for pieza in tablero['piezas']:
-                pieza['x'] += self.margen_x
-                pieza['y'] += self.margen_y
-            tablero['ancho'] = self.tablero_ancho_original
-            tablero['largo'] = self.tablero_largo_original
-            tablero['ancho_trabajo'] = self.tablero_ancho
-            tablero['largo_trabajo'] = self.tablero_largo
-
-        eficiencia = (area_utilizada / total_area_tableros * 100) if total_area_tableros > 0 else 0
-        return {
-            'tableros': self.tableros,
-            'total_tableros': len(self.tableros),
-            'total_piezas': total_piezas,
-            'area_utilizada': area_utilizada / 1000000,
-            'eficiencia': round(eficiencia, 1),
-            'area_total': total_area_tableros / 1000000,
-            'desperdicio_sierra': self.desperdicio_sierra,
-            'tablero_ancho_efectivo': self.tablero_ancho,
-            'tablero_largo_efectivo': self.tablero_largo,
-            'tablero_ancho_original': self.tablero_ancho_original,
-            'tablero_largo_original': self.tablero_largo_original,
-            'margenes': {
-                'margen_x': self.margen_x,
-                'margen_y': self.margen_y
-            }
-        }
 def optimizador_home_clasico(request):
     """Versión clásica del optimizador (conservada por compatibilidad)."""
     ctx = get_auth_context(request)
@@ -1242,6 +1097,27 @@ def _pdf_from_result(proyecto, resultado, opts: dict | None = None):
             except Exception:
                 pass
 
+            # Si el motor entregó la secuencia de cortes (estrategia guillotina), dibujar esos
+            # cortes reales en lugar de los bordes de piezas
+            if t.get('cortes'):
+                try:
+                    _vs, _hs = {}, {}
+                    for c in t['cortes']:
+                        pos = float(c['posicion']); d0 = float(c['desde']); d1 = float(c['hasta'])
+                        if c.get('tipo') == 'vertical':
+                            cx = _q(tX + offX + (pos - float(margen_x)) * scale)
+                            ya = tY + offYBL + effH - (d1 - float(margen_y)) * scale
+                            yb = tY + offYBL + effH - (d0 - float(margen_y)) * scale
+                            _vs.setdefault(cx, []).append((_q(ya), _q(yb)))
+                        else:
+                            cy = _q(tY + offYBL + effH - (pos - float(margen_y)) * scale)
+                            xa = tX + offX + (d0 - float(margen_x)) * scale
+                            xb = tX + offX + (d1 - float(margen_x)) * scale
+                            _hs.setdefault(cy, []).append((_q(xa), _q(xb)))
+                    _vert_segments, _horiz_segments = _vs, _hs
+                except Exception:
+                    pass
+
             # Dibujar líneas de corte (kerf)
             # - visible si draw_kerf=True
             # - invisible (color de fondo) si draw_kerf_invisible=True
@@ -1660,7 +1536,7 @@ def _pdf_from_result(proyecto, resultado, opts: dict | None = None):
     if PROFILE:
         total_s = (_t.perf_counter() - _t_total_start)
         try:
-            print("PDF_PROFILE | resumen_s=%.3fs boards_hatch_margin_s=%.3fs boards_hatch_useful_s=%.3fs boards_kerf_s=%.3fs boards_pieces_s=%.3fs boards=%d piezas=%d total=%.3fs" % (
+            logger.info("PDF_PROFILE | resumen_s=%.3fs boards_hatch_margin_s=%.3fs boards_hatch_useful_s=%.3fs boards_kerf_s=%.3fs boards_pieces_s=%.3fs boards=%d piezas=%d total=%.3fs" % (
                 _prof['summary_s'], _prof['boards_hatch_margin_s'], _prof['boards_hatch_useful_s'], _prof['boards_kerf_s'], _prof['boards_pieces_s'], _prof['boards_count'], _prof['pieces_count'], total_s
             ))
         except Exception:
@@ -1683,7 +1559,6 @@ def _optimizar_desde_conf_mat(conf_mat: dict, piezas_in: list):
     desperdicio_sierra = conf_mat.get('desperdicio_sierra', 3)
     tapacanto_codigo = conf_mat.get('tapacanto_codigo', '')
     tapacanto_nombre = conf_mat.get('tapacanto_nombre', '')
-    engine = OptimizationEngine(ancho_tablero, largo_tablero, margen_x, margen_y, desperdicio_sierra)
     piezas_proc = []
     for p in piezas_in:
         piezas_proc.append({
@@ -1694,7 +1569,7 @@ def _optimizar_desde_conf_mat(conf_mat: dict, piezas_in: list):
             'veta_libre': p.get('veta_libre', False),
             'tapacantos': p.get('tapacantos', {}) or {}
         })
-    r = engine.optimizar_piezas(piezas_proc)
+    r = _optimizar_con_config(conf_mat, ancho_tablero, largo_tablero, margen_x, margen_y, desperdicio_sierra, piezas_proc)
     r['entrada'] = piezas_proc
     r['material'] = {
         'nombre': material.nombre,
@@ -1750,14 +1625,6 @@ def _resultado_desde_configuracion(proyecto):
         'total_piezas': total_piezas,
         'eficiencia_promedio': eficiencia_promedio,
         'ultimo_folio': folio,
-        'historial': [{
-            'folio': folio,
-            'fecha': datetime.now().isoformat(),
-            'materiales': materiales,
-            'total_tableros': total_tableros,
-            'total_piezas': total_piezas,
-            'eficiencia_promedio': eficiencia_promedio,
-        }]
     }
     return resultado_persist
 
@@ -1961,371 +1828,533 @@ def crear_proyecto_optimizacion(request):
 
     return JsonResponse({'success': False, 'message': 'Método no permitido'})
 
-@login_required
-@csrf_exempt  
-def optimizar_material(request):
-    """Ejecuta la optimización del material"""
-    if request.method == 'POST':
+def _ruta_pdf_proyecto(proyecto):
+    """Ruta relativa a MEDIA_ROOT del PDF del ID/folio actual del proyecto."""
+    folio_actual = str(proyecto.public_id) if proyecto.public_id else f"{proyecto.correlativo}-{proyecto.version}"
+    try:
+        cliente_slug = slugify(proyecto.cliente.nombre) if proyecto.cliente_id else 'cliente'
+    except Exception:
+        cliente_slug = 'cliente'
+    return f"proyectos/{proyecto.id}/optimizacion_{folio_actual}_{cliente_slug}.pdf"
+
+def _renderizar_pdf_proyecto(proyecto, resultado=None, opts=None, rel_path=None, solo_si_vigente=False):
+    """Genera el PDF desde el resultado guardado y lo escribe en MEDIA_ROOT de forma atómica
+    (archivo temporal + rename), para no servir nunca un PDF a medio escribir.
+    Marca el proyecto con estado_pdf='listo'. Con `solo_si_vigente` (worker) la marca es un
+    UPDATE condicionado a que `archivo_pdf` siga siendo `rel_path`: si entretanto se encoló el
+    PDF de un folio más nuevo, no se pisa y el archivo viejo se descarta.
+    Devuelve (rel_path, bytes)."""
+    from django.conf import settings
+    if resultado is None:
         try:
-            data = json.loads(request.body)
-            # Idempotencia: si viene desde frontend con tableros y firma igual a la última, devolver sin cambios
-            try:
-                tableros_in = data.get('tableros')
-                if isinstance(tableros_in, list) and tableros_in:
-                    # Construir firma estable
-                    sig_parts = []
-                    for t in tableros_in[:50]:
-                        piezas_sig = []
-                        for p in (t.get('piezas') or [])[:1000]:
-                            piezas_sig.append(f"{p.get('nombre','')}@{p.get('x')}:{p.get('y')}:{p.get('ancho')}x{p.get('largo') or p.get('alto')}:{int(bool(p.get('rotada')))}")
-                        sig_parts.append(f"T{t.get('numero')}|{','.join(piezas_sig)}")
-                    layout_signature = hashlib.sha256(('|'.join(sig_parts)).encode('utf-8')).hexdigest()
-                    last_sig = request.session.get('last_layout_signature')
-                    last_sig_ts = request.session.get('last_layout_sig_ts') or 0
-                    now_ts = time.time()
-                    if last_sig and last_sig == layout_signature and (now_ts - last_sig_ts) < 5:
-                        # Responder éxito sin recalcular ni actualizar folio/version
-                        return JsonResponse({'success': True, 'idempotent': True, 'mensaje': 'Layout repetido (omitido)', 'folio': None})
-                    request.session['last_layout_signature'] = layout_signature
-                    request.session['last_layout_sig_ts'] = now_ts
-            except Exception:
-                pass
-            
-            # Obtener configuración del material
-            config = data['configuracion_material']
-            material_id = config['material_id']
-            material = get_object_or_404(Material, id=material_id)
-            
-            # Dimensiones del tablero - SIEMPRE usar las medidas de los campos editables
-            # Estas son la fuente de verdad para la optimización
-            ancho_tablero = config.get('ancho_custom') or material.ancho
-            largo_tablero = config.get('largo_custom') or material.largo
-            
-            print(f"Optimización usando dimensiones del tablero: {ancho_tablero}mm x {largo_tablero}mm")
-            print(f"Material original: {material.ancho}mm x {material.largo}mm")
-            
-            # Parámetros de optimización
-            margen_x = config.get('margen_x', 0)
-            margen_y = config.get('margen_y', 0)
-            desperdicio_sierra = config.get('desperdicio_sierra', 3)
-            tapacanto_codigo = config.get('tapacanto_codigo', '')
-            tapacanto_nombre = config.get('tapacanto_nombre', '')
-            
-            # Crear motor de optimización
-            engine = OptimizationEngine(
-                ancho_tablero, largo_tablero,
-                margen_x, margen_y, desperdicio_sierra
-            )
-            
-            # Procesar piezas
-            piezas = data['piezas']
-            piezas_procesadas = []
-            
-            for pieza in piezas:
-                piezas_procesadas.append({
-                    'nombre': pieza['nombre'],
-                    'ancho': pieza['ancho'],
-                    'largo': pieza['largo'],
-                    'cantidad': pieza['cantidad'],
-                    'veta_libre': pieza.get('veta_libre', False),
-                    'tapacantos': pieza.get('tapacantos', [])
-                })
-            
-            # Si el frontend ya realizó la optimización y envía "tableros", evitar recomputar para no duplicar costo.
-            resultado = None
-            try:
-                frontend_tableros = data.get('tableros')
-                if isinstance(frontend_tableros, list) and frontend_tableros:
-                    # Sanitizar estructura básica de tableros y piezas
-                    tableros_sanitizados = []
-                    total_piece_area_mm2 = 0
-                    for t in frontend_tableros[:200]:  # límite defensivo
-                        piezas_t = []
-                        for p in (t.get('piezas') or [])[:2000]:  # límite defensivo
-                            try:
-                                ancho_p = float(p.get('ancho') or p.get('width') or 0)
-                                alto_p = float(p.get('alto') if p.get('alto') is not None else (p.get('largo') if p.get('largo') is not None else p.get('height') or 0))
-                                if ancho_p <= 0 or alto_p <= 0:
-                                    continue
-                                total_piece_area_mm2 += ancho_p * alto_p
-                                piezas_t.append({
-                                    'nombre': (p.get('nombre') or '').strip(),
-                                    'ancho': int(ancho_p),
-                                    'largo': int(alto_p),
-                                    'x': float(p.get('x') or 0),
-                                    'y': float(p.get('y') or 0),
-                                    'rotada': bool(p.get('rotada')),
-                                    'indiceUnidad': p.get('indiceUnidad'),
-                                    'totalUnidades': p.get('totalUnidades'),
-                                    'tapacantos': p.get('tapacantos') if isinstance(p.get('tapacantos'), dict) else {'arriba': False, 'derecha': False, 'abajo': False, 'izquierda': False}
-                                })
-                            except Exception:
-                                continue
-                        if piezas_t:
-                            tableros_sanitizados.append({
-                                'numero': t.get('numero') or (len(tableros_sanitizados) + 1),
-                                'ancho': float(t.get('ancho') or ancho_tablero),
-                                'largo': float(t.get('alto') or t.get('largo') or largo_tablero),
-                                'piezas': piezas_t,
-                                'eficiencia_tablero': t.get('eficiencia_tablero')  # opcional
-                            })
-                    # Calcular métricas agregadas si hay tableros válidos
-                    if tableros_sanitizados:
-                        area_total_mm2 = 0
-                        for tb in tableros_sanitizados:
-                            area_total_mm2 += tb['ancho'] * tb['largo']
-                        area_utilizada_mm2 = total_piece_area_mm2
-                        eficiencia = (area_utilizada_mm2 / area_total_mm2 * 100) if area_total_mm2 > 0 else 0
-                        resultado = {
-                            'tableros': tableros_sanitizados,
-                            'area_total': round(area_total_mm2 / 1_000_000, 6),  # m²
-                            'area_utilizada': round(area_utilizada_mm2 / 1_000_000, 6),  # m²
-                            'eficiencia': round(eficiencia, 4),
-                            'margenes': {'margen_x': margen_x, 'margen_y': margen_y},
-                            'desperdicio_sierra': desperdicio_sierra,
-                            'tablero_ancho_original': ancho_tablero,
-                            'tablero_largo_original': largo_tablero,
-                            'tiempo_optimizacion': 0,
-                            'origen': 'frontend'
-                        }
-            except Exception:
-                resultado = None
-            if resultado is None:
-                # Ejecutar optimización en backend (fuente de verdad)
-                resultado = engine.optimizar_piezas(piezas_procesadas)
-                resultado['origen'] = 'backend'
-            # Conservar entrada original de piezas para futura rehidratación fiel de la grilla
+            resultado = json.loads(proyecto.resultado_optimizacion) if isinstance(proyecto.resultado_optimizacion, str) else (proyecto.resultado_optimizacion or {})
+        except Exception:
+            resultado = {}
+    pdf_bytes = _pdf_from_result(proyecto, resultado, opts=opts)
+    rel_path = rel_path or _ruta_pdf_proyecto(proyecto)
+    abs_path = os.path.join(settings.MEDIA_ROOT, rel_path)
+    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+    tmp_path = f"{abs_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        fh.write(pdf_bytes)
+    os.replace(tmp_path, abs_path)
+    if solo_si_vigente:
+        if not Proyecto.objects.filter(pk=proyecto.pk, archivo_pdf=rel_path).update(estado_pdf='listo'):
             try:
-                resultado['entrada'] = piezas_procesadas
-            except Exception:
+                os.remove(abs_path)
+            except OSError:
                 pass
-            
-            # Agregar información del material
-            resultado['material'] = {
-                'nombre': material.nombre,
-                'codigo': material.codigo,
-                'ancho_original': material.ancho,
-                'largo_original': material.largo,
-                'ancho_usado': ancho_tablero,
-                'largo_usado': largo_tablero
-            }
-            # Metadatos de tapacanto a nivel de material
-            resultado['tapacanto'] = {
-                'codigo': tapacanto_codigo,
-                'nombre': tapacanto_nombre,
-            }
-            
-            # Guardar/Acumular resultado si hay proyecto_id
-            if data.get('proyecto_id'):
-                proyecto = get_object_or_404(Proyecto, id=data['proyecto_id'])
-                existente = {}
-                try:
-                    if proyecto.resultado_optimizacion:
-                        existente = json.loads(proyecto.resultado_optimizacion)
-                except Exception:
-                    existente = {}
-
-                # Si el frontend indicó reset total, descartar resultado previo
-                try:
-                    if data.get('resetear_resultado'):
-                        existente = {}
-                except Exception:
-                    pass
+        return rel_path, pdf_bytes
+    proyecto.archivo_pdf = rel_path
+    proyecto.estado_pdf = 'listo'
+    proyecto.save(update_fields=['archivo_pdf', 'estado_pdf'])
+    return rel_path, pdf_bytes
 
-                materiales = existente.get('materiales', [])
-                material_index = data.get('material_index', 1)
+def _programar_pdf_proyecto(proyecto, usuario, resultado):
+    """Tras una optimización en backend: encola el PDF para el worker (estado_pdf='pendiente')
+    o, con OPTIMIZADOR_PDF_DIFERIDO desactivado, lo genera en línea como antes."""
+    from django.conf import settings
+    from core.models import OptimizationJob
+    if not getattr(settings, 'OPTIMIZADOR_PDF_DIFERIDO', True):
+        _renderizar_pdf_proyecto(proyecto, resultado)
+        return
+    proyecto.archivo_pdf = _ruta_pdf_proyecto(proyecto)
+    proyecto.estado_pdf = 'pendiente'
+    proyecto.save(update_fields=['archivo_pdf', 'estado_pdf'])
+    OptimizationJob.objects.create(tipo='pdf', usuario=usuario, proyecto=proyecto,
+                                   payload={'archivo_pdf': proyecto.archivo_pdf})
+
+def _esperar_pdf_pendiente(proyecto, segundos):
+    """Espera hasta `segundos` a que el worker termine el PDF pendiente. True si quedó listo."""
+    limite = time.time() + segundos
+    while time.time() < limite:
+        estado = Proyecto.objects.filter(id=proyecto.id).values_list('estado_pdf', flat=True).first()
+        if estado != 'pendiente':
+            proyecto.refresh_from_db(fields=['estado_pdf', 'archivo_pdf'])
+            return estado == 'listo'
+        time.sleep(0.2)
+    return False
+
+def _resultado_material_previo(data):
+    """Resultado guardado en el proyecto para `material_index` (base de la re-optimización
+    incremental) o None."""
+    if not data.get('proyecto_id') or data.get('resetear_resultado'):
+        return None
+    try:
+        proyecto = Proyecto.objects.only('resultado_optimizacion').get(id=data['proyecto_id'])
+        existente = json.loads(proyecto.resultado_optimizacion) if proyecto.resultado_optimizacion else {}
+    except Exception:
+        return None
+    material_index = data.get('material_index', 1)
+    for m in existente.get('materiales', []):
+        if m.get('material_index') == material_index:
+            return m
+    return None
+
+def _preparar_material(data):
+    """Lee configuración y piezas de un material del payload de optimización. Devuelve un dict
+    con los parámetros normalizados; si el frontend envió su layout (`tableros`), 'resultado'
+    trae el resultado armado a partir de él (None si hay que optimizar en backend).
+    """
+    # Obtener configuración del material
+    config = data['configuracion_material']
+    material_id = config['material_id']
+    material = get_object_or_404(Material, id=material_id)
+    
+    # Dimensiones del tablero - SIEMPRE usar las medidas de los campos editables
+    # Estas son la fuente de verdad para la optimización
+    ancho_tablero = config.get('ancho_custom') or material.ancho
+    largo_tablero = config.get('largo_custom') or material.largo
+    
+    logger.debug('Optimización con tablero %sx%s mm (material original %sx%s mm)',
+                 ancho_tablero, largo_tablero, material.ancho, material.largo)
+    
+    # Parámetros de optimización
+    margen_x = config.get('margen_x', 0)
+    margen_y = config.get('margen_y', 0)
+    desperdicio_sierra = config.get('desperdicio_sierra', 3)
+    tapacanto_codigo = config.get('tapacanto_codigo', '')
+    tapacanto_nombre = config.get('tapacanto_nombre', '')
+    # Estrategia de colocación (opcional): 'bottom_left' (por defecto), 'maxrects' o 'guillotina';
+    # con modo 'portafolio' se prueban varias en paralelo dentro de presupuesto_segundos
+    estrategia = config.get('estrategia') or 'bottom_left'
+    heuristica = config.get('heuristica') or 'bssf'
+    
 
-                # Enriquecer resultado con metadatos del material
-                resultado['material_index'] = material_index
-                resultado['config'] = {
-                    'margen_x': margen_x,
-                    'margen_y': margen_y,
-                    'kerf': desperdicio_sierra,
-                }
-                # Guardar también el tapacanto de esta pestaña/material
-                resultado['tapacanto'] = {
-                    'codigo': tapacanto_codigo,
-                    'nombre': tapacanto_nombre,
+    # Procesar piezas
+    piezas = data['piezas']
+    piezas_procesadas = []
+    
+    for pieza in piezas:
+        piezas_procesadas.append({
+            'nombre': pieza['nombre'],
+            'ancho': pieza['ancho'],
+            'largo': pieza['largo'],
+            'cantidad': pieza['cantidad'],
+            'veta_libre': pieza.get('veta_libre', False),
+            'tapacantos': pieza.get('tapacantos', [])
+        })
+    
+    # Si el frontend ya realizó la optimización y envía "tableros", evitar recomputar para no duplicar costo.
+    resultado = None
+    try:
+        frontend_tableros = data.get('tableros')
+        if isinstance(frontend_tableros, list) and frontend_tableros:
+            # Sanitizar estructura básica de tableros y piezas
+            tableros_sanitizados = []
+            total_piece_area_mm2 = 0
+            for t in frontend_tableros[:200]:  # límite defensivo
+                piezas_t = []
+                for p in (t.get('piezas') or [])[:2000]:  # límite defensivo
+                    try:
+                        ancho_p = float(p.get('ancho') or p.get('width') or 0)
+                        alto_p = float(p.get('alto') if p.get('alto') is not None else (p.get('largo') if p.get('largo') is not None else p.get('height') or 0))
+                        if ancho_p <= 0 or alto_p <= 0:
+                            continue
+                        total_piece_area_mm2 += ancho_p * alto_p
+                        piezas_t.append({
+                            'nombre': (p.get('nombre') or '').strip(),
+                            'ancho': int(ancho_p),
+                            'largo': int(alto_p),
+                            'x': float(p.get('x') or 0),
+                            'y': float(p.get('y') or 0),
+                            'rotada': bool(p.get('rotada')),
+                            'indiceUnidad': p.get('indiceUnidad'),
+                            'totalUnidades': p.get('totalUnidades'),
+                            'tapacantos': p.get('tapacantos') if isinstance(p.get('tapacantos'), dict) else {'arriba': False, 'derecha': False, 'abajo': False, 'izquierda': False}
+                        })
+                    except Exception:
+                        continue
+                if piezas_t:
+                    tableros_sanitizados.append({
+                        'numero': t.get('numero') or (len(tableros_sanitizados) + 1),
+                        'ancho': float(t.get('ancho') or ancho_tablero),
+                        'largo': float(t.get('alto') or t.get('largo') or largo_tablero),
+                        'piezas': piezas_t,
+                        'eficiencia_tablero': t.get('eficiencia_tablero')  # opcional
+                    })
+            # Calcular métricas agregadas si hay tableros válidos
+            if tableros_sanitizados:
+                area_total_mm2 = 0
+                for tb in tableros_sanitizados:
+                    area_total_mm2 += tb['ancho'] * tb['largo']
+                area_utilizada_mm2 = total_piece_area_mm2
+                eficiencia = (area_utilizada_mm2 / area_total_mm2 * 100) if area_total_mm2 > 0 else 0
+                resultado = {
+                    'tableros': tableros_sanitizados,
+                    'area_total': round(area_total_mm2 / 1_000_000, 6),  # m²
+                    'area_utilizada': round(area_utilizada_mm2 / 1_000_000, 6),  # m²
+                    'eficiencia': round(eficiencia, 4),
+                    'margenes': {'margen_x': margen_x, 'margen_y': margen_y},
+                    'desperdicio_sierra': desperdicio_sierra,
+                    'tablero_ancho_original': ancho_tablero,
+                    'tablero_largo_original': largo_tablero,
+                    'tiempo_optimizacion': 0,
+                    'origen': 'frontend'
                 }
+    except Exception:
+        resultado = None
+    return {
+        'config': config,
+        'material': material,
+        'material_id': material_id,
+        'ancho_tablero': ancho_tablero,
+        'largo_tablero': largo_tablero,
+        'margen_x': margen_x,
+        'margen_y': margen_y,
+        'desperdicio_sierra': desperdicio_sierra,
+        'tapacanto_codigo': tapacanto_codigo,
+        'tapacanto_nombre': tapacanto_nombre,
+        'estrategia': estrategia,
+        'heuristica': heuristica,
+        'piezas': piezas_procesadas,
+        'resultado': resultado,
+    }
 
-                # Reemplazar si ya existe ese índice, si no, agregar
-                reemplazado = False
-                for i, m in enumerate(materiales):
-                    if m.get('material_index') == material_index:
-                        materiales[i] = resultado
-                        reemplazado = True
-                        break
-                if not reemplazado:
-                    materiales.append(resultado)
+def _argumentos_motor(prep):
+    return (prep['config'], prep['ancho_tablero'], prep['largo_tablero'], prep['margen_x'],
+            prep['margen_y'], prep['desperdicio_sierra'], prep['piezas'])
 
-                # Actualizar totales del proyecto
-                total_tableros = sum(len(m.get('tableros', [])) for m in materiales)
-                total_piezas = sum(sum(len(t.get('piezas', [])) for t in m.get('tableros', [])) for m in materiales)
-                eficiencias = [m.get('eficiencia_promedio') or m.get('eficiencia') for m in materiales if m]
-                eficiencia_promedio = sum(eficiencias)/len(eficiencias) if eficiencias else 0
+def _optimizar_material_backend(prep, data, progreso=None):
+    """Optimización en backend (fuente de verdad). Con `incremental` se parte del resultado
+    guardado de este material: sólo cambian los tableros tocados por la edición."""
+    previo = _resultado_material_previo(data) if data.get('incremental') else None
+    if previo:
+        resultado = _reoptimizar_con_config(*_argumentos_motor(prep), previo, progreso=progreso)
+    else:
+        resultado = _optimizar_con_config(*_argumentos_motor(prep), progreso=progreso)
+    resultado['origen'] = 'backend'
+    return resultado
+
+def _completar_resultado_material(prep, resultado):
+    """Agrega al resultado la entrada de piezas y los metadatos del material y tapacanto."""
+    piezas_procesadas, material = prep['piezas'], prep['material']
+    ancho_tablero, largo_tablero = prep['ancho_tablero'], prep['largo_tablero']
+    # Conservar entrada original de piezas para futura rehidratación fiel de la grilla
+    try:
+        resultado['entrada'] = piezas_procesadas
+    except Exception:
+        pass
+    
+    # Agregar información del material
+    resultado['material'] = {
+        'nombre': material.nombre,
+        'codigo': material.codigo,
+        'ancho_original': material.ancho,
+        'largo_original': material.largo,
+        'ancho_usado': ancho_tablero,
+        'largo_usado': largo_tablero
+    }
+    # Metadatos de tapacanto a nivel de material
+    resultado['tapacanto'] = {
+        'codigo': prep['tapacanto_codigo'],
+        'nombre': prep['tapacanto_nombre'],
+    }
+    return resultado
 
-                existente['materiales'] = materiales
-                existente['total_tableros'] = total_tableros
-                existente['total_piezas'] = total_piezas
-                existente['eficiencia_promedio'] = eficiencia_promedio
+def _guardar_resultados_proyecto(proyecto, usuario, items, resetear=False):
+    """Acumula en `proyecto.resultado_optimizacion` los resultados de uno o más materiales
+    (`items`: lista de (prep, resultado, material_index)), recalcula totales, asigna un nuevo
+    ID público si hubo recálculo en backend y registra una sola OptimizationRun y auditoría.
+    Devuelve el resultado completo del proyecto (dict). No abre transacción: el llamador decide.
+    """
+    existente = {}
+    try:
+        with fase('serializar'):
+            if proyecto.resultado_optimizacion:
+                existente = json.loads(proyecto.resultado_optimizacion)
+    except Exception:
+        existente = {}
+    # Historial embebido de versiones anteriores: pasa a sus tablas (core.historial)
+    migrar_historial_embebido(proyecto, existente)
+
+    # Si el frontend indicó reset total, descartar resultado previo
+    if resetear:
+        existente = {}
+
+    materiales = existente.get('materiales', [])
+    for prep, resultado, material_index in items:
+        # Enriquecer resultado con metadatos del material
+        resultado['material_index'] = material_index
+        resultado['config'] = {
+            'margen_x': prep['margen_x'],
+            'margen_y': prep['margen_y'],
+            'kerf': prep['desperdicio_sierra'],
+        }
+        # Guardar también el tapacanto de esta pestaña/material
+        resultado['tapacanto'] = {
+            'codigo': prep['tapacanto_codigo'],
+            'nombre': prep['tapacanto_nombre'],
+        }
 
-                # Snapshot del historial se agregará luego de asignar el nuevo ID público
+        # Reemplazar si ya existe ese índice, si no, agregar
+        reemplazado = False
+        for i, m in enumerate(materiales):
+            if m.get('material_index') == material_index:
+                materiales[i] = resultado
+                reemplazado = True
+                break
+        if not reemplazado:
+            materiales.append(resultado)
 
-                # Persistir resultado y actualizar configuración del proyecto para soportar forzar_optimizacion
-                try:
-                    # Construir configuración agregada (multi-material) mínima
-                    cfg_actual = None
-                    # Rehidratar desde lo que exista
-                    try:
-                        cfg_actual = json.loads(proyecto.configuracion) if proyecto.configuracion else None
-                    except Exception:
-                        cfg_actual = None
-                    # Normalizar a lista de materiales
-                    materiales_cfg = []
-                    if isinstance(cfg_actual, dict) and isinstance(cfg_actual.get('materiales'), list):
-                        materiales_cfg = cfg_actual['materiales']
-                    elif isinstance(cfg_actual, dict) and (cfg_actual.get('configuracion_material') or cfg_actual.get('config')):
-                        materiales_cfg = [cfg_actual]
-                    # Payload de configuración para el material actual
-                    mat_cfg_payload = {
-                        'configuracion_material': {
-                            'material_id': material_id,
-                            'ancho_custom': ancho_tablero,
-                            'largo_custom': largo_tablero,
-                            'margen_x': margen_x,
-                            'margen_y': margen_y,
-                            'desperdicio_sierra': desperdicio_sierra,
-                            'tapacanto_codigo': tapacanto_codigo,
-                            'tapacanto_nombre': tapacanto_nombre,
-                        },
-                        'piezas': piezas_procesadas,
-                    }
-                    # Insertar/reemplazar por índice de material
-                    idx_um = max(0, int(material_index) - 1)
-                    while len(materiales_cfg) <= idx_um:
-                        materiales_cfg.append({})
-                    materiales_cfg[idx_um] = mat_cfg_payload
-                    cfg_agg = { 'materiales': materiales_cfg }
-                    proyecto.configuracion = json.dumps(cfg_agg, ensure_ascii=False)
-                except Exception:
-                    pass
+    # Actualizar totales del proyecto
+    total_tableros = sum(len(m.get('tableros', [])) for m in materiales)
+    total_piezas = sum(sum(len(t.get('piezas', [])) for t in m.get('tableros', [])) for m in materiales)
+    eficiencias = [m.get('eficiencia_promedio') or m.get('eficiencia') for m in materiales if m]
+    eficiencia_promedio = sum(eficiencias)/len(eficiencias) if eficiencias else 0
 
-                # Incrementar versión y asignar nuevo ID público SOLO si origen backend (recalculo real) y no proviene de layout frontend
-                origen_frontend = (resultado.get('origen') == 'frontend')
-                try:
-                    logger.info(
-                        'OPTIMIZAR_MATERIAL llamada: origen=%s proyecto_id=%s version_pre=%s public_id_pre=%s tableros_frontend=%s will_recalc=%s',
-                        resultado.get('origen'),
-                        data.get('proyecto_id'),
-                        getattr(proyecto, 'version', None),
-                        getattr(proyecto, 'public_id', None),
-                        len(data.get('tableros') or []) if isinstance(data.get('tableros'), list) else 0,
-                        'YES' if not origen_frontend else 'NO'
-                    )
-                except Exception:
-                    pass
-                if not origen_frontend:
-                    try:
-                        proyecto.version = (proyecto.version or 0) + 1
-                    except Exception:
-                        proyecto.version = 1
-                    try:
-                        ultimo_pub = Proyecto.objects.exclude(public_id__isnull=True).order_by('-public_id').first()
-                        next_public_id = (ultimo_pub.public_id + 1) if ultimo_pub and ultimo_pub.public_id and ultimo_pub.public_id >= 100 else 100
-                    except Exception:
-                        next_public_id = 100
-                    proyecto.public_id = next_public_id
-                existente['folio_proyecto'] = str(proyecto.public_id)
-                # Agregar snapshot al historial con el nuevo ID
-                try:
-                    snapshot = {
-                        'folio': str(proyecto.public_id),
-                        'fecha': datetime.now().isoformat(),
-                        'materiales': materiales,
-                        'total_tableros': total_tableros,
-                        'total_piezas': total_piezas,
-                        'eficiencia_promedio': eficiencia_promedio,
-                    }
-                    historial = existente.get('historial') or []
-                    historial.append(snapshot)
-                    if len(historial) > 20:
-                        historial = historial[-20:]
-                    existente['historial'] = historial
-                    existente['ultimo_folio'] = str(proyecto.public_id)
-                except Exception:
-                    pass
-                proyecto.resultado_optimizacion = json.dumps(existente)
-                proyecto.total_materiales = len(materiales)
-                proyecto.total_tableros = total_tableros
-                proyecto.total_piezas = total_piezas
-                proyecto.eficiencia_promedio = eficiencia_promedio
-                proyecto.estado = 'optimizado'
-                proyecto.save()
-
-                # Registrar ejecución y auditoría
-                try:
-                    OptimizationRun.objects.create(
-                        organizacion=proyecto.organizacion,
-                        proyecto=proyecto,
-                        run_by=request.user,
-                        porcentaje_uso=eficiencia_promedio,
-                        tiempo_ms=int(resultado.get('tiempo_optimizacion', 0) * 1000) if resultado.get('tiempo_optimizacion') else None,
-                    )
-                    AuditLog.objects.create(
-                        actor=request.user,
-                        organizacion=proyecto.organizacion,
-                        verb='RUN_OPT',
-                        target_model='Proyecto',
-                        target_id=str(proyecto.id),
-                        target_repr=proyecto.codigo,
-                        changes={'material_id': material_id}
-                    )
-                except Exception:
-                    pass
+    existente['materiales'] = materiales
+    existente['total_tableros'] = total_tableros
+    existente['total_piezas'] = total_piezas
+    existente['eficiencia_promedio'] = eficiencia_promedio
 
-                # Generar y persistir PDF sólo si la optimización fue realizada en backend (evitar duplicado en origen frontend)
-                if resultado.get('origen') != 'frontend':
-                    try:
-                        from django.conf import settings
-                        import os
-                        pdf_data = _pdf_from_result(proyecto, existente)
-                        folio_actual = str(proyecto.public_id) if proyecto.public_id else f"{proyecto.correlativo}-{proyecto.version}"
-                        try:
-                            cliente_slug = slugify(proyecto.cliente.nombre) if proyecto.cliente_id else 'cliente'
-                        except Exception:
-                            cliente_slug = 'cliente'
-                        rel_dir = f"proyectos/{proyecto.id}"
-                        rel_path = f"{rel_dir}/optimizacion_{folio_actual}_{cliente_slug}.pdf"
-                        abs_dir = os.path.join(settings.MEDIA_ROOT, rel_dir)
-                        os.makedirs(abs_dir, exist_ok=True)
-                        abs_path = os.path.join(settings.MEDIA_ROOT, rel_path)
-                        with open(abs_path, 'wb') as fh:
-                            fh.write(pdf_data)
-                        proyecto.archivo_pdf = rel_path
-                        proyecto.save(update_fields=['archivo_pdf'])
-                    except Exception:
-                        pass
-            
-            resp = {
-                'success': True,
-                'resultado': resultado
+    # Persistir resultado y actualizar configuración del proyecto para soportar forzar_optimizacion
+    try:
+        # Construir configuración agregada (multi-material) mínima
+        cfg_actual = None
+        # Rehidratar desde lo que exista
+        try:
+            cfg_actual = json.loads(proyecto.configuracion) if proyecto.configuracion else None
+        except Exception:
+            cfg_actual = None
+        # Normalizar a lista de materiales
+        materiales_cfg = []
+        if isinstance(cfg_actual, dict) and isinstance(cfg_actual.get('materiales'), list):
+            materiales_cfg = cfg_actual['materiales']
+        elif isinstance(cfg_actual, dict) and (cfg_actual.get('configuracion_material') or cfg_actual.get('config')):
+            materiales_cfg = [cfg_actual]
+        for prep, _, material_index in items:
+            config = prep['config']
+            # Payload de configuración para el material
+            mat_cfg_payload = {
+                'configuracion_material': {
+                    'material_id': prep['material_id'],
+                    'ancho_custom': prep['ancho_tablero'],
+                    'largo_custom': prep['largo_tablero'],
+                    'margen_x': prep['margen_x'],
+                    'margen_y': prep['margen_y'],
+                    'desperdicio_sierra': prep['desperdicio_sierra'],
+                    'tapacanto_codigo': prep['tapacanto_codigo'],
+                    'tapacanto_nombre': prep['tapacanto_nombre'],
+                    # Parámetros del motor tal como llegaron: la misma tupla que arma la clave de
+                    # la caché, así reconstruir desde esta configuración da el mismo resultado
+                    **{k: config.get(k) for k in PARAMETROS_CONFIGURACION},
+                },
+                'piezas': prep['piezas'],
             }
+            # Insertar/reemplazar por índice de material
+            idx_um = max(0, int(material_index) - 1)
+            while len(materiales_cfg) <= idx_um:
+                materiales_cfg.append({})
+            materiales_cfg[idx_um] = mat_cfg_payload
+        cfg_agg = { 'materiales': materiales_cfg }
+        proyecto.configuracion = json.dumps(cfg_agg, ensure_ascii=False)
+    except Exception:
+        pass
+
+    # Incrementar versión y asignar nuevo ID público SOLO si hubo recalculo real en backend
+    # (no cuando todo proviene de layouts del frontend)
+    origen_frontend = all(r.get('origen') == 'frontend' for _, r, _ in items)
+    try:
+        logger.info(
+            'OPTIMIZAR_MATERIAL llamada: origenes=%s proyecto_id=%s version_pre=%s public_id_pre=%s materiales=%s will_recalc=%s',
+            ','.join(str(r.get('origen')) for _, r, _ in items),
+            proyecto.id,
+            getattr(proyecto, 'version', None),
+            getattr(proyecto, 'public_id', None),
+            len(items),
+            'YES' if not origen_frontend else 'NO'
+        )
+    except Exception:
+        pass
+    if not origen_frontend:
+        try:
+            proyecto.version = (proyecto.version or 0) + 1
+        except Exception:
+            proyecto.version = 1
+        try:
+            with fase('public_id'):
+                ultimo_pub = Proyecto.objects.exclude(public_id__isnull=True).order_by('-public_id').first()
+            next_public_id = (ultimo_pub.public_id + 1) if ultimo_pub and ultimo_pub.public_id and ultimo_pub.public_id >= 100 else 100
+        except Exception:
+            next_public_id = 100
+        proyecto.public_id = next_public_id
+    existente['folio_proyecto'] = str(proyecto.public_id)
+    existente['ultimo_folio'] = str(proyecto.public_id)
+    with fase('serializar'):
+        proyecto.resultado_optimizacion = json.dumps(existente)
+    proyecto.total_materiales = len(materiales)
+    proyecto.total_tableros = total_tableros
+    proyecto.total_piezas = total_piezas
+    proyecto.eficiencia_promedio = eficiencia_promedio
+    proyecto.estado = 'optimizado'
+    with fase('guardar'):
+        proyecto.save()
+    # Copia relacional del resultado (tablas del operador): sólo las piezas de los materiales
+    # recién optimizados vuelven a 'pendiente'; los demás conservan su estado de corte
+    nuevos = None if resetear else {
+        m for m, mat in enumerate(materiales_de(existente), 1) if any(mat is r for _, r, _ in items)
+    }
+    with fase('normalizar'):
+        sincronizar_resultado(proyecto, existente, nuevos=nuevos)
+    # Folio al historial (sólo se escriben los materiales que cambiaron)
+    with fase('historial'):
+        registrar_folio(proyecto, proyecto.public_id, materiales, total_tableros=total_tableros,
+                        total_piezas=total_piezas, eficiencia_promedio=eficiencia_promedio)
+
+    # Registrar ejecución y auditoría (en un savepoint: un fallo aquí no invalida lo guardado)
+    try:
+        with fase('registro'), transaction.atomic():
+            tiempo = sum(r.get('tiempo_optimizacion') or 0 for _, r, _ in items)
+            material_ids = [prep['material_id'] for prep, _, _ in items]
+            medidor = medidor_actual()
+            ejecucion = OptimizationRun.objects.create(
+                organizacion=proyecto.organizacion,
+                proyecto=proyecto,
+                run_by=usuario,
+                porcentaje_uso=eficiencia_promedio,
+                tiempo_ms=int(tiempo * 1000) if tiempo else None,
+                fases_ms=medidor.como_dict() if medidor else None,
+            )
+            if medidor:
+                medidor.ejecucion_id = ejecucion.id
+            AuditLog.objects.create(
+                actor=usuario,
+                organizacion=proyecto.organizacion,
+                verb='RUN_OPT',
+                target_model='Proyecto',
+                target_id=str(proyecto.id),
+                target_repr=proyecto.codigo,
+                changes={'material_id': material_ids[0]} if len(material_ids) == 1 else {'material_ids': material_ids}
+            )
+    except Exception:
+        pass
+    return existente
+
+def _respuesta_proyecto(proyecto):
+    """Campos del proyecto que acompañan la respuesta de una optimización."""
+    resp = {'proyecto_id': proyecto.id, 'estado_pdf': proyecto.estado_pdf or None}
+    # incluir ID actualizado (usamos clave 'folio' por compatibilidad del frontend)
+    try:
+        resp['folio'] = str(proyecto.public_id) if proyecto.public_id else f"{proyecto.correlativo}-{proyecto.version}"
+    except Exception:
+        pass
+    return resp
+
+def _ejecutar_optimizar_material(data, usuario, progreso=None):
+    """Núcleo de `optimizar_material`: optimiza (o toma el layout del frontend), persiste en el
+    proyecto y devuelve el dict de respuesta. Lo usan la vista y el worker de trabajos; los
+    errores se propagan al llamador. `progreso(porcentaje)` recibe el avance del motor.
+    """
+    with fase('preparar'):
+        prep = _preparar_material(data)
+    resultado = prep['resultado']
+    if resultado is None:
+        with fase('motor'):
+            resultado = _optimizar_material_backend(prep, data, progreso=progreso)
+    _completar_resultado_material(prep, resultado)
+
+    resp = {
+        'success': True,
+        'resultado': resultado
+    }
+    # Guardar/Acumular resultado si hay proyecto_id
+    if data.get('proyecto_id'):
+        proyecto = get_object_or_404(Proyecto, id=data['proyecto_id'])
+        existente = _guardar_resultados_proyecto(
+            proyecto, usuario, [(prep, resultado, data.get('material_index', 1))],
+            resetear=bool(data.get('resetear_resultado')),
+        )
+        # PDF sólo si la optimización fue realizada en backend (evitar duplicado en origen frontend).
+        # Por defecto se encola para el worker y se responde sin esperarlo (estado_pdf='pendiente').
+        if resultado.get('origen') != 'frontend':
             try:
-                if data.get('proyecto_id'):
-                    resp['proyecto_id'] = data.get('proyecto_id')
-                    # incluir ID actualizado (usamos clave 'folio' por compatibilidad del frontend)
-                    try:
-                        resp['folio'] = str(proyecto.public_id) if proyecto.public_id else f"{proyecto.correlativo}-{proyecto.version}"
-                    except Exception:
-                        pass
+                with fase('pdf'):
+                    _programar_pdf_proyecto(proyecto, usuario, existente)
             except Exception:
                 pass
-            return JsonResponse(resp)
+        resp.update(_respuesta_proyecto(proyecto))
+    return resp
+
+def _cerrar_fases(medidor):
+    """Al terminar la petición: completa `fases_ms` de la OptimizationRun registrada (se creó
+    antes de fases posteriores como el PDF) y deja los tiempos en el log."""
+    if medidor.ejecucion_id:
+        try:
+            OptimizationRun.objects.filter(id=medidor.ejecucion_id).update(fases_ms=medidor.como_dict())
+        except Exception:
+            pass
+    logger.info('OPTIMIZAR fases_ms run=%s %s', medidor.ejecucion_id, medidor.cabecera())
+
+def _respuesta_con_fases(resp, medidor):
+    """JsonResponse con los tiempos por fase en `X-Optimizador-Fases` (y en el cuerpo como
+    `fases_ms` con DEBUG activo)."""
+    from django.conf import settings
+    if settings.DEBUG:
+        resp['fases_ms'] = medidor.como_dict()
+    with fase('respuesta'):
+        response = JsonResponse(resp)
+    _cerrar_fases(medidor)
+    response['X-Optimizador-Fases'] = medidor.cabecera()
+    return response
+
+@login_required
+@csrf_exempt  
+def optimizar_material(request):
+    """Ejecuta la optimización del material"""
+    if request.method == 'POST':
+        try:
+            with medir_fases() as medidor:
+                with fase('json'):
+                    data = json.loads(request.body)
+                # Idempotencia: si viene desde frontend con tableros y firma igual a la última, devolver sin cambios
+                try:
+                    tableros_in = data.get('tableros')
+                    if isinstance(tableros_in, list) and tableros_in:
+                        # Construir firma estable
+                        with fase('firma_layout'):
+                            sig_parts = []
+                            for t in tableros_in[:50]:
+                                piezas_sig = []
+                                for p in (t.get('piezas') or [])[:1000]:
+                                    piezas_sig.append(f"{p.get('nombre','')}@{p.get('x')}:{p.get('y')}:{p.get('ancho')}x{p.get('largo') or p.get('alto')}:{int(bool(p.get('rotada')))}")
+                                sig_parts.append(f"T{t.get('numero')}|{','.join(piezas_sig)}")
+                            layout_signature = hashlib.sha256(('|'.join(sig_parts)).encode('utf-8')).hexdigest()
+                        last_sig = request.session.get('last_layout_signature')
+                        last_sig_ts = request.session.get('last_layout_sig_ts') or 0
+                        now_ts = time.time()
+                        if last_sig and last_sig == layout_signature and (now_ts - last_sig_ts) < 5:
+                            # Responder éxito sin recalcular ni actualizar folio/version
+                            return JsonResponse({'success': True, 'idempotent': True, 'mensaje': 'Layout repetido (omitido)', 'folio': None})
+                        request.session['last_layout_signature'] = layout_signature
+                        request.session['last_layout_sig_ts'] = now_ts
+                except Exception:
+                    pass
+
+                return _respuesta_con_fases(_ejecutar_optimizar_material(data, request.user), medidor)
             
         except Exception as e:
-            import traceback
-            print(f"Error en optimización: {str(e)}")
-            print(traceback.format_exc())
+            logger.exception('Error en optimización: %s', e)
             return JsonResponse({
                 'success': False,
                 'message': f'Error en la optimización: {str(e)}'
@@ -2333,6 +2362,286 @@ def optimizar_material(request):
     
     return JsonResponse({'success': False, 'message': 'Método no permitido'})
 
+def _optimizar_en_paralelo(tareas):
+    """Optimiza en backend varios materiales preparados (`tareas`: lista de (prep, data)) y
+    devuelve los resultados en el mismo orden. Los aciertos de caché se resuelven aquí y el resto
+    se reparte en procesos (hasta `procesos_maximos()`). Los modos incremental y portafolio (que ya usa sus
+    propios procesos) se ejecutan en este proceso, igual que todo si no hay procesos disponibles.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    resultados = [None] * len(tareas)
+    pendientes = []
+    for i, (prep, data) in enumerate(tareas):
+        if data.get('incremental') or prep['config'].get('modo') == 'portafolio':
+            continue
+        argumentos = _argumentos_motor(prep)
+        if not optimizer_cache.es_cacheable(argumentos[0]):
+            # Orden aleatorio sin semilla: se optimiza en paralelo pero no se guarda
+            pendientes.append((i, None))
+            continue
+        clave = optimizer_cache.clave_resultado(OptimizationEngine.VERSION, *argumentos[1:], argumentos[0])
+        resultado = optimizer_cache.obtener(clave)
+        if resultado is not None:
+            resultado['desde_cache'] = True
+            resultados[i] = resultado
+        else:
+            pendientes.append((i, clave))
+    if len(pendientes) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=procesos_maximos(len(pendientes))) as pool:
+                futuros = [(i, clave, pool.submit(ejecutar_configuracion, *_argumentos_motor(tareas[i][0])))
+                           for i, clave in pendientes]
+                for i, clave, futuro in futuros:
+                    try:
+                        resultados[i] = futuro.result()
+                        if clave:
+                            optimizer_cache.guardar(clave, resultados[i])
+                    except Exception:
+                        pass
+        except Exception:
+            pass
+    for i, (prep, data) in enumerate(tareas):
+        if resultados[i] is None:
+            resultados[i] = _optimizar_material_backend(prep, data)
+        resultados[i]['origen'] = 'backend'
+    return resultados
+
+@login_required
+@csrf_exempt
+def optimizar_proyecto(request):
+    """Optimiza todos los materiales de un proyecto en una sola llamada.
+
+    Cuerpo: {'proyecto_id', 'resetear_resultado'?, 'materiales': [{'material_index'?,
+    'configuracion_material', 'piezas', 'tableros'?, 'incremental'?}, ...]} (cada material con el
+    mismo formato que `optimizar_material`). Los materiales se optimizan en paralelo y el proyecto
+    se guarda una sola vez, en una transacción: un folio, una OptimizationRun y un PDF.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Método no permitido'})
+    try:
+        with medir_fases() as medidor:
+            with fase('json'):
+                data = json.loads(request.body)
+            proyecto_id = data.get('proyecto_id')
+            materiales_in = data.get('materiales')
+            if not proyecto_id or not isinstance(materiales_in, list) or not materiales_in:
+                return JsonResponse({'success': False, 'message': 'Se requiere proyecto_id y una lista de materiales'})
+            get_object_or_404(Proyecto, id=proyecto_id)
+
+            tareas = []
+            for n, m in enumerate(materiales_in, 1):
+                datos = dict(m, proyecto_id=proyecto_id, material_index=m.get('material_index', n),
+                             resetear_resultado=data.get('resetear_resultado'))
+                with fase('preparar'):
+                    tareas.append((_preparar_material(datos), datos))
+            backend = [(prep, datos) for prep, datos in tareas if prep['resultado'] is None]
+            with fase('motor'):
+                resultados = _optimizar_en_paralelo(backend)
+            for (prep, _), resultado in zip(backend, resultados):
+                prep['resultado'] = resultado
+            items = []
+            for prep, datos in tareas:
+                items.append((prep, _completar_resultado_material(prep, prep['resultado']), datos['material_index']))
+
+            with transaction.atomic():
+                proyecto = get_object_or_404(Proyecto.objects.select_for_update(), id=proyecto_id)
+                existente = _guardar_resultados_proyecto(proyecto, request.user, items,
+                                                         resetear=bool(data.get('resetear_resultado')))
+            if any(r.get('origen') != 'frontend' for _, r, _ in items):
+                try:
+                    with fase('pdf'):
+                        _programar_pdf_proyecto(proyecto, request.user, existente)
+                except Exception:
+                    pass
+            resp = {
+                'success': True,
+                'resultados': [r for _, r, _ in items],
+                'total_tableros': existente.get('total_tableros'),
+                'total_piezas': existente.get('total_piezas'),
+                'eficiencia_promedio': existente.get('eficiencia_promedio'),
+            }
+            resp.update(_respuesta_proyecto(proyecto))
+            return _respuesta_con_fases(resp, medidor)
+    except Exception as e:
+        logger.exception('Error en optimización de proyecto: %s', e)
+        return JsonResponse({
+            'success': False,
+            'message': f'Error en la optimización: {str(e)}'
+        })
+
+# --- Trabajos de optimización en segundo plano ---------------------------------------------
+# La vista sólo encola un OptimizationJob; el worker (`manage.py optimizador_worker`) lo toma,
+# ejecuta `_ejecutar_optimizar_material` y va guardando el progreso. El frontend consulta
+# estado y resultado por el uuid del trabajo.
+
+def recuperar_jobs_vencidos():
+    """Trabajos 'en_proceso' cuyo worker dejó de dar latido (caído o redesplegado): vuelven a
+    'pendiente' o, agotados los intentos, quedan en error. Devuelve (reencolados, fallidos)."""
+    from django.conf import settings
+    from core.models import OptimizationJob
+    ahora = timezone.now()
+    corte = ahora - timedelta(seconds=getattr(settings, 'OPTIMIZADOR_JOB_VENCIDO', 120))
+    max_intentos = getattr(settings, 'OPTIMIZADOR_JOB_MAX_INTENTOS', 3)
+    vencidos = OptimizationJob.objects.filter(
+        Q(latido__lt=corte) | Q(latido__isnull=True, iniciado__lt=corte), estado='en_proceso',
+    )
+    reencolados = vencidos.filter(intentos__lt=max_intentos).update(
+        estado='pendiente', progreso=0, iniciado=None, latido=None,
+    )
+    fallidos = list(vencidos.values_list('id', 'proyecto_id', 'tipo'))
+    if fallidos:
+        OptimizationJob.objects.filter(id__in=[i for i, _, _ in fallidos], estado='en_proceso').update(
+            estado='error', finalizado=ahora,
+            error=f'El worker dejó de responder ({max_intentos} intentos)',
+        )
+        Proyecto.objects.filter(id__in=[p for _, p, tipo in fallidos if tipo == 'pdf' and p],
+                                estado_pdf='pendiente').update(estado_pdf='error')
+    return reencolados, len(fallidos)
+
+def reclamar_siguiente_job(tipos=None):
+    """Toma el trabajo pendiente más antiguo (de `tipos`, si se indican). El cambio de estado es
+    un UPDATE condicional, así que con varios workers cada trabajo lo toma uno solo (no requiere
+    SELECT ... FOR UPDATE). Antes se reencolan los trabajos de workers caídos."""
+    from core.models import OptimizationJob
+    recuperar_jobs_vencidos()
+    pendientes = OptimizationJob.objects.filter(estado='pendiente')
+    if tipos:
+        pendientes = pendientes.filter(tipo__in=tipos)
+    for job_id in pendientes.order_by('creado').values_list('id', flat=True)[:10]:
+        ahora = timezone.now()
+        tomado = OptimizationJob.objects.filter(id=job_id, estado='pendiente').update(
+            estado='en_proceso', iniciado=ahora, latido=ahora, progreso=0, intentos=F('intentos') + 1
+        )
+        if tomado:
+            return OptimizationJob.objects.get(id=job_id)
+    return None
+
+def _latir_job(job_id, detener, intervalo):
+    """Hilo del worker: marca el latido del trabajo cada `intervalo` segundos hasta `detener`."""
+    from django.db import connection
+    from core.models import OptimizationJob
+    try:
+        while not detener.wait(intervalo):
+            OptimizationJob.objects.filter(id=job_id, estado='en_proceso').update(latido=timezone.now())
+    except Exception:
+        logger.exception('Latido del job %s', job_id)
+    finally:
+        connection.close()
+
+def procesar_job(job):
+    """Ejecuta un trabajo ya reclamado y deja su estado final (completado/error). Mientras corre,
+    un hilo mantiene el latido del trabajo; si entretanto se lo declaró vencido y otro worker lo
+    tomó, el resultado de este intento se descarta."""
+    import threading
+    from django.conf import settings
+    from core.models import OptimizationJob
+    ultimo = {'pct': 0}
+
+    def progreso(pct):
+        # Escala del motor (0-100) a 0-90 %; el resto corresponde a persistencia.
+        # Sólo se escribe en BD cuando avanza al menos 5 puntos.
+        pct = min(90, int(pct) * 90 // 100)
+        if pct - ultimo['pct'] >= 5:
+            ultimo['pct'] = pct
+            OptimizationJob.objects.filter(id=job.id).update(progreso=pct, latido=timezone.now())
+
+    detener = threading.Event()
+    latido = threading.Thread(target=_latir_job, daemon=True,
+                              args=(job.id, detener, getattr(settings, 'OPTIMIZADOR_JOB_LATIDO', 15)))
+    latido.start()
+    try:
+        if job.tipo == 'pdf':
+            proyecto = Proyecto.objects.get(id=job.proyecto_id)
+            rel_path = (job.payload or {}).get('archivo_pdf')
+            if proyecto.archivo_pdf != rel_path:
+                # Una optimización posterior ya encoló el PDF de su propio folio
+                job.resultado = {'success': True, 'omitido': True}
+            else:
+                # Si otro proceso ya lo generó (exportar_pdf en línea) no se repite
+                if proyecto.estado_pdf != 'listo':
+                    _renderizar_pdf_proyecto(proyecto, rel_path=rel_path, solo_si_vigente=True)
+                job.resultado = {'success': True, 'archivo_pdf': rel_path}
+        else:
+            with medir_fases() as medidor:
+                resp = _ejecutar_optimizar_material(job.payload or {}, job.usuario, progreso=progreso)
+                _cerrar_fases(medidor)
+            job.resultado = json.loads(json.dumps(resp, default=str))
+        job.estado = 'completado'
+        job.progreso = 100
+    except Exception as e:
+        job.estado = 'error'
+        job.error = str(e) or e.__class__.__name__
+        if job.tipo == 'pdf' and job.proyecto_id:
+            Proyecto.objects.filter(id=job.proyecto_id, estado_pdf='pendiente').update(estado_pdf='error')
+    finally:
+        detener.set()
+        latido.join()
+    job.finalizado = timezone.now()
+    # Sólo si sigue siendo este intento (no se reencoló por vencido mientras tanto)
+    OptimizationJob.objects.filter(id=job.id, estado='en_proceso', intentos=job.intentos).update(
+        resultado=job.resultado, estado=job.estado, progreso=job.progreso, error=job.error,
+        finalizado=job.finalizado,
+    )
+    return job
+
+def _job_del_usuario(request, job_uuid):
+    from core.models import OptimizationJob
+    job = get_object_or_404(OptimizationJob, uuid=job_uuid)
+    if job.usuario_id != request.user.id and not request.user.is_superuser:
+        return None
+    return job
+
+def _job_estado_dict(job):
+    return {
+        'job_id': str(job.uuid),
+        'estado': job.estado,
+        'progreso': job.progreso,
+        'error': job.error or None,
+        'creado': job.creado.isoformat() if job.creado else None,
+        'iniciado': job.iniciado.isoformat() if job.iniciado else None,
+        'finalizado': job.finalizado.isoformat() if job.finalizado else None,
+    }
+
+@login_required
+@csrf_exempt
+@require_http_methods(["POST"])
+def optimizacion_job_crear(request):
+    """Encola una optimización (mismo payload que `optimizar_material`) y responde de inmediato."""
+    from core.models import OptimizationJob
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict) or not data.get('configuracion_material'):
+            return JsonResponse({'success': False, 'message': 'Falta configuracion_material'}, status=400)
+        proyecto = None
+        if data.get('proyecto_id'):
+            proyecto = get_object_or_404(Proyecto, id=data['proyecto_id'])
+        job = OptimizationJob.objects.create(usuario=request.user, proyecto=proyecto, payload=data)
+        resp = {'success': True, **_job_estado_dict(job)}
+        resp['estado_url'] = reverse('optimizacion_job_estado', args=[job.uuid])
+        resp['resultado_url'] = reverse('optimizacion_job_resultado', args=[job.uuid])
+        return JsonResponse(resp, status=202)
+    except Exception as e:
+        return JsonResponse({'success': False, 'message': f'No se pudo encolar la optimización: {str(e)}'}, status=400)
+
+@login_required
+def optimizacion_job_estado(request, job_uuid):
+    job = _job_del_usuario(request, job_uuid)
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'Sin permiso'}, status=403)
+    return JsonResponse({'success': True, **_job_estado_dict(job)})
+
+@login_required
+def optimizacion_job_resultado(request, job_uuid):
+    """Respuesta de `optimizar_material` del trabajo; 202 mientras no termina."""
+    job = _job_del_usuario(request, job_uuid)
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'Sin permiso'}, status=403)
+    if job.estado == 'error':
+        return JsonResponse({'success': False, 'message': f'Error en la optimización: {job.error}', **_job_estado_dict(job)})
+    if job.estado != 'completado':
+        return JsonResponse({'success': False, 'message': 'La optimización aún no termina', **_job_estado_dict(job)}, status=202)
+    return JsonResponse(job.resultado or {})
+
 @login_required
 def obtener_material_info(request, material_id):
     """Obtiene información detallada de un material"""
@@ -2359,25 +2668,67 @@ def obtener_material_info(request, material_id):
             'message': f'Error al obtener información del material: {str(e)}'
         })
 
+def _seleccionar_material(materiales, request):
+    """Material pedido con `?material=<material_index>` (o posición 1..n si no trae índice)."""
+    try:
+        indice = int(request.GET.get('material'))
+    except (TypeError, ValueError):
+        raise ValueError('Parámetro material inválido')
+    for n, m in enumerate(materiales or [], 1):
+        if isinstance(m, dict) and (m.get('material_index') or n) == indice:
+            return m
+    raise LookupError(f'No existe el material {indice}')
+
+def _seleccionar_resultado(resultado, request):
+    """Aplica los selectores de la exportación de salida. Devuelve (objeto, sufijo del archivo).
+
+    - `?seleccion=actual`: sólo el resultado vigente, sin el `historial` embebido (proyectos
+      aún no migrados; los folios se piden a `historial_folio`);
+    - `?material=<n>`: un material; con `&tablero=<n>` sólo ese tablero.
+    """
+    if request.GET.get('material'):
+        material = _seleccionar_material(resultado.get('materiales'), request)
+        sufijo = f"_material{request.GET['material']}"
+        if request.GET.get('tablero'):
+            numero = request.GET['tablero']
+            for n, t in enumerate(material.get('tableros') or [], 1):
+                if str(t.get('id') or t.get('numero') or n) == numero:
+                    return t, f"{sufijo}_tablero{numero}"
+            raise LookupError(f'No existe el tablero {numero}')
+        return material, sufijo
+    if request.GET.get('tablero'):
+        raise ValueError('El parámetro tablero requiere material')
+    if request.GET.get('seleccion') == 'actual':
+        return {k: v for k, v in resultado.items() if k != 'historial'}, '_actual'
+    return resultado, ''
+
 @login_required
 def exportar_json_entrada(request, proyecto_id):
-    """Exporta la configuración de entrada en formato JSON"""
+    """Exporta la configuración de entrada en formato JSON (streaming; `?material=<n>` exporta
+    un solo material y `?gzip=1` la comprime)."""
     try:
-        proyecto = get_object_or_404(Proyecto, id=proyecto_id)
+        proyecto = get_object_or_404(Proyecto.objects.only('id', 'nombre', 'configuracion'), id=proyecto_id)
         
         if not proyecto.configuracion:
             messages.error(request, 'No hay configuración para exportar')
             return redirect('optimizador_home')
         
         configuracion = json.loads(proyecto.configuracion)
+        sufijo = ''
+        if request.GET.get('material'):
+            materiales = configuracion.get('materiales') if isinstance(configuracion, dict) else None
+            try:
+                configuracion = _seleccionar_material(materiales, request)
+            except (LookupError, ValueError) as e:
+                return HttpResponse(str(e), status=404 if isinstance(e, LookupError) else 400,
+                                    content_type='text/plain; charset=utf-8')
+            sufijo = f"_material{request.GET['material']}"
         
-        response = HttpResponse(
-            json.dumps(configuracion, indent=2, ensure_ascii=False),
-            content_type='application/json; charset=utf-8'
+        return respuesta_json_streaming(
+            configuracion,
+            f'config_{proyecto.nombre}{sufijo}_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+            comprimir=request.GET.get('gzip') in ('1', 'true'),
         )
-        response['Content-Disposition'] = f'attachment; filename="config_{proyecto.nombre}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json"'
-        
-        return response
         
     except Exception as e:
         messages.error(request, f'Error al exportar configuración: {str(e)}')
@@ -2385,28 +2736,64 @@ def exportar_json_entrada(request, proyecto_id):
 
 @login_required  
 def exportar_json_salida(request, proyecto_id):
-    """Exporta el resultado de optimización en formato JSON"""
+    """Exporta el resultado de optimización en formato JSON, en streaming para no duplicar en
+    memoria resultados con historial grande. Selectores en `_seleccionar_resultado`; `?gzip=1`
+    descarga el archivo comprimido."""
     try:
-        proyecto = get_object_or_404(Proyecto, id=proyecto_id)
+        proyecto = get_object_or_404(Proyecto.objects.only('id', 'nombre', 'resultado_optimizacion'), id=proyecto_id)
         
         if not proyecto.resultado_optimizacion:
             # No redirigir al optimizador; devolver mensaje de error simple
             return HttpResponse('No hay resultado de optimización para exportar', status=400, content_type='text/plain; charset=utf-8')
         
-        resultado = json.loads(proyecto.resultado_optimizacion)
+        # Con los estados de corte de las piezas (tablas normalizadas)
+        resultado = resultado_compatible(proyecto, json.loads(proyecto.resultado_optimizacion))
+        # El texto ya no se necesita: liberar antes de empezar a enviar
+        proyecto.resultado_optimizacion = None
+        try:
+            seleccion, sufijo = _seleccionar_resultado(resultado, request)
+        except (LookupError, ValueError) as e:
+            return HttpResponse(str(e), status=404 if isinstance(e, LookupError) else 400,
+                                content_type='text/plain; charset=utf-8')
         
-        response = HttpResponse(
-            json.dumps(resultado, indent=2, ensure_ascii=False),
-            content_type='application/json; charset=utf-8'
+        return respuesta_json_streaming(
+            seleccion,
+            f'resultado_{proyecto.nombre}{sufijo}_{datetime.now().strftime("%Y%m%d_%H%M%S")}',
+            comprimir=request.GET.get('gzip') in ('1', 'true'),
         )
-        response['Content-Disposition'] = f'attachment; filename="resultado_{proyecto.nombre}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json"'
-        
-        return response
         
     except Exception as e:
         messages.error(request, f'Error al exportar resultado: {str(e)}')
         return redirect('optimizador_home')
 
+@login_required
+def historial_proyecto(request, proyecto_id):
+    """Folios del historial de optimizaciones del proyecto (más reciente primero), sin materiales."""
+    try:
+        proyecto = get_object_or_404(Proyecto.objects.only('id', 'resultado_optimizacion'), id=proyecto_id)
+        asegurar_historial(proyecto)
+        return JsonResponse({'success': True, 'folios': listar_folios(proyecto)})
+    except Exception as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+@login_required
+def historial_folio(request, proyecto_id, folio):
+    """Reconstruye el snapshot de un folio pasado (materiales, tableros y totales) desde el
+    historial. Si el folio se repite devuelve el más reciente; `?entrada=<id>` elige uno."""
+    try:
+        proyecto = get_object_or_404(Proyecto.objects.only('id', 'resultado_optimizacion'), id=proyecto_id)
+        asegurar_historial(proyecto)
+        try:
+            entrada_id = int(request.GET['entrada']) if request.GET.get('entrada') else None
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Parámetro entrada inválido'}, status=400)
+        snapshot = reconstruir_folio(proyecto, folio, entrada_id)
+        if snapshot is None:
+            return JsonResponse({'success': False, 'message': f'No existe el folio {folio} en el historial'}, status=404)
+        return JsonResponse({'success': True, 'folio': snapshot})
+    except Exception as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
 @login_required
 def exportar_pdf(request, proyecto_id):
     """[LEGACY] Generación/regeneración de PDF con layout pesado.
@@ -2417,7 +2804,6 @@ def exportar_pdf(request, proyecto_id):
         return JsonResponse({'success': False, 'message': 'Ruta legacy PDF deshabilitada. Use snapshot.'}, status=410)
     proyecto = get_object_or_404(Proyecto, id=proyecto_id)
     from django.conf import settings
-    import os
 
     # Leer flags/opciones de query
     q = request.GET
@@ -2445,14 +2831,17 @@ def exportar_pdf(request, proyecto_id):
         'kerf_scale': _get_float('kerf_scale', None),
     }
 
+    # PDF encolado tras la última optimización: esperar brevemente al worker; si no alcanza,
+    # se genera en línea más abajo
+    if proyecto.estado_pdf == 'pendiente' and not force_regen:
+        _esperar_pdf_pendiente(proyecto, float(getattr(settings, 'OPTIMIZADOR_PDF_ESPERA', 3)))
+
     # Priorizar servir el PDF del ID del proyecto si existe (rápido y consistente) salvo force=1
     try:
         folio_actual = str(proyecto.public_id) if proyecto.public_id else f"{proyecto.correlativo}-{proyecto.version}"
     except Exception:
         folio_actual = None
 
-    from django.conf import settings
-    import os
     if folio_actual and not force_regen:
         rel_dir = f"proyectos/{proyecto.id}"
         # Primero buscar con cliente en nombre
@@ -2486,8 +2875,6 @@ def exportar_pdf(request, proyecto_id):
         resultado = json.loads(proyecto.resultado_optimizacion) if proyecto.resultado_optimizacion else {}
     except Exception:
         resultado = {}
-    pdf_bytes = _pdf_from_result(proyecto, resultado, opts=pdf_opts)
-
     # Guardar como PDF del ID/folio actual (si se pudo obtener)
     rel_dir = f"proyectos/{proyecto.id}"
     if folio_actual:
@@ -2503,13 +2890,7 @@ def exportar_pdf(request, proyecto_id):
         except Exception:
             cliente_slug = 'cliente'
         rel_path = f"{rel_dir}/optimizacion_{proyecto.codigo}_{cliente_slug}_{ts}.pdf"
-    abs_dir = os.path.join(settings.MEDIA_ROOT, rel_dir)
-    os.makedirs(abs_dir, exist_ok=True)
-    abs_path = os.path.join(settings.MEDIA_ROOT, rel_path)
-    with open(abs_path, 'wb') as f:
-        f.write(pdf_bytes)
-    proyecto.archivo_pdf = rel_path
-    proyecto.save(update_fields=['archivo_pdf'])
+    rel_path, pdf_bytes = _renderizar_pdf_proyecto(proyecto, resultado, opts=pdf_opts, rel_path=rel_path)
 
     resp = HttpResponse(pdf_bytes, content_type='application/pdf')
     resp['Content-Disposition'] = f'inline; filename="{os.path.basename(rel_path)}"'
@@ -2703,6 +3084,7 @@ def guardar_layout_manual(request):
         return JsonResponse({'success': False, 'message': 'No hay tableros para actualizar en el material seleccionado'}, status=400)
 
     # Aplicar updates por tablero
+    cambios = {}
     for upd in updates:
         try:
             tnum = int(upd.get('tablero_num') or 1)
@@ -2736,6 +3118,9 @@ def guardar_layout_manual(request):
             # Bandera de rotación
             if 'rotada' in pu:
                 p['rotada'] = bool(pu.get('rotada'))
+            cambios[(mat_idx + 1, t_index + 1, idx + 1)] = {
+                'x': p['x'], 'y': p['y'], 'ancho': p['ancho'], 'largo': p['largo'], 'rotada': bool(p.get('rotada')),
+            }
 
     # Persistir cambios
     if 'materiales' in resultado:
@@ -2745,6 +3130,9 @@ def guardar_layout_manual(request):
 
     proyecto.resultado_optimizacion = json.dumps(resultado, ensure_ascii=False)
     proyecto.save(update_fields=['resultado_optimizacion'])
+    # Tablas normalizadas: sólo las filas de las piezas movidas (conservan su estado de corte)
+    actualizar_piezas(proyecto, cambios)
+    guardar_vista_operador(proyecto, resultado)
 
     return JsonResponse({'success': True, 'resultado': resultado})
 
@@ -2791,85 +3179,18 @@ def forzar_optimizacion(request, proyecto_id:int):
     except Exception:
         pass
 
-    # Intentar construir desde configuración (soporta 1 o varios materiales)
+    # Construir desde configuración (1 o varios materiales): _optimizar_desde_conf_mat por material
+    if not proyecto.configuracion:
+        return JsonResponse({'success': False, 'message': 'El proyecto no tiene configuración guardada para optimizar.'}, status=400)
     try:
-        if not proyecto.configuracion:
-            return JsonResponse({'success': False, 'message': 'El proyecto no tiene configuración guardada para optimizar.'}, status=400)
-        cfg = json.loads(proyecto.configuracion) if isinstance(proyecto.configuracion, str) else proyecto.configuracion
-
-        def optimizar_desde(conf_mat, piezas_in):
-            material_id = (conf_mat or {}).get('material_id')
-            if not (conf_mat and piezas_in and material_id):
-                return None
-            material = get_object_or_404(Material, id=material_id)
-            ancho_tablero = conf_mat.get('ancho_custom') or material.ancho
-            largo_tablero = conf_mat.get('largo_custom') or material.largo
-            margen_x = conf_mat.get('margen_x', 0)
-            margen_y = conf_mat.get('margen_y', 0)
-            desperdicio_sierra = conf_mat.get('desperdicio_sierra', 3)
-            tapacanto_codigo = conf_mat.get('tapacanto_codigo', '')
-            tapacanto_nombre = conf_mat.get('tapacanto_nombre', '')
-            engine = OptimizationEngine(ancho_tablero, largo_tablero, margen_x, margen_y, desperdicio_sierra)
-            piezas_proc = []
-            for p in piezas_in:
-                piezas_proc.append({
-                    'nombre': p['nombre'],
-                    'ancho': p['ancho'],
-                    'largo': p['largo'],
-                    'cantidad': p.get('cantidad', 1),
-                    'veta_libre': p.get('veta_libre', False),
-                    'tapacantos': p.get('tapacantos', {}) or {}
-                })
-            r = engine.optimizar_piezas(piezas_proc)
-            r['entrada'] = piezas_proc
-            r['material'] = {
-                'nombre': material.nombre,
-                'codigo': material.codigo,
-                'ancho_original': material.ancho,
-                'largo_original': material.largo,
-                'ancho_usado': ancho_tablero,
-                'largo_usado': largo_tablero
-            }
-            r['config'] = {'margen_x': margen_x, 'margen_y': margen_y, 'kerf': desperdicio_sierra}
-            r['tapacanto'] = { 'codigo': tapacanto_codigo, 'nombre': tapacanto_nombre }
-            return r
-
-        materiales = []
-        if isinstance(cfg, dict) and isinstance(cfg.get('materiales'), list):
-            for mcfg in cfg['materiales']:
-                conf_mat = mcfg.get('configuracion_material') or mcfg.get('config')
-                piezas_in = mcfg.get('piezas') or mcfg.get('entrada')
-                r = optimizar_desde(conf_mat, piezas_in)
-                if r: materiales.append(r)
-        else:
-            conf_mat = cfg.get('configuracion_material') or cfg.get('config')
-            piezas_in = cfg.get('piezas') or cfg.get('entrada')
-            r = optimizar_desde(conf_mat, piezas_in)
-            if r: materiales.append(r)
-
-        if not materiales:
+        resultado_persist = _resultado_desde_configuracion(proyecto)
+        if not resultado_persist:
             return JsonResponse({'success': False, 'message': 'No hay configuración suficiente (material y piezas) para optimizar.'}, status=400)
-
-        total_tableros = sum(len(m.get('tableros', [])) for m in materiales)
-        total_piezas = sum(sum(len(t.get('piezas', [])) for t in m.get('tableros', [])) for m in materiales)
-        eficiencias = [m.get('eficiencia') or m.get('eficiencia_promedio') for m in materiales if m]
-        eficiencia_promedio = sum(e for e in eficiencias if e) / max(1, len([e for e in eficiencias if e]))
-        folio = f"OPT-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        resultado_persist = {
-            'materiales': materiales,
-            'total_tableros': total_tableros,
-            'total_piezas': total_piezas,
-            'eficiencia_promedio': eficiencia_promedio,
-            'ultimo_folio': folio,
-            'historial': [{
-                'folio': folio,
-                'fecha': datetime.now().isoformat(),
-                'materiales': materiales,
-                'total_tableros': total_tableros,
-                'total_piezas': total_piezas,
-                'eficiencia_promedio': eficiencia_promedio,
-            }]
-        }
+        materiales = resultado_persist['materiales']
+        total_tableros = resultado_persist['total_tableros']
+        total_piezas = resultado_persist['total_piezas']
+        eficiencia_promedio = resultado_persist['eficiencia_promedio']
+        folio = resultado_persist['ultimo_folio']
         proyecto.resultado_optimizacion = json.dumps(resultado_persist, ensure_ascii=False)
         proyecto.total_materiales = len(materiales)
         proyecto.total_tableros = total_tableros
@@ -2877,12 +3198,16 @@ def forzar_optimizacion(request, proyecto_id:int):
         proyecto.eficiencia_promedio = eficiencia_promedio
         proyecto.estado = 'optimizado'
         proyecto.save()
+        sincronizar_resultado(proyecto, resultado_persist)
+        registrar_folio(proyecto, folio, materiales, total_tableros=total_tableros,
+                        total_piezas=total_piezas, eficiencia_promedio=eficiencia_promedio)
 
         return JsonResponse({'success': True, 'message': 'Optimización generada y guardada', 'resumen': {
             'materiales': len(materiales), 'tableros': total_tableros, 'piezas': total_piezas, 'eficiencia': eficiencia_promedio, 'folio': folio
         }})
 
     except Exception as e:
+        logger.exception('Error al forzar la optimización del proyecto %s', proyecto_id)
         return JsonResponse({'success': False, 'message': f'Error al optimizar: {str(e)}'}, status=500)
 
 def js_test(request):
@@ -90,6 +90,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'WowDash.middleware.RequireLoginMiddleware',
     'WowDash.middleware.NoCacheMiddleware',
+    # Cabecera Server-Timing (total, SQL, render, fases) y log de peticiones lentas
+    'core.middleware.ServerTimingMiddleware',
     # Middleware para exponer la request/usuario actual a señales (audit)
     'core.middleware.RequestUserMiddleware',
     # Aislar flujo de autoservicio
@@ -178,6 +180,83 @@ else:
                 }
             }
 
+# Caché
+# 'optimizador_local' (LRU en memoria por proceso) va delante de 'optimizador' (persistente,
+# compartida por los workers de gunicorn): ver core/optimizer_cache.py.
+# OPTIMIZER_CACHE_BACKEND=db usa la tabla 'optimizador_cache' (crear con `manage.py createcachetable`).
+if os.getenv('OPTIMIZER_CACHE_BACKEND', 'file').lower() == 'db':
+    _optimizador_cache = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'optimizador_cache',
+    }
+else:
+    _optimizador_cache = {
+        # Crea el directorio en la primera escritura, no al importar settings.
+        'BACKEND': 'core.archivos_locales.FileBasedCachePerezosa',
+        'LOCATION': os.getenv('OPTIMIZER_CACHE_DIR', str(BASE_DIR / 'cache' / 'optimizador')),
+    }
+_optimizador_cache.update({
+    'TIMEOUT': 60 * 60 * 24 * 30,
+    'OPTIONS': {'MAX_ENTRIES': int(os.getenv('OPTIMIZER_CACHE_MAX', '2000'))},
+})
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'optimizador_local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'optimizador-local',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 64},
+    },
+    'optimizador': _optimizador_cache,
+}
+
+# PDF de optimización: lo genera el worker (`manage.py optimizador_worker`) después de responder.
+# exportar_pdf espera hasta OPTIMIZADOR_PDF_ESPERA segundos y si no está listo lo genera en línea.
+OPTIMIZADOR_PDF_DIFERIDO = os.getenv('OPTIMIZADOR_PDF_DIFERIDO', '1').lower() in ('1', 'true', 'yes', 'y', 'on')
+OPTIMIZADOR_PDF_ESPERA = float(os.getenv('OPTIMIZADOR_PDF_ESPERA', '3'))
+
+# Trabajos del worker: mientras procesa uno, el worker actualiza su latido cada
+# OPTIMIZADOR_JOB_LATIDO segundos. Un trabajo 'en_proceso' sin latido durante
+# OPTIMIZADOR_JOB_VENCIDO segundos (worker caído o redesplegado) se vuelve a encolar, hasta
+# OPTIMIZADOR_JOB_MAX_INTENTOS intentos; después queda en error.
+OPTIMIZADOR_JOB_LATIDO = float(os.getenv('OPTIMIZADOR_JOB_LATIDO', '15'))
+OPTIMIZADOR_JOB_VENCIDO = float(os.getenv('OPTIMIZADOR_JOB_VENCIDO', '120'))
+OPTIMIZADOR_JOB_MAX_INTENTOS = int(os.getenv('OPTIMIZADOR_JOB_MAX_INTENTOS', '3'))
+
+# Latencia por petición (core.middleware.ServerTimingMiddleware): cabecera Server-Timing en todas
+# las respuestas y log rotativo de las que tardan SOLICITUD_LENTA_MS o más.
+SERVER_TIMING_ACTIVO = os.getenv('SERVER_TIMING_ACTIVO', '1').lower() in ('1', 'true', 'yes', 'y', 'on')
+SOLICITUD_LENTA_MS = float(os.getenv('SOLICITUD_LENTA_MS', '1000'))
+# El directorio y el archivo se crean con la primera solicitud lenta registrada.
+LOGS_DIR = Path(os.getenv('LOGS_DIR', str(BASE_DIR / 'logs')))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'solicitudes_lentas': {
+            'class': 'core.archivos_locales.RotatingFileHandlerPerezoso',
+            'filename': str(LOGS_DIR / 'solicitudes_lentas.log'),
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'core.solicitudes_lentas': {
+            'handlers': ['solicitudes_lentas'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -104,9 +104,15 @@ urlpatterns = [
     path('optimizador-clean/', optimizer_views.optimizador_clean, name='optimizador_clean'),  # Optimizador limpio
     path('optimizador/crear-proyecto/', optimizer_views.crear_proyecto_optimizacion, name='crear_proyecto_optimizacion'),
     path('optimizador/optimizar/', optimizer_views.optimizar_material, name='optimizar_material'),
+    path('optimizador/optimizar-proyecto/', optimizer_views.optimizar_proyecto, name='optimizar_proyecto'),
+    path('optimizador/jobs/', optimizer_views.optimizacion_job_crear, name='optimizacion_job_crear'),
+    path('optimizador/jobs/<uuid:job_uuid>/', optimizer_views.optimizacion_job_estado, name='optimizacion_job_estado'),
+    path('optimizador/jobs/<uuid:job_uuid>/resultado/', optimizer_views.optimizacion_job_resultado, name='optimizacion_job_resultado'),
     path('optimizador/material-info/<int:material_id>/', optimizer_views.obtener_material_info, name='obtener_material_info'),
     path('optimizador/exportar-entrada/<int:proyecto_id>/', optimizer_views.exportar_json_entrada, name='exportar_json_entrada'),
     path('optimizador/exportar-salida/<int:proyecto_id>/', optimizer_views.exportar_json_salida, name='exportar_json_salida'),
+    path('optimizador/historial/<int:proyecto_id>/', optimizer_views.historial_proyecto, name='historial_proyecto'),
+    path('optimizador/historial/<int:proyecto_id>/<str:folio>/', optimizer_views.historial_folio, name='historial_folio'),
         path('optimizador/forzar-optimizacion/<int:proyecto_id>/', optimizer_views.forzar_optimizacion, name='forzar_optimizacion'),
     # Ruta legacy exportar_pdf eliminada (usar exportar_pdf_snapshot / exportar_pdf_snapshot_cached)
     # Nuevas rutas PDF rápidas (snapshot HTML)
@@ -163,6 +169,7 @@ urlpatterns = [
     path('api/operador/proyectos', api_views.operador_proyectos_api, name='api_operador_proyectos'),
     path('api/operador/proyectos/<int:proyecto_id>', api_views.operador_proyecto_detalle_api, name='api_operador_proyecto_detalle'),
     path('api/operador/proyectos/<int:proyecto_id>/estado', api_views.operador_proyecto_estado_api, name='api_operador_proyecto_estado'),
+    path('api/operador/proyectos/<int:proyecto_id>/piezas', api_views.operador_piezas_estado_api, name='api_operador_piezas_estado'),
     path('api/operador/proyectos/<int:proyecto_id>/piezas/marcar-todas', api_views.operador_proyecto_marcar_todas_cortadas_api, name='api_operador_proyecto_marcar_todas'),
     path('api/operador/proyectos/<int:proyecto_id>/piezas/<str:pieza_id>', api_views.operador_pieza_estado_api, name='api_operador_pieza_estado'),
     path('api/operador/proyectos/<int:proyecto_id>/completar', api_views.operador_proyecto_completar_api, name='api_operador_proyecto_completar'),
@@ -0,0 +1,31 @@
+"""Handler de logging y backend de caché en disco que crean su directorio al escribir.
+
+Los de Django/stdlib crean el directorio (y abren el archivo de log) al configurarse, o sea
+en cada `manage.py` que importa settings, aunque nunca escriban nada. Estos lo posponen a la
+primera escritura. Este módulo no importa modelos: lo cargan LOGGING y CACHES.
+"""
+import os
+from logging.handlers import RotatingFileHandler
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class RotatingFileHandlerPerezoso(RotatingFileHandler):
+    """RotatingFileHandler que abre el archivo (y crea su directorio) en el primer registro."""
+
+    def __init__(self, filename, *args, **kwargs):
+        kwargs['delay'] = True
+        super().__init__(filename, *args, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class FileBasedCachePerezosa(FileBasedCache):
+    """FileBasedCache sin crear el directorio al instanciarse: `set` ya lo crea si falta y las
+    lecturas tratan el directorio ausente como caché vacía."""
+
+    def __init__(self, dir, params):
+        super(FileBasedCache, self).__init__(params)
+        self._dir = os.path.abspath(dir)
@@ -0,0 +1,68 @@
+"""Exportación JSON en streaming para resultados grandes.
+
+`iterar_json` recorre dicts y listas hasta `profundidad` niveles emitiendo el JSON por partes y
+codifica cada valor más profundo con `json.dumps` (C). Así nunca se arma el documento completo
+en memoria: con un resultado de varios MB el pico es el del tablero más grande, no el del
+archivo. `respuesta_json_streaming` lo envuelve en un StreamingHttpResponse con gzip opcional.
+"""
+import json
+import zlib
+
+from django.http import StreamingHttpResponse
+
+TAM_BLOQUE = 64 * 1024
+
+
+def iterar_json(obj, profundidad=6):
+    """Genera el JSON de `obj` como trozos de texto (válido al concatenarlos)."""
+    if profundidad > 0 and isinstance(obj, dict):
+        yield '{'
+        for i, (clave, valor) in enumerate(obj.items()):
+            yield (',\n' if i else '\n') + json.dumps(str(clave), ensure_ascii=False) + ': '
+            yield from iterar_json(valor, profundidad - 1)
+        yield '\n}' if obj else '}'
+    elif profundidad > 0 and isinstance(obj, (list, tuple)):
+        yield '['
+        for i, valor in enumerate(obj):
+            if i:
+                yield ',\n'
+            yield from iterar_json(valor, profundidad - 1)
+        yield ']'
+    else:
+        yield json.dumps(obj, ensure_ascii=False, default=str)
+
+
+def agrupar_bytes(trozos, tam_bloque=TAM_BLOQUE):
+    """Codifica en UTF-8 y agrupa los trozos en bloques de ~`tam_bloque` bytes."""
+    buffer, tam = [], 0
+    for trozo in trozos:
+        datos = trozo.encode('utf-8')
+        buffer.append(datos)
+        tam += len(datos)
+        if tam >= tam_bloque:
+            yield b''.join(buffer)
+            buffer, tam = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def comprimir_gzip(bloques, nivel=6):
+    """Comprime en formato gzip a medida que llegan los bloques."""
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for bloque in bloques:
+        datos = compresor.compress(bloque)
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
+def respuesta_json_streaming(obj, nombre_archivo, comprimir=False):
+    """Descarga `obj` como JSON (`nombre_archivo`.json) o JSON gzip (`nombre_archivo`.json.gz)."""
+    bloques = agrupar_bytes(iterar_json(obj))
+    if comprimir:
+        response = StreamingHttpResponse(comprimir_gzip(bloques), content_type='application/gzip')
+        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.json.gz"'
+    else:
+        response = StreamingHttpResponse(bloques, content_type='application/json; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}.json"'
+    return response
@@ -0,0 +1,79 @@
+"""Tiempos por fase en el camino de una optimización.
+
+La vista abre un medidor con `medir_fases()` y cada paso se envuelve en `fase('nombre')`,
+también dentro de helpers profundos, sin pasar el medidor como argumento. Sin medidor activo
+(scripts, comandos) `fase` no mide nada. El resultado queda en `OptimizationRun.fases_ms`, en
+la cabecera `X-Optimizador-Fases` de la respuesta y en `Server-Timing`
+(`core.middleware.ServerTimingMiddleware`).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_medidor_actual = ContextVar('medidor_fases', default=None)
+
+
+class MedidorFases:
+    """Acumula milisegundos por nombre de fase (una fase repetida suma)."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases = {}
+        # OptimizationRun registrada durante la medición (se completa al cerrar)
+        self.ejecucion_id = None
+
+    def agregar(self, nombre, ms):
+        self.fases[nombre] = self.fases.get(nombre, 0) + ms
+
+    def como_dict(self):
+        datos = {nombre: round(ms, 2) for nombre, ms in self.fases.items()}
+        datos['total'] = round((time.perf_counter() - self.inicio) * 1000, 2)
+        return datos
+
+    def cabecera(self):
+        return ', '.join(f'{nombre}={ms}' for nombre, ms in self.como_dict().items())
+
+
+def medidor_actual():
+    return _medidor_actual.get()
+
+
+@contextmanager
+def medir_fases():
+    """Abre un medidor; si ya hay uno activo (el de `ServerTimingMiddleware`) se reutiliza, así
+    las fases de la vista también salen en la cabecera Server-Timing."""
+    actual = _medidor_actual.get()
+    if actual is not None:
+        yield actual
+        return
+    medidor = MedidorFases()
+    token = _medidor_actual.set(medidor)
+    try:
+        yield medidor
+    finally:
+        _medidor_actual.reset(token)
+
+
+@contextmanager
+def fase(nombre):
+    medidor = _medidor_actual.get()
+    if medidor is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medidor.agregar(nombre, (time.perf_counter() - inicio) * 1000)
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) con interpolación lineal; None si no hay valores."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    i = int(k)
+    if i + 1 >= len(ordenados):
+        return ordenados[-1]
+    return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (k - i)
@@ -0,0 +1,159 @@
+"""Historial de optimizaciones de un proyecto, fuera de `resultado_optimizacion`.
+
+Antes cada optimización agregaba al JSON del proyecto un `historial` con la lista completa de
+materiales (hasta 20 copias), que se parseaba en cada lectura del resultado vigente. Ahora cada
+folio es una fila de `FolioHistorial` con referencias ordenadas a `ContenidoResultado`, donde
+cada resultado de material se guarda una sola vez por su hash: re-optimizar un material agrega
+sólo ese contenido y el resto se comparte con los folios anteriores.
+
+`reconstruir_folio` arma bajo demanda el snapshot de cualquier folio con el formato de siempre
+(`folio`, `fecha`, `materiales`, totales). Los proyectos que aún traen `historial` embebido se
+migran al primer acceso (`migrar_historial_embebido`) o con el comando
+`migrar_historial_resultados`.
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import ProtectedError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import ContenidoResultado, FolioHistorial, FolioMaterial
+
+# Folios que se conservan por proyecto (el mismo tope que tenía el historial embebido)
+HISTORIAL_MAX = 20
+
+
+def hash_contenido(datos):
+    """SHA-256 del JSON canónico de `datos` (claves ordenadas, sin espacios)."""
+    canonico = json.dumps(datos, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest(), len(canonico)
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        fecha = valor
+    else:
+        fecha = parse_datetime(str(valor or '')) or timezone.now()
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def registrar_folio(proyecto, folio, materiales, total_tableros=0, total_piezas=0,
+                    eficiencia_promedio=None, fecha=None, recortar=True):
+    """Agrega un folio al historial del proyecto y recorta a `HISTORIAL_MAX` entradas.
+
+    Los materiales ya guardados (mismo hash) no se vuelven a escribir.
+    """
+    contenidos = []
+    for datos in materiales or []:
+        clave, tamano = hash_contenido(datos)
+        contenidos.append((clave, tamano, datos))
+    with transaction.atomic():
+        existentes = set(ContenidoResultado.objects.filter(hash__in={c for c, _, _ in contenidos})
+                         .values_list('hash', flat=True))
+        nuevos = {}
+        for clave, tamano, datos in contenidos:
+            if clave not in existentes and clave not in nuevos:
+                nuevos[clave] = ContenidoResultado(hash=clave, datos=datos, tamano=tamano)
+        ContenidoResultado.objects.bulk_create(nuevos.values(), ignore_conflicts=True)
+        entrada = FolioHistorial.objects.create(
+            proyecto=proyecto, folio=str(folio or '')[:40], fecha=_fecha(fecha),
+            total_tableros=total_tableros or 0, total_piezas=total_piezas or 0,
+            eficiencia_promedio=eficiencia_promedio,
+        )
+        FolioMaterial.objects.bulk_create([
+            FolioMaterial(folio=entrada, posicion=i, contenido_id=clave)
+            for i, (clave, _, _) in enumerate(contenidos, 1)
+        ])
+        if recortar:
+            recortar_historial(proyecto)
+    return entrada
+
+
+def recortar_historial(proyecto, maximo=HISTORIAL_MAX):
+    """Borra los folios más antiguos sobre `maximo` y los contenidos que queden sin uso."""
+    sobrantes = list(FolioHistorial.objects.filter(proyecto=proyecto)
+                     .order_by('-fecha', '-id').values_list('id', flat=True)[maximo:])
+    if not sobrantes:
+        return 0
+    hashes = set(FolioMaterial.objects.filter(folio_id__in=sobrantes).values_list('contenido_id', flat=True))
+    FolioHistorial.objects.filter(id__in=sobrantes).delete()
+    try:
+        ContenidoResultado.objects.filter(hash__in=hashes, usos__isnull=True).delete()
+    except ProtectedError:
+        # Otro proyecto lo referenció entretanto: queda para el próximo recorte
+        pass
+    return len(sobrantes)
+
+
+def migrar_historial_embebido(proyecto, resultado):
+    """Pasa el `historial` embebido de `resultado` (dict) a las tablas y lo quita del dict.
+
+    Devuelve True si había historial que migrar. No guarda el proyecto: el llamador persiste
+    `resultado` sin la clave.
+    """
+    historial = resultado.pop('historial', None) if isinstance(resultado, dict) else None
+    if not isinstance(historial, list):
+        return False
+    with transaction.atomic():
+        for snap in historial:
+            if not isinstance(snap, dict):
+                continue
+            registrar_folio(
+                proyecto, snap.get('folio'), [m for m in snap.get('materiales') or [] if isinstance(m, dict)],
+                total_tableros=snap.get('total_tableros'), total_piezas=snap.get('total_piezas'),
+                eficiencia_promedio=snap.get('eficiencia_promedio'), fecha=snap.get('fecha'), recortar=False,
+            )
+        recortar_historial(proyecto)
+    return True
+
+
+def asegurar_historial(proyecto):
+    """Migra el historial embebido del proyecto, si lo tiene, y guarda el JSON sin él."""
+    texto = proyecto.resultado_optimizacion
+    if not isinstance(texto, str) or '"historial"' not in texto:
+        return False
+    try:
+        resultado = json.loads(texto)
+    except ValueError:
+        return False
+    if not migrar_historial_embebido(proyecto, resultado):
+        return False
+    proyecto.resultado_optimizacion = json.dumps(resultado, ensure_ascii=False)
+    proyecto.save(update_fields=['resultado_optimizacion'])
+    return True
+
+
+def _resumen(entrada):
+    return {
+        'id': entrada.id,
+        'folio': entrada.folio,
+        'fecha': timezone.localtime(entrada.fecha).isoformat(),
+        'total_tableros': entrada.total_tableros,
+        'total_piezas': entrada.total_piezas,
+        'eficiencia_promedio': entrada.eficiencia_promedio,
+    }
+
+
+def listar_folios(proyecto):
+    """Folios del historial (más reciente primero), sin materiales."""
+    return [_resumen(e) for e in FolioHistorial.objects.filter(proyecto=proyecto).order_by('-fecha', '-id')]
+
+
+def reconstruir_folio(proyecto, folio, entrada_id=None):
+    """Snapshot completo de `folio` (el más reciente si se repite, o la entrada `entrada_id`)
+    con el formato del historial embebido. None si no existe."""
+    entradas = FolioHistorial.objects.filter(proyecto=proyecto, folio=str(folio))
+    if entrada_id is not None:
+        entradas = entradas.filter(id=entrada_id)
+    entrada = entradas.order_by('-fecha', '-id').first()
+    if entrada is None:
+        return None
+    snapshot = _resumen(entrada)
+    snapshot['materiales'] = list(FolioMaterial.objects.filter(folio=entrada).order_by('posicion')
+                                  .values_list('contenido__datos', flat=True))
+    return snapshot
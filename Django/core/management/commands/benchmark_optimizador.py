@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from optimizer import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark del motor de optimización con listas de corte sintéticas reproducibles.\n\n"
+        "Mide tiempo, memoria pico, tableros y eficiencia por escenario y configuración.\n"
+        "--salida guarda el resultado como línea base JSON; --base compara contra una línea base\n"
+        "anterior y termina con error si hay regresiones (para usar antes de desplegar)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escenarios', nargs='+', choices=sorted(benchmark.ESCENARIOS),
+                            help='Escenarios a medir (por defecto todos)')
+        parser.add_argument('--configuraciones', nargs='+', choices=sorted(benchmark.CONFIGURACIONES),
+                            help='Configuraciones del motor (por defecto todas)')
+        parser.add_argument('--repeticiones', type=int, default=3, help='Corridas por caso (se informa la mediana)')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla de las listas sintéticas')
+        parser.add_argument('--salida', help='Ruta donde guardar la línea base JSON')
+        parser.add_argument('--base', help='Línea base JSON contra la cual comparar')
+        parser.add_argument('--tolerancia-tiempo', dest='tolerancia_tiempo', type=float, default=0.25,
+                            help='Aumento relativo de tiempo tolerado (0.25 = 25%%)')
+        parser.add_argument('--solo-aprovechamiento', dest='solo_aprovechamiento', action='store_true',
+                            help='Al comparar, ignorar tiempo y memoria (líneas base de otra máquina)')
+
+    def handle(self, *args, **opts):
+        base = None
+        if opts['base']:
+            try:
+                with open(opts['base'], encoding='utf-8') as f:
+                    base = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer la línea base {opts['base']}: {e}")
+
+        self.stdout.write(f"{'escenario':<26} {'configuración':<14} {'piezas':>6} {'tableros':>8} "
+                          f"{'mínimo':>6} {'eficiencia':>10} {'tiempo':>8} {'memoria':>10}")
+
+        def mostrar(caso):
+            self.stdout.write(
+                f"{caso['escenario']:<26} {caso['configuracion']:<14} {caso['unidades']:>6} "
+                f"{caso['tableros']:>8} {caso['tableros_minimo_teorico'] or '-':>6} "
+                f"{caso['eficiencia']:>9.2f}% {caso['tiempo_mediana']:>7.3f}s {caso['memoria_pico_kb']:>7.0f} KB")
+
+        resultado = benchmark.ejecutar_suite(
+            opts['escenarios'], opts['configuraciones'], repeticiones=opts['repeticiones'],
+            semilla=opts['semilla'], al_medir=mostrar,
+        )
+
+        if opts['salida']:
+            with open(opts['salida'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {opts['salida']}"))
+
+        if base is not None:
+            if base.get('semilla') != resultado['semilla']:
+                self.stdout.write(self.style.WARNING('La línea base usa otra semilla: las listas no son las mismas'))
+            tolerancia = float('inf') if opts['solo_aprovechamiento'] else opts['tolerancia_tiempo']
+            regresiones = benchmark.comparar(resultado, base, tolerancia_tiempo=tolerancia,
+                                             tolerancia_memoria=tolerancia)
+            if regresiones:
+                for r in regresiones:
+                    self.stdout.write(self.style.ERROR(r))
+                raise CommandError(f"{len(regresiones)} regresiones frente a {opts['base']}")
+            self.stdout.write(self.style.SUCCESS('Sin regresiones frente a la línea base'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.historial import asegurar_historial
+from core.models import Proyecto
+
+
+class Command(BaseCommand):
+    help = ("Mueve el `historial` embebido en Proyecto.resultado_optimizacion a las tablas de "
+            "historial (FolioHistorial / ContenidoResultado) y lo quita del JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizacion', help='Código de organización (por defecto todas)')
+
+    def handle(self, *args, **opts):
+        proyectos = Proyecto.objects.filter(resultado_optimizacion__isnull=False)
+        if opts['organizacion']:
+            proyectos = proyectos.filter(organizacion__codigo=opts['organizacion'])
+
+        migrados = 0
+        for pk in proyectos.values_list('id', flat=True).iterator():
+            proyecto = Proyecto.objects.only('id', 'resultado_optimizacion').get(id=pk)
+            if asegurar_historial(proyecto):
+                migrados += 1
+        self.stdout.write(self.style.SUCCESS(f"{migrados} proyectos con historial migrado"))
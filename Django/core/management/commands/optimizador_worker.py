@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+class Command(BaseCommand):
+    help = "Procesa los trabajos de optimización pendientes (OptimizationJob) en segundo plano"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Procesa los pendientes y termina')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos de espera cuando no hay trabajos')
+        parser.add_argument('--tipos', nargs='+', choices=['optimizacion', 'pdf'],
+                            help='Tipos de trabajo a procesar (por defecto todos). Los PDF se escriben en '
+                                 'MEDIA_ROOT: el worker que los procesa debe compartir disco con el web')
+
+    def handle(self, *args, **options):
+        from WowDash.optimizer_views import reclamar_siguiente_job, procesar_job
+
+        self.stdout.write("Worker del optimizador iniciado")
+        while True:
+            close_old_connections()
+            job = reclamar_siguiente_job(options['tipos'])
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+            job = procesar_job(job)
+            estilo = self.style.SUCCESS if job.estado == 'completado' else self.style.ERROR
+            self.stdout.write(estilo(f"Job {job.uuid}: {job.estado}{' - ' + job.error if job.error else ''}"))
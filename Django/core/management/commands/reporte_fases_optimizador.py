@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.fases import percentil
+from core.models import OptimizationRun
+
+
+class Command(BaseCommand):
+    help = "p50/p95 por fase de las optimizaciones recientes (OptimizationRun.fases_ms), por organización"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=7, help='Ventana hacia atrás en días (por defecto 7)')
+        parser.add_argument('--organizacion', help='Código de organización (por defecto todas)')
+
+    def handle(self, *args, **opts):
+        runs = OptimizationRun.objects.filter(
+            run_at__gte=timezone.now() - timedelta(days=opts['dias']), fases_ms__isnull=False,
+        )
+        if opts['organizacion']:
+            runs = runs.filter(organizacion__codigo=opts['organizacion'])
+
+        # organización -> fase -> [ms]
+        por_org = {}
+        for codigo, fases in runs.values_list('organizacion__codigo', 'fases_ms').iterator():
+            if not isinstance(fases, dict):
+                continue
+            destino = por_org.setdefault(codigo, {})
+            for nombre, ms in fases.items():
+                destino.setdefault(nombre, []).append(ms)
+
+        if not por_org:
+            self.stdout.write("Sin ejecuciones con tiempos por fase en la ventana indicada")
+            return
+        for codigo in sorted(por_org):
+            fases = por_org[codigo]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Organización {codigo} ({len(fases.get('total', []))} ejecuciones)"))
+            self.stdout.write(f"  {'fase':<14} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'máx ms':>10}")
+            # 'total' al final; el resto de mayor a menor p95
+            nombres = sorted((n for n in fases if n != 'total'), key=lambda n: -percentil(fases[n], 95))
+            for nombre in nombres + (['total'] if 'total' in fases else []):
+                valores = fases[nombre]
+                self.stdout.write(f"  {nombre:<14} {len(valores):>6} {percentil(valores, 50):>10.1f} "
+                                  f"{percentil(valores, 95):>10.1f} {max(valores):>10.1f}")
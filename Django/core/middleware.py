@@ -1,8 +1,15 @@
+import logging
 import threading
-from typing import Optional
+import time
+
+from django.db import connection
+
+from core.fases import medidor_actual, medir_fases
 
 _thread_locals = threading.local()
 
+logger_lentas = logging.getLogger('core.solicitudes_lentas')
+
 
 def get_current_request():
     return getattr(_thread_locals, 'request', None)
@@ -47,6 +54,82 @@ class RequestUserMiddleware:
         return response
 
 
+class ServerTimingMiddleware:
+    """Mide cada petición y lo publica en la cabecera `Server-Timing` (visible en las DevTools):
+
+    - `total`: tiempo de la vista y los middlewares posteriores;
+    - `db`: consultas SQL (cantidad en `desc`) medidas con `connection.execute_wrapper`;
+    - `render`: render de plantillas (TemplateResponse);
+    - las fases `core.fases` abiertas por la vista (serializar, motor, pdf...).
+
+    Las peticiones que superan `SOLICITUD_LENTA_MS` se escriben en el log rotativo
+    'core.solicitudes_lentas' con vista y organización, para ubicar vistas con N+1.
+    Con `SERVER_TIMING_ACTIVO = False` no se mide nada.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from django.conf import settings
+        if not getattr(settings, 'SERVER_TIMING_ACTIVO', True):
+            return self.get_response(request)
+
+        db = {'consultas': 0, 'ms': 0.0}
+
+        def medir_consulta(execute, sql, params, many, context):
+            inicio = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db['consultas'] += 1
+                db['ms'] += (time.perf_counter() - inicio) * 1000
+
+        with medir_fases() as medidor, connection.execute_wrapper(medir_consulta):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - medidor.inicio) * 1000
+
+        metricas = [f'total;dur={total_ms:.1f}', f'db;dur={db["ms"]:.1f};desc="{db["consultas"]} consultas"']
+        metricas += [f'{nombre};dur={ms:.1f}' for nombre, ms in medidor.fases.items()]
+        try:
+            response['Server-Timing'] = ', '.join(metricas)
+        except Exception:
+            pass
+
+        umbral = getattr(settings, 'SOLICITUD_LENTA_MS', 1000)
+        if umbral is not None and total_ms >= umbral:
+            self._registrar_lenta(request, response, total_ms, db, medidor)
+        return response
+
+    def process_template_response(self, request, response):
+        # El render ocurre después de la vista: se mide con un callback posterior
+        medidor = medidor_actual()
+        if medidor is not None:
+            inicio = time.perf_counter()
+            response.add_post_render_callback(
+                lambda r: medidor.agregar('render', (time.perf_counter() - inicio) * 1000))
+        return response
+
+    def _registrar_lenta(self, request, response, total_ms, db, medidor):
+        try:
+            match = getattr(request, 'resolver_match', None)
+            vista = (match.view_name or match._func_path) if match else '-'
+            organizacion = '-'
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                from core.models import UsuarioPerfilOptimizador
+                organizacion = UsuarioPerfilOptimizador.objects.filter(user_id=user.id).values_list(
+                    'organizacion__codigo', flat=True).first() or '-'
+            fases = ' '.join(f'{nombre}={ms:.1f}' for nombre, ms in medidor.fases.items())
+            logger_lentas.warning(
+                '%s %s status=%s total_ms=%.1f db_ms=%.1f consultas=%d vista=%s organizacion=%s usuario=%s %s',
+                request.method, request.path, getattr(response, 'status_code', '-'), total_ms, db['ms'],
+                db['consultas'], vista, organizacion, getattr(user, 'username', None) or '-', fases,
+            )
+        except Exception:
+            pass
+
+
 class AutoServicioIsolationMiddleware:
     """Aísla el flujo para usuarios con rol 'autoservicio'.
     Si el usuario autenticado tiene perfil autoservicio, sólo se permiten rutas bajo
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:17
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_alter_cliente_rut_alter_usuarioperfiloptimizador_rol_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptimizationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Identificador')),
+                ('tipo', models.CharField(choices=[('optimizacion', 'Optimización de material')], default='optimizacion', max_length=20, verbose_name='Tipo')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('progreso', models.PositiveSmallIntegerField(default=0, verbose_name='Progreso (%)')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Datos de entrada')),
+                ('resultado', models.JSONField(blank=True, null=True, verbose_name='Respuesta')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Creado')),
+                ('iniciado', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado')),
+                ('finalizado', models.DateTimeField(blank=True, null=True, verbose_name='Finalizado')),
+                ('proyecto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.proyecto', verbose_name='Proyecto')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Optimización',
+                'verbose_name_plural': 'Trabajos de Optimización',
+                'ordering': ['-creado'],
+                'indexes': [models.Index(fields=['estado', 'creado'], name='job_estado_creado_idx')],
+            },
+        ),
+    ]
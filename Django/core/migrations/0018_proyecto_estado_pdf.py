@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_optimizationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto',
+            name='estado_pdf',
+            field=models.CharField(blank=True, choices=[('pendiente', 'Pendiente'), ('listo', 'Listo'), ('error', 'Error')], default='', max_length=12, verbose_name='Estado del PDF'),
+        ),
+        migrations.AlterField(
+            model_name='optimizationjob',
+            name='tipo',
+            field=models.CharField(choices=[('optimizacion', 'Optimización de material'), ('pdf', 'PDF de optimización')], default='optimizacion', max_length=20, verbose_name='Tipo'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_proyecto_estado_pdf'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationrun',
+            name='fases_ms',
+            field=models.JSONField(blank=True, null=True, verbose_name='Tiempos por fase (ms)'),
+        ),
+    ]
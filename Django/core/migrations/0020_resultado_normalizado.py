@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_optimizationrun_fases_ms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultadoMaterial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveIntegerField(verbose_name='N° de material')),
+                ('material_index', models.IntegerField(blank=True, null=True, verbose_name='Índice de material (UI)')),
+                ('material_codigo', models.CharField(blank=True, default='', max_length=50, verbose_name='Código de material')),
+                ('material_nombre', models.CharField(blank=True, default='', max_length=200, verbose_name='Material')),
+                ('total_tableros', models.IntegerField(default=0, verbose_name='Total de Tableros')),
+                ('eficiencia', models.FloatField(blank=True, null=True, verbose_name='Eficiencia (%)')),
+                ('datos', models.JSONField(blank=True, default=dict, verbose_name='Datos del resultado')),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resultados_material', to='core.proyecto', verbose_name='Proyecto')),
+            ],
+            options={
+                'verbose_name': 'Resultado de Material',
+                'verbose_name_plural': 'Resultados de Material',
+                'ordering': ['proyecto', 'numero'],
+                'unique_together': {('proyecto', 'numero')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Tablero',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('material_num', models.PositiveIntegerField(verbose_name='N° de material')),
+                ('numero', models.PositiveIntegerField(verbose_name='N° de tablero')),
+                ('ancho', models.FloatField(blank=True, null=True, verbose_name='Ancho (mm)')),
+                ('largo', models.FloatField(blank=True, null=True, verbose_name='Largo (mm)')),
+                ('eficiencia', models.FloatField(blank=True, null=True, verbose_name='Eficiencia (%)')),
+                ('datos', models.JSONField(blank=True, default=dict, verbose_name='Datos del tablero')),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tableros_resultado', to='core.proyecto', verbose_name='Proyecto')),
+                ('resultado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tableros', to='core.resultadomaterial', verbose_name='Resultado de material')),
+            ],
+            options={
+                'verbose_name': 'Tablero',
+                'verbose_name_plural': 'Tableros',
+                'ordering': ['proyecto', 'material_num', 'numero'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PiezaColocada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('material_num', models.PositiveIntegerField(verbose_name='N° de material')),
+                ('tablero_num', models.PositiveIntegerField(verbose_name='N° de tablero')),
+                ('numero', models.PositiveIntegerField(verbose_name='N° de pieza')),
+                ('nombre', models.CharField(blank=True, default='', max_length=200, verbose_name='Nombre')),
+                ('x', models.FloatField(default=0, verbose_name='X (mm)')),
+                ('y', models.FloatField(default=0, verbose_name='Y (mm)')),
+                ('ancho', models.FloatField(default=0, verbose_name='Ancho (mm)')),
+                ('largo', models.FloatField(default=0, verbose_name='Largo (mm)')),
+                ('rotada', models.BooleanField(default=False, verbose_name='Rotada')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_corte', 'En corte'), ('cortada', 'Cortada'), ('descartada', 'Descartada')], default='pendiente', max_length=12, verbose_name='Estado')),
+                ('datos', models.JSONField(blank=True, default=dict, verbose_name='Datos de la pieza')),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='piezas_colocadas', to='core.proyecto', verbose_name='Proyecto')),
+                ('tablero', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='piezas', to='core.tablero', verbose_name='Tablero')),
+            ],
+            options={
+                'verbose_name': 'Pieza Colocada',
+                'verbose_name_plural': 'Piezas Colocadas',
+                'ordering': ['proyecto', 'material_num', 'tablero_num', 'numero'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tablero',
+            index=models.Index(fields=['resultado', 'numero'], name='tablero_resultado_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='tablero',
+            unique_together={('proyecto', 'material_num', 'numero')},
+        ),
+        migrations.AddIndex(
+            model_name='piezacolocada',
+            index=models.Index(fields=['tablero', 'numero'], name='pieza_tablero_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='piezacolocada',
+            index=models.Index(fields=['proyecto', 'estado'], name='pieza_proy_estado_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='piezacolocada',
+            unique_together={('proyecto', 'material_num', 'tablero_num', 'numero')},
+        ),
+    ]
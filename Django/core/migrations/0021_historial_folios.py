@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_resultado_normalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContenidoResultado',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA-256')),
+                ('datos', models.JSONField(verbose_name='Resultado del material')),
+                ('tamano', models.PositiveIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('creado', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+            ],
+            options={
+                'verbose_name': 'Contenido de Resultado',
+                'verbose_name_plural': 'Contenidos de Resultado',
+            },
+        ),
+        migrations.CreateModel(
+            name='FolioHistorial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('folio', models.CharField(max_length=40, verbose_name='Folio')),
+                ('fecha', models.DateTimeField(verbose_name='Fecha')),
+                ('total_tableros', models.IntegerField(default=0, verbose_name='Total de Tableros')),
+                ('total_piezas', models.IntegerField(default=0, verbose_name='Total de Piezas')),
+                ('eficiencia_promedio', models.FloatField(blank=True, null=True, verbose_name='Eficiencia Promedio (%)')),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial_folios', to='core.proyecto', verbose_name='Proyecto')),
+            ],
+            options={
+                'verbose_name': 'Folio de Historial',
+                'verbose_name_plural': 'Historial de Folios',
+                'ordering': ['proyecto', '-fecha', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FolioMaterial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicion', models.PositiveIntegerField(verbose_name='Posición')),
+                ('contenido', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='usos', to='core.contenidoresultado', verbose_name='Contenido')),
+                ('folio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='materiales', to='core.foliohistorial', verbose_name='Folio')),
+            ],
+            options={
+                'verbose_name': 'Material de Folio',
+                'verbose_name_plural': 'Materiales de Folio',
+                'ordering': ['folio', 'posicion'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='foliohistorial',
+            index=models.Index(fields=['proyecto', 'folio'], name='historial_proy_folio_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='foliomaterial',
+            unique_together={('folio', 'posicion')},
+        ),
+    ]
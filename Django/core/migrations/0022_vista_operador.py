@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_historial_folios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VistaOperador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='Versión')),
+                ('datos', models.JSONField(blank=True, default=list, verbose_name='Materiales normalizados')),
+                ('actualizado', models.DateTimeField(auto_now=True, verbose_name='Actualizado')),
+                ('proyecto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='vista_operador', to='core.proyecto', verbose_name='Proyecto')),
+            ],
+            options={
+                'verbose_name': 'Vista de Operador',
+                'verbose_name_plural': 'Vistas de Operador',
+            },
+        ),
+    ]
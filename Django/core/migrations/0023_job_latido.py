@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_vista_operador'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationjob',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Intentos'),
+        ),
+        migrations.AddField(
+            model_name='optimizationjob',
+            name='latido',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último latido del worker'),
+        ),
+    ]
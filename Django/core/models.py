@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+import uuid
 
 class Organizacion(models.Model):
     """Modelo para organizaciones/empresas del sistema"""
@@ -163,6 +164,10 @@ class Proyecto(models.Model):
     eficiencia_promedio = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name="Eficiencia Promedio (%)")
     costo_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Costo Total")
     archivo_pdf = models.CharField(max_length=200, blank=True, null=True, verbose_name="Archivo PDF")
+    # Estado del PDF del folio actual: 'pendiente' mientras el worker lo genera, 'listo' al escribirlo
+    estado_pdf = models.CharField(max_length=12, blank=True, default='', choices=[
+        ('pendiente', 'Pendiente'), ('listo', 'Listo'), ('error', 'Error'),
+    ], verbose_name="Estado del PDF")
     # ID público del proyecto (reemplaza Folio): único global, inicia en 100, se actualiza al optimizar
     public_id = models.IntegerField(blank=True, null=True, unique=True, verbose_name="ID del Proyecto")
     # Folio: correlativo por cliente y versión incremental
@@ -409,6 +414,8 @@ class OptimizationRun(models.Model):
     run_at = models.DateTimeField(default=timezone.now, verbose_name="Ejecutado en")
     porcentaje_uso = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name="% uso tablero")
     tiempo_ms = models.IntegerField(null=True, blank=True, verbose_name="Tiempo (ms)")
+    # Milisegundos por fase de la petición (json, preparar, motor, serializar, ...; ver core.fases)
+    fases_ms = models.JSONField(null=True, blank=True, verbose_name="Tiempos por fase (ms)")
 
     class Meta:
         verbose_name = "Ejecución de Optimización"
@@ -420,4 +427,199 @@ class OptimizationRun(models.Model):
         ]
 
     def __str__(self):
-        return f"Run {self.id} Proy {self.proyecto_id} ({self.run_at:%Y-%m-%d %H:%M})"
\ No newline at end of file
+        return f"Run {self.id} Proy {self.proyecto_id} ({self.run_at:%Y-%m-%d %H:%M})"
+
+class OptimizationJob(models.Model):
+    """Trabajo del optimizador ejecutado fuera del request por el worker
+    (`manage.py optimizador_worker`). El frontend consulta estado/progreso por `uuid`."""
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+    TIPOS = [
+        ('optimizacion', 'Optimización de material'),
+        ('pdf', 'PDF de optimización'),
+    ]
+    uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, verbose_name="Identificador")
+    tipo = models.CharField(max_length=20, choices=TIPOS, default='optimizacion', verbose_name="Tipo")
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', verbose_name="Estado")
+    progreso = models.PositiveSmallIntegerField(default=0, verbose_name="Progreso (%)")
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Solicitado por")
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Proyecto")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Datos de entrada")
+    resultado = models.JSONField(null=True, blank=True, verbose_name="Respuesta")
+    error = models.TextField(blank=True, default='', verbose_name="Error")
+    creado = models.DateTimeField(default=timezone.now, verbose_name="Creado")
+    iniciado = models.DateTimeField(null=True, blank=True, verbose_name="Iniciado")
+    latido = models.DateTimeField(null=True, blank=True, verbose_name="Último latido del worker")
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    finalizado = models.DateTimeField(null=True, blank=True, verbose_name="Finalizado")
+
+    class Meta:
+        verbose_name = "Trabajo de Optimización"
+        verbose_name_plural = "Trabajos de Optimización"
+        ordering = ['-creado']
+        indexes = [
+            models.Index(fields=["estado", "creado"], name="job_estado_creado_idx"),
+        ]
+
+    def __str__(self):
+        return f"Job {self.uuid} ({self.estado} {self.progreso}%)"
+
+# --- Resultado de optimización normalizado -------------------------------------------------
+# Copia relacional del resultado vigente de `Proyecto.resultado_optimizacion` (ver
+# core/resultados.py). Los números de material, tablero y pieza son las posiciones 1..n dentro
+# del resultado, las mismas del id de pieza del operador (m{m}t{t}p{p}). `datos` guarda el resto
+# de las claves del JSON original para reconstruirlo tal cual.
+
+class ResultadoMaterial(models.Model):
+    """Resultado de un material dentro del resultado vigente del proyecto"""
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='resultados_material', verbose_name="Proyecto")
+    numero = models.PositiveIntegerField(verbose_name="N° de material")
+    material_index = models.IntegerField(null=True, blank=True, verbose_name="Índice de material (UI)")
+    material_codigo = models.CharField(max_length=50, blank=True, default='', verbose_name="Código de material")
+    material_nombre = models.CharField(max_length=200, blank=True, default='', verbose_name="Material")
+    total_tableros = models.IntegerField(default=0, verbose_name="Total de Tableros")
+    eficiencia = models.FloatField(null=True, blank=True, verbose_name="Eficiencia (%)")
+    datos = models.JSONField(default=dict, blank=True, verbose_name="Datos del resultado")
+
+    class Meta:
+        verbose_name = "Resultado de Material"
+        verbose_name_plural = "Resultados de Material"
+        ordering = ['proyecto', 'numero']
+        unique_together = [('proyecto', 'numero')]
+
+    def __str__(self):
+        return f"Proy {self.proyecto_id} material {self.numero}"
+
+class Tablero(models.Model):
+    """Tablero de un resultado de material"""
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='tableros_resultado', verbose_name="Proyecto")
+    resultado = models.ForeignKey(ResultadoMaterial, on_delete=models.CASCADE, related_name='tableros', verbose_name="Resultado de material")
+    material_num = models.PositiveIntegerField(verbose_name="N° de material")
+    numero = models.PositiveIntegerField(verbose_name="N° de tablero")
+    ancho = models.FloatField(null=True, blank=True, verbose_name="Ancho (mm)")
+    largo = models.FloatField(null=True, blank=True, verbose_name="Largo (mm)")
+    eficiencia = models.FloatField(null=True, blank=True, verbose_name="Eficiencia (%)")
+    datos = models.JSONField(default=dict, blank=True, verbose_name="Datos del tablero")
+
+    class Meta:
+        verbose_name = "Tablero"
+        verbose_name_plural = "Tableros"
+        ordering = ['proyecto', 'material_num', 'numero']
+        unique_together = [('proyecto', 'material_num', 'numero')]
+        indexes = [
+            models.Index(fields=["resultado", "numero"], name="tablero_resultado_idx"),
+        ]
+
+    def __str__(self):
+        return f"Proy {self.proyecto_id} m{self.material_num}t{self.numero}"
+
+class PiezaColocada(models.Model):
+    """Pieza ubicada en un tablero, con su estado de corte (flujo del operador)"""
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_corte', 'En corte'),
+        ('cortada', 'Cortada'),
+        ('descartada', 'Descartada'),
+    ]
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='piezas_colocadas', verbose_name="Proyecto")
+    tablero = models.ForeignKey(Tablero, on_delete=models.CASCADE, related_name='piezas', verbose_name="Tablero")
+    material_num = models.PositiveIntegerField(verbose_name="N° de material")
+    tablero_num = models.PositiveIntegerField(verbose_name="N° de tablero")
+    numero = models.PositiveIntegerField(verbose_name="N° de pieza")
+    nombre = models.CharField(max_length=200, blank=True, default='', verbose_name="Nombre")
+    x = models.FloatField(default=0, verbose_name="X (mm)")
+    y = models.FloatField(default=0, verbose_name="Y (mm)")
+    ancho = models.FloatField(default=0, verbose_name="Ancho (mm)")
+    largo = models.FloatField(default=0, verbose_name="Largo (mm)")
+    rotada = models.BooleanField(default=False, verbose_name="Rotada")
+    estado = models.CharField(max_length=12, choices=ESTADOS, default='pendiente', verbose_name="Estado")
+    datos = models.JSONField(default=dict, blank=True, verbose_name="Datos de la pieza")
+
+    class Meta:
+        verbose_name = "Pieza Colocada"
+        verbose_name_plural = "Piezas Colocadas"
+        ordering = ['proyecto', 'material_num', 'tablero_num', 'numero']
+        unique_together = [('proyecto', 'material_num', 'tablero_num', 'numero')]
+        indexes = [
+            models.Index(fields=["tablero", "numero"], name="pieza_tablero_idx"),
+            models.Index(fields=["proyecto", "estado"], name="pieza_proy_estado_idx"),
+        ]
+
+    def __str__(self):
+        return f"Proy {self.proyecto_id} m{self.material_num}t{self.tablero_num}p{self.numero}"
+
+
+# Historial de resultados por contenido: cada resultado de material se guarda una sola vez
+# (ContenidoResultado, clave = sha256 de su JSON canónico) y cada folio del historial es una
+# lista ordenada de referencias a esos contenidos. Un folio que sólo re-optimiza un material
+# agrega un contenido nuevo; los demás materiales se comparten con el folio anterior.
+
+class ContenidoResultado(models.Model):
+    """Resultado de un material, direccionado por el hash de su contenido"""
+    hash = models.CharField(max_length=64, primary_key=True, verbose_name="SHA-256")
+    datos = models.JSONField(verbose_name="Resultado del material")
+    tamano = models.PositiveIntegerField(default=0, verbose_name="Tamaño (bytes)")
+    creado = models.DateTimeField(auto_now_add=True, verbose_name="Creado")
+
+    class Meta:
+        verbose_name = "Contenido de Resultado"
+        verbose_name_plural = "Contenidos de Resultado"
+
+    def __str__(self):
+        return self.hash[:12]
+
+class FolioHistorial(models.Model):
+    """Entrada del historial de optimizaciones de un proyecto"""
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='historial_folios', verbose_name="Proyecto")
+    folio = models.CharField(max_length=40, verbose_name="Folio")
+    fecha = models.DateTimeField(verbose_name="Fecha")
+    total_tableros = models.IntegerField(default=0, verbose_name="Total de Tableros")
+    total_piezas = models.IntegerField(default=0, verbose_name="Total de Piezas")
+    eficiencia_promedio = models.FloatField(null=True, blank=True, verbose_name="Eficiencia Promedio (%)")
+
+    class Meta:
+        verbose_name = "Folio de Historial"
+        verbose_name_plural = "Historial de Folios"
+        ordering = ['proyecto', '-fecha', '-id']
+        indexes = [
+            models.Index(fields=["proyecto", "folio"], name="historial_proy_folio_idx"),
+        ]
+
+    def __str__(self):
+        return f"Proy {self.proyecto_id} folio {self.folio}"
+
+class FolioMaterial(models.Model):
+    """Material `posicion` de un folio del historial (referencia a su contenido)"""
+    folio = models.ForeignKey(FolioHistorial, on_delete=models.CASCADE, related_name='materiales', verbose_name="Folio")
+    posicion = models.PositiveIntegerField(verbose_name="Posición")
+    contenido = models.ForeignKey(ContenidoResultado, on_delete=models.PROTECT, related_name='usos', verbose_name="Contenido")
+
+    class Meta:
+        verbose_name = "Material de Folio"
+        verbose_name_plural = "Materiales de Folio"
+        ordering = ['folio', 'posicion']
+        unique_together = [('folio', 'posicion')]
+
+    def __str__(self):
+        return f"{self.folio} #{self.posicion}"
+
+
+class VistaOperador(models.Model):
+    """Payload del detalle del operador precalculado al guardar el resultado (geometría de
+    materiales, tableros y piezas). `version` sube con cada cambio del layout o de estados de
+    pieza y forma parte del ETag de `operador_proyecto_detalle_api`."""
+    proyecto = models.OneToOneField(Proyecto, on_delete=models.CASCADE, related_name='vista_operador', verbose_name="Proyecto")
+    version = models.PositiveIntegerField(default=1, verbose_name="Versión")
+    datos = models.JSONField(default=list, blank=True, verbose_name="Materiales normalizados")
+    actualizado = models.DateTimeField(auto_now=True, verbose_name="Actualizado")
+
+    class Meta:
+        verbose_name = "Vista de Operador"
+        verbose_name_plural = "Vistas de Operador"
+
+    def __str__(self):
+        return f"Proy {self.proyecto_id} v{self.version}"
@@ -0,0 +1,107 @@
+"""Caché de resultados del optimizador, direccionada por contenido.
+
+La clave es un sha256 de la entrada canónica del motor (medidas del tablero, márgenes,
+desperdicio de sierra, parámetros de estrategia, lista de piezas normalizada y versión del
+motor), así que dos optimizaciones con la misma entrada comparten resultado aunque vengan de
+proyectos distintos.
+
+Se usan dos niveles del framework de caché de Django (ver CACHES en settings):
+- 'optimizador_local': LocMemCache por proceso, con desalojo LRU (MAX_ENTRIES).
+- 'optimizador': caché persistente compartida entre workers (archivos o BD).
+Un acierto en el nivel persistente se copia al local. Cualquier error de caché se ignora:
+la caché nunca debe impedir que se optimice.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+from optimizer.api import PARAMETROS_CONFIGURACION
+
+CACHE_LOCAL = 'optimizador_local'
+CACHE_PERSISTENTE = 'optimizador'
+
+# Parámetros de configuración que cambian el resultado del motor: todos los que lee
+# `optimizer.api` (semilla y vectorizado incluidos), desde una sola lista.
+PARAMETROS_MOTOR = PARAMETROS_CONFIGURACION
+
+
+def _normalizar_pieza(p: Dict[str, Any]) -> Dict[str, Any]:
+    tapacantos = p.get('tapacantos') or {}
+    return {
+        'nombre': p.get('nombre'),
+        'ancho': p.get('ancho'),
+        'largo': p.get('largo'),
+        'cantidad': p.get('cantidad', 1),
+        'veta_libre': bool(p.get('veta_libre', False)),
+        'tapacantos': tapacantos,
+    }
+
+
+def clave_resultado(version: str, ancho: Any, largo: Any, margen_x: Any, margen_y: Any,
+                    desperdicio_sierra: Any, piezas: List[Dict[str, Any]],
+                    conf_mat: Optional[Dict[str, Any]] = None) -> str:
+    """Clave canónica de una optimización. Conserva el orden de las piezas: el motor
+    desempata por orden de entrada, así que otro orden puede dar otro layout."""
+    conf_mat = conf_mat or {}
+    entrada = {
+        'version': version,
+        'tablero': [ancho, largo],
+        'margenes': [margen_x, margen_y],
+        'kerf': desperdicio_sierra,
+        'parametros': {k: conf_mat.get(k) for k in PARAMETROS_MOTOR
+                       if conf_mat.get(k) is not None and conf_mat.get(k) != '' and conf_mat.get(k) is not False},
+        'piezas': [_normalizar_pieza(p) for p in piezas],
+    }
+    canonico = json.dumps(entrada, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return 'opt:' + hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+def es_cacheable(conf_mat: Optional[Dict[str, Any]]) -> bool:
+    """False si el resultado no es reproducible: orden 'aleatorio' sin `semilla` da otro layout
+    en cada ejecución y no debe servirse desde la caché."""
+    conf_mat = conf_mat or {}
+    return not (conf_mat.get('orden') == 'aleatorio' and conf_mat.get('semilla') in (None, ''))
+
+
+def _cache(alias):
+    try:
+        return caches[alias]
+    except InvalidCacheBackendError:
+        return None
+
+
+def obtener(clave: str) -> Optional[Dict[str, Any]]:
+    """Resultado guardado para la clave (copia independiente) o None."""
+    try:
+        local = _cache(CACHE_LOCAL)
+        if local is not None:
+            valor = local.get(clave)
+            if valor is not None:
+                return valor
+        persistente = _cache(CACHE_PERSISTENTE)
+        if persistente is not None:
+            valor = persistente.get(clave)
+            if valor is not None:
+                if local is not None:
+                    local.set(clave, valor)
+                return valor
+    except Exception:
+        pass
+    return None
+
+
+def guardar(clave: str, resultado: Dict[str, Any]) -> None:
+    """Guarda el resultado en ambos niveles. Los parciales (`plazo_vencido`: el portafolio se
+    quedó sin presupuesto) no se guardan: con más tiempo la misma entrada da un layout completo."""
+    if resultado.get('plazo_vencido'):
+        return
+    for alias in (CACHE_LOCAL, CACHE_PERSISTENTE):
+        try:
+            c = _cache(alias)
+            if c is not None:
+                c.set(clave, resultado)
+        except Exception:
+            pass
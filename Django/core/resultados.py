@@ -0,0 +1,363 @@
+"""Resultado de optimización normalizado: ResultadoMaterial / Tablero / PiezaColocada.
+
+`Proyecto.resultado_optimizacion` sigue siendo el documento que leen el PDF, las plantillas y
+el frontend; estas tablas son su copia relacional y se reescriben cada vez que se guarda un
+resultado (`sincronizar_resultado`). El estado de corte de las piezas vive sólo en las tablas:
+el operador lo cambia con un UPDATE de filas sin tocar el JSON, y `resultado_compatible`
+devuelve el JSON de siempre con esos estados para los consumidores existentes.
+
+Proyectos guardados antes de las tablas se normalizan al primer acceso (`asegurar_normalizado`),
+conservando los estados que ya tuviera el JSON.
+"""
+import json
+import re
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from core.models import PiezaColocada, ResultadoMaterial, Tablero, VistaOperador
+
+ESTADOS_PIEZA = tuple(e for e, _ in PiezaColocada.ESTADOS)
+
+
+def cargar_resultado(proyecto):
+    """`resultado_optimizacion` como dict (se guarda como texto JSON dentro del JSONField)."""
+    res = proyecto.resultado_optimizacion
+    if not res:
+        return None
+    try:
+        res = json.loads(res) if isinstance(res, str) else res
+    except ValueError:
+        return None
+    return res if isinstance(res, dict) else None
+
+
+def materiales_de(resultado):
+    """Materiales del resultado: lista `materiales` o, en el formato antiguo, la raíz."""
+    if not isinstance(resultado, dict):
+        return []
+    if isinstance(resultado.get('materiales'), list):
+        return [m for m in resultado['materiales'] if isinstance(m, dict)]
+    return [resultado] if resultado.get('tableros') else []
+
+
+def clave_pieza(pieza_id):
+    """'m1t2p3' -> (1, 2, 3); formato antiguo 't2p3' -> (None, 2, 3); otro -> None."""
+    m = re.match(r'^(?:m(\d+))?t(\d+)p(\d+)$', pieza_id or '')
+    if not m:
+        return None
+    return (int(m.group(1)) if m.group(1) else None, int(m.group(2)), int(m.group(3)))
+
+
+def tableros_numerados(material):
+    """[(t, tablero)] de los tableros del material, numerados desde 1 saltando los que no son
+    dict. Es la numeración de los ids 'm{m}t{t}p{p}': la usan las tablas y la vista del operador."""
+    return list(enumerate([t for t in (material.get('tableros') or []) if isinstance(t, dict)], 1))
+
+
+def piezas_numeradas(tablero):
+    """[(p, pieza)] de las piezas del tablero, con la misma numeración que `tableros_numerados`."""
+    return list(enumerate([p for p in (tablero.get('piezas') or []) if isinstance(p, dict)], 1))
+
+
+def _numero(valor, defecto=0.0):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return defecto
+
+
+def sincronizar_resultado(proyecto, resultado=None, nuevos=None):
+    """Reescribe las tablas del proyecto desde `resultado` (por defecto el JSON guardado).
+
+    Los estados de pieza se toman del JSON. Con `nuevos` (números de material, 1..n en el orden
+    de `materiales_de`, cuyo resultado se acaba de calcular) los demás materiales conservan el
+    estado de corte de sus filas actuales: re-optimizar un material no reinicia los otros.
+    """
+    if resultado is None:
+        resultado = cargar_resultado(proyecto)
+    with transaction.atomic():
+        estados, indices = {}, {}
+        if nuevos is not None:
+            indices = dict(ResultadoMaterial.objects.filter(proyecto=proyecto).values_list('numero', 'material_index'))
+            # Bloquea las filas: un cambio de estado concurrente espera en vez de perderse
+            estados = {
+                (m, t, p): e for m, t, p, e in PiezaColocada.objects.select_for_update().filter(proyecto=proyecto)
+                .exclude(material_num__in=nuevos).values_list('material_num', 'tablero_num', 'numero', 'estado')
+            }
+        PiezaColocada.objects.filter(proyecto=proyecto).delete()
+        Tablero.objects.filter(proyecto=proyecto).delete()
+        ResultadoMaterial.objects.filter(proyecto=proyecto).delete()
+
+        tableros, piezas = [], []
+        for m, mat in enumerate(materiales_de(resultado), 1):
+            info = mat.get('material') if isinstance(mat.get('material'), dict) else {}
+            lista_tableros = tableros_numerados(mat)
+            material_index = mat.get('material_index') if isinstance(mat.get('material_index'), int) else None
+            # Sólo si la fila anterior con este número era el mismo material
+            conservar = nuevos is not None and m not in nuevos and m in indices and indices[m] == material_index
+            rm = ResultadoMaterial.objects.create(
+                proyecto=proyecto, numero=m,
+                material_index=material_index,
+                material_codigo=str(info.get('codigo') or '')[:50],
+                material_nombre=str(info.get('nombre') or '')[:200],
+                total_tableros=len(lista_tableros),
+                eficiencia=_numero(mat.get('eficiencia'), None),
+                datos={k: v for k, v in mat.items() if k != 'tableros'},
+            )
+            for t, tab in lista_tableros:
+                tableros.append(Tablero(
+                    proyecto=proyecto, resultado=rm, material_num=m, numero=t,
+                    ancho=_numero(tab.get('ancho'), None), largo=_numero(tab.get('largo'), None),
+                    eficiencia=_numero(tab.get('eficiencia_tablero'), None),
+                    datos={k: v for k, v in tab.items() if k != 'piezas'},
+                ))
+                for p, pi in piezas_numeradas(tab):
+                    estado = estados[(m, t, p)] if conservar and (m, t, p) in estados else pi.get('estado')
+                    piezas.append(PiezaColocada(
+                        proyecto=proyecto, material_num=m, tablero_num=t, numero=p,
+                        nombre=str(pi.get('nombre') or '')[:200],
+                        x=_numero(pi.get('x')), y=_numero(pi.get('y')),
+                        ancho=_numero(pi.get('ancho')), largo=_numero(pi.get('largo')),
+                        rotada=bool(pi.get('rotada')),
+                        estado=estado if estado in ESTADOS_PIEZA else 'pendiente',
+                        # La pieza original completa salvo el estado (que vive sólo en su
+                        # columna): las columnas son FloatField y convertirían x=10 en 10.0.
+                        datos={k: v for k, v in pi.items() if k != 'estado'},
+                    ))
+        Tablero.objects.bulk_create(tableros, batch_size=500)
+        if piezas:
+            # Ids de tablero desde la BD (no todos los motores los devuelven en bulk_create)
+            ids = {(m, t): i for m, t, i in Tablero.objects.filter(proyecto=proyecto)
+                   .values_list('material_num', 'numero', 'id')}
+            for pieza in piezas:
+                pieza.tablero_id = ids[(pieza.material_num, pieza.tablero_num)]
+            PiezaColocada.objects.bulk_create(piezas, batch_size=500)
+        guardar_vista_operador(proyecto, resultado)
+
+
+def asegurar_normalizado(proyecto, resultado=None):
+    """Normaliza el resultado del proyecto si aún no tiene filas. True si quedó normalizado."""
+    if ResultadoMaterial.objects.filter(proyecto=proyecto).exists():
+        return True
+    if resultado is None:
+        resultado = cargar_resultado(proyecto)
+    if not materiales_de(resultado):
+        return False
+    sincronizar_resultado(proyecto, resultado)
+    return True
+
+
+def actualizar_piezas(proyecto, cambios):
+    """Aplica `cambios` {(m, t, p): {campo: valor}} sobre las columnas de las piezas (un
+    bulk_update de las filas tocadas)."""
+    if not cambios or not asegurar_normalizado(proyecto):
+        return 0
+    filtro = Q()
+    for m, t in {(m, t) for m, t, _ in cambios}:
+        filtro |= Q(material_num=m, tablero_num=t)
+    filas = []
+    for pieza in PiezaColocada.objects.filter(filtro, proyecto=proyecto):
+        valores = cambios.get((pieza.material_num, pieza.tablero_num, pieza.numero))
+        if valores:
+            for campo, valor in valores.items():
+                setattr(pieza, campo, valor)
+            filas.append(pieza)
+    campos = sorted({c for v in cambios.values() for c in v})
+    if filas:
+        PiezaColocada.objects.bulk_update(filas, campos, batch_size=500)
+    return len(filas)
+
+
+def construir_vista_operador(resultado):
+    """Materiales del resultado normalizados para la UI del operador (selector de material,
+    tableros y piezas con id 'm{m}t{t}p{p}'). Las piezas salen 'pendiente': el estado real se
+    superpone al servir (`vista_con_estados`)."""
+    normalizados = []
+    for m_idx, mat in enumerate(materiales_de(resultado), start=1):
+        config = mat.get('config') if isinstance(mat.get('config'), dict) else {}
+        margenes = mat.get('margenes') if isinstance(mat.get('margenes'), dict) else {}
+        material_nombre = (mat.get('material') or {}).get('nombre') or None
+        tableros = []
+        for t_idx, t in tableros_numerados(mat):
+            piezas = []
+            for i, pi in piezas_numeradas(t):
+                piezas.append({
+                    'pieza_id': f"m{m_idx}t{t_idx}p{i}",
+                    'tablero_num': t_idx,
+                    'nombre': pi.get('nombre') or pi.get('id_unico') or f"P{i}",
+                    'x': pi.get('x'), 'y': pi.get('y'),
+                    'ancho': pi.get('ancho'), 'largo': pi.get('largo'),
+                    'rotada': bool(pi.get('rotada')),
+                    'estado': 'pendiente',
+                    'tapacantos': pi.get('tapacantos') or {},
+                })
+            tableros.append({
+                'num': t_idx,
+                'ancho_mm': t.get('ancho') or mat.get('tablero_ancho_original') or mat.get('tablero_ancho_efectivo'),
+                'largo_mm': t.get('largo') or mat.get('tablero_largo_original') or mat.get('tablero_largo_efectivo'),
+                'piezas': piezas,
+                'eficiencia': t.get('eficiencia_tablero'),
+                'cortes': t.get('cortes') or [],
+            })
+        normalizados.append({
+            'indice': m_idx,
+            'nombre': material_nombre,
+            'meta': {
+                'material': material_nombre,
+                'kerf': config.get('kerf', mat.get('desperdicio_sierra')),
+                'margen_x': margenes.get('margen_x', config.get('margen_x')),
+                'margen_y': margenes.get('margen_y', config.get('margen_y')),
+            },
+            'tableros': tableros,
+        })
+    return normalizados
+
+
+def guardar_vista_operador(proyecto, resultado=None):
+    """(Re)construye la vista del operador desde `resultado` y sube su versión."""
+    if resultado is None:
+        resultado = cargar_resultado(proyecto)
+    datos = construir_vista_operador(resultado)
+    if not VistaOperador.objects.filter(proyecto=proyecto).update(datos=datos, version=F('version') + 1):
+        VistaOperador.objects.update_or_create(proyecto=proyecto, defaults={'datos': datos})
+    return datos
+
+
+def incrementar_version_vista(proyecto):
+    """Invalida el ETag de la vista del operador (cambió el estado de alguna pieza)."""
+    VistaOperador.objects.filter(proyecto=proyecto).update(version=F('version') + 1)
+
+
+def vista_con_estados(proyecto, datos):
+    """`datos` de la vista del operador con el estado actual de cada pieza (sólo se leen las
+    piezas que no están pendientes)."""
+    for m, t, p, estado in (PiezaColocada.objects.filter(proyecto=proyecto).exclude(estado='pendiente')
+                            .values_list('material_num', 'tablero_num', 'numero', 'estado')):
+        try:
+            datos[m - 1]['tableros'][t - 1]['piezas'][p - 1]['estado'] = estado
+        except (IndexError, KeyError, TypeError):
+            continue
+    return datos
+
+
+def _filtro_claves(claves):
+    filtro = Q()
+    for m, t, p in claves:
+        filtro |= Q(material_num=m, tablero_num=t, numero=p)
+    return filtro
+
+
+def actualizar_estados(proyecto, cambios, lote=200):
+    """Aplica estados de corte {pieza_id: estado} con UPDATEs atómicos: uno por estado (y por
+    lote de `lote` piezas), sin leer las filas. Ids 'm{m}t{t}p{p}'; en el formato antiguo
+    't{t}p{p}' se toma el primer material que tenga esa pieza.
+
+    Devuelve (actualizadas, ids no encontrados). Si un id se repite vale el último estado.
+    """
+    claves, no_encontradas = {}, []
+    antiguas = {}
+    for pieza_id, estado in cambios.items():
+        clave = clave_pieza(pieza_id)
+        if clave is None:
+            no_encontradas.append(pieza_id)
+        elif clave[0] is None:
+            antiguas[clave[1:]] = (pieza_id, estado)
+        else:
+            claves[clave] = (pieza_id, estado)
+    if antiguas:
+        filtro = Q()
+        for t, p in antiguas:
+            filtro |= Q(tablero_num=t, numero=p)
+        primero = {}
+        for m, t, p in (PiezaColocada.objects.filter(filtro, proyecto=proyecto)
+                        .order_by('material_num').values_list('material_num', 'tablero_num', 'numero')):
+            primero.setdefault((t, p), m)
+        for (t, p), (pieza_id, estado) in antiguas.items():
+            if (t, p) in primero:
+                claves.setdefault((primero[(t, p)], t, p), (pieza_id, estado))
+            else:
+                no_encontradas.append(pieza_id)
+
+    por_estado = {}
+    for clave, (_, estado) in claves.items():
+        por_estado.setdefault(estado, []).append(clave)
+    actualizadas = 0
+    with transaction.atomic():
+        for estado, lista in por_estado.items():
+            for i in range(0, len(lista), lote):
+                actualizadas += PiezaColocada.objects.filter(
+                    _filtro_claves(lista[i:i + lote]), proyecto=proyecto).update(estado=estado)
+        if actualizadas:
+            incrementar_version_vista(proyecto)
+    if actualizadas < len(claves):
+        # Sólo si faltó alguna: cuáles no existen
+        existentes = set()
+        lista = list(claves)
+        for i in range(0, len(lista), lote):
+            existentes.update(PiezaColocada.objects.filter(_filtro_claves(lista[i:i + lote]), proyecto=proyecto)
+                              .values_list('material_num', 'tablero_num', 'numero'))
+        no_encontradas.extend(pieza_id for clave, (pieza_id, _) in claves.items() if clave not in existentes)
+    return actualizadas, no_encontradas
+
+
+def progreso_piezas(proyecto):
+    """Contadores de corte por material y tablero, agregados en la BD (una consulta).
+
+    `pendientes` = piezas aún no cortadas (pendiente, en corte o descartada).
+    """
+    filas = (PiezaColocada.objects.filter(proyecto=proyecto)
+             .values('material_num', 'tablero_num')
+             .annotate(total=Count('id'), cortadas=Count('id', filter=Q(estado='cortada')),
+                       en_corte=Count('id', filter=Q(estado='en_corte')),
+                       descartadas=Count('id', filter=Q(estado='descartada')))
+             .order_by('material_num', 'tablero_num'))
+    contadores = ('total', 'cortadas', 'en_corte', 'descartadas', 'pendientes')
+    progreso = dict.fromkeys(contadores, 0)
+    materiales = {}
+    for fila in filas:
+        fila['pendientes'] = fila['total'] - fila['cortadas']
+        material = materiales.setdefault(fila['material_num'], dict(
+            dict.fromkeys(contadores, 0), material_num=fila['material_num'], tableros=[]))
+        material['tableros'].append(fila)
+        for clave in contadores:
+            material[clave] += fila[clave]
+            progreso[clave] += fila[clave]
+    progreso['materiales'] = list(materiales.values())
+    return progreso
+
+
+def serializar_materiales(proyecto):
+    """Materiales del resultado reconstruidos desde las tablas, con el formato del JSON
+    (`material`, `tableros`, `piezas`...) más el `estado` de cada pieza. Cada pieza sale de
+    `datos` con sus tipos originales; las columnas sólo completan las claves que falten (filas
+    guardadas cuando `datos` no incluía las columnas)."""
+    piezas = {}
+    for fila in PiezaColocada.objects.filter(proyecto=proyecto).values(
+            'material_num', 'tablero_num', 'nombre', 'x', 'y', 'ancho', 'largo', 'rotada', 'estado', 'datos'):
+        pieza = dict(fila.pop('datos') or {})
+        clave = (fila.pop('material_num'), fila.pop('tablero_num'))
+        for columna, valor in fila.items():
+            pieza.setdefault(columna, valor)
+        pieza['estado'] = fila['estado']
+        piezas.setdefault(clave, []).append(pieza)
+    tableros = {}
+    for m, t, datos in Tablero.objects.filter(proyecto=proyecto).values_list('material_num', 'numero', 'datos'):
+        tableros.setdefault(m, []).append(dict(datos or {}, piezas=piezas.get((m, t), [])))
+    return [
+        dict(datos or {}, tableros=tableros.get(m, []))
+        for m, datos in ResultadoMaterial.objects.filter(proyecto=proyecto).values_list('numero', 'datos')
+    ]
+
+
+def resultado_compatible(proyecto, resultado=None):
+    """El resultado del proyecto con el formato de `resultado_optimizacion` y los estados de
+    pieza de las tablas. Sin filas (proyecto sin normalizar ni resultado) devuelve el JSON."""
+    if resultado is None:
+        resultado = cargar_resultado(proyecto)
+    if not asegurar_normalizado(proyecto, resultado):
+        return resultado
+    materiales = serializar_materiales(proyecto)
+    if isinstance(resultado.get('materiales'), list):
+        return dict(resultado, materiales=materiales)
+    return materiales[0] if materiales else resultado
@@ -1,6 +1,6 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AnonymousUser
 
 from .models import (
@@ -54,15 +54,17 @@ def _log(verb: str, instance: models.Model):
         changes = None
 
     try:
-        AuditLog.objects.create(
-            actor=actor,
-            organizacion=org,
-            verb=verb,
-            target_model=instance.__class__.__name__,
-            target_id=str(getattr(instance, 'pk', '')),
-            target_repr=str(instance),
-            changes=changes,
-        )
+        # Savepoint: si el registro falla dentro de una transacción, ésta sigue siendo usable
+        with transaction.atomic():
+            AuditLog.objects.create(
+                actor=actor,
+                organizacion=org,
+                verb=verb,
+                target_model=instance.__class__.__name__,
+                target_id=str(getattr(instance, 'pk', '')),
+                target_repr=str(instance),
+                changes=changes,
+            )
     except Exception:
         # Silenciar errores de auditoría para no romper la operación principal
         pass
@@ -0,0 +1,40 @@
+"""Motor de optimización de cortes, independiente de Django.
+
+Uso típico:
+
+    from optimizer import Configuracion, Pieza, optimizar
+
+    resultado = optimizar(
+        [Pieza('Lateral', 560, 720, cantidad=2)],
+        Configuracion(ancho=1830, largo=2500, desperdicio_sierra=3, estrategia='maxrects'),
+    )
+    resultado.total_tableros, resultado.datos  # datos: dict JSON que guardan los proyectos
+
+Las vistas (`WowDash.optimizer_views`) sólo adaptan la petición y persisten el resultado; los
+procesos hijos (portafolio y optimización por lotes) importan este paquete sin cargar Django
+ni las librerías de PDF.
+"""
+from .api import (
+    PARAMETROS_CONFIGURACION,
+    Configuracion,
+    Pieza,
+    PiezaUbicada,
+    Resultado,
+    Tablero,
+    ejecutar_configuracion,
+    motor_desde_configuracion,
+    optimizar,
+)
+from .bounds import tableros_minimo
+from .engine import OptimizationEngine
+from .geometry import np
+from .portfolio import PORTAFOLIO_CANDIDATOS, optimizar_portafolio, procesos_maximos
+from .strategies import ESTRATEGIAS, Estrategia, registrar_estrategia
+
+__all__ = [
+    'PARAMETROS_CONFIGURACION', 'Configuracion', 'Pieza', 'PiezaUbicada', 'Resultado', 'Tablero',
+    'ejecutar_configuracion', 'motor_desde_configuracion', 'optimizar',
+    'tableros_minimo', 'OptimizationEngine', 'np',
+    'PORTAFOLIO_CANDIDATOS', 'optimizar_portafolio', 'procesos_maximos',
+    'ESTRATEGIAS', 'Estrategia', 'registrar_estrategia',
+]
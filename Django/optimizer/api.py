@@ -0,0 +1,174 @@
+"""API estable del optimizador.
+
+Dos niveles:
+- Tipado: `optimizar(piezas, configuracion)` con dataclasses (`Pieza`, `Configuracion`) que
+  devuelve un `Resultado`. Es la forma recomendada de usar el motor desde código Python.
+- Configuración como dict (el `configuracion_material` que guardan los proyectos):
+  `ejecutar_configuracion(...)` y `motor_desde_configuracion(...)`, usados por las vistas.
+
+Nada de este paquete importa Django.
+"""
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .engine import OptimizationEngine
+from .portfolio import optimizar_portafolio
+
+
+# Claves de `configuracion_material` que leen `motor_desde_configuracion` y
+# `ejecutar_configuracion`: cualquier cambio en ellas puede cambiar el layout.
+PARAMETROS_CONFIGURACION = (
+    'estrategia', 'heuristica', 'orden', 'semilla', 'vectorizado', 'tiempo_limite',
+    'modo', 'presupuesto_segundos', 'reinicios',
+)
+
+
+@dataclass(frozen=True)
+class Pieza:
+    """Tipo de pieza a cortar (medidas en mm)."""
+    nombre: str
+    ancho: float
+    largo: float
+    cantidad: int = 1
+    veta_libre: bool = False
+    tapacantos: Dict[str, bool] = field(default_factory=dict)
+
+    def como_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class Configuracion:
+    """Tablero y parámetros del motor. `modo='portafolio'` prueba varias estrategias en paralelo
+    dentro de `presupuesto_segundos`; si no, pasada única mejorada hasta `tiempo_limite`."""
+    ancho: float
+    largo: float
+    margen_x: float = 0
+    margen_y: float = 0
+    desperdicio_sierra: float = 3
+    estrategia: str = 'bottom_left'
+    heuristica: str = 'bssf'
+    orden: str = 'area'
+    semilla: Optional[int] = None
+    vectorizado: bool = False
+    tiempo_limite: Optional[float] = None
+    modo: Optional[str] = None
+    presupuesto_segundos: float = 10
+    reinicios: int = 4
+
+    def como_configuracion_material(self) -> Dict[str, Any]:
+        """Parámetros del motor en el formato de `configuracion_material`."""
+        return {k: getattr(self, k) for k in PARAMETROS_CONFIGURACION}
+
+
+@dataclass(frozen=True)
+class PiezaUbicada:
+    """Unidad colocada; `x`, `y` incluyen el margen del tablero y `ancho`/`largo` la rotación."""
+    nombre: str
+    id_unico: str
+    x: float
+    y: float
+    ancho: float
+    largo: float
+    rotada: bool
+    veta_libre: bool = False
+    tapacantos: Dict[str, bool] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class Tablero:
+    numero: int
+    piezas: Tuple[PiezaUbicada, ...]
+    area_utilizada: float
+    eficiencia: float
+    cortes: Optional[Tuple[Dict[str, Any], ...]] = None
+
+
+@dataclass(frozen=True)
+class Resultado:
+    """Resultado tipado. `datos` conserva el dict JSON completo del motor (el formato que se
+    guarda en los proyectos), incluidos los resúmenes opcionales ('anytime', 'portafolio')."""
+    tableros: Tuple[Tablero, ...]
+    total_tableros: int
+    total_piezas: int
+    piezas_no_colocadas: int
+    eficiencia: float
+    tableros_minimo_teorico: Optional[int]
+    tiempo_optimizacion: float
+    datos: Dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> 'Resultado':
+        tableros = []
+        for t in datos.get('tableros') or []:
+            piezas = tuple(
+                PiezaUbicada(
+                    nombre=p['nombre'], id_unico=p['id_unico'], x=p['x'], y=p['y'],
+                    ancho=p['ancho'], largo=p['largo'], rotada=bool(p['rotada']),
+                    veta_libre=bool(p.get('veta_libre', False)), tapacantos=p.get('tapacantos') or {},
+                )
+                for p in t.get('piezas') or []
+            )
+            cortes = tuple(t['cortes']) if t.get('cortes') is not None else None
+            tableros.append(Tablero(
+                numero=t['id'], piezas=piezas, area_utilizada=t.get('area_utilizada', 0),
+                eficiencia=t.get('eficiencia_tablero', 0), cortes=cortes,
+            ))
+        return cls(
+            tableros=tuple(tableros),
+            total_tableros=datos.get('total_tableros', len(tableros)),
+            total_piezas=datos.get('total_piezas', 0),
+            piezas_no_colocadas=datos.get('piezas_no_colocadas', 0),
+            eficiencia=datos.get('eficiencia', 0),
+            tableros_minimo_teorico=datos.get('tableros_minimo_teorico'),
+            tiempo_optimizacion=datos.get('tiempo_optimizacion', 0),
+            datos=datos,
+        )
+
+    def como_dict(self) -> Dict[str, Any]:
+        return self.datos
+
+
+def motor_desde_configuracion(conf_mat: Optional[Dict[str, Any]], ancho_tablero, largo_tablero,
+                              margen_x, margen_y, desperdicio_sierra) -> OptimizationEngine:
+    """Motor configurado según `configuracion_material` (estrategia, heurística, orden...)."""
+    conf_mat = conf_mat or {}
+    return OptimizationEngine(
+        ancho_tablero, largo_tablero, margen_x, margen_y, desperdicio_sierra,
+        estrategia=conf_mat.get('estrategia') or 'bottom_left',
+        heuristica=conf_mat.get('heuristica') or 'bssf',
+        orden=conf_mat.get('orden') or 'area',
+        semilla=conf_mat.get('semilla'),
+        vectorizado=bool(conf_mat.get('vectorizado')),
+    )
+
+
+def ejecutar_configuracion(conf_mat: Optional[Dict[str, Any]], ancho_tablero, largo_tablero, margen_x,
+                           margen_y, desperdicio_sierra, piezas: List[Dict[str, Any]],
+                           progreso: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+    """Ejecuta el motor según `configuracion_material`: `modo: 'portafolio'` con
+    `presupuesto_segundos`, o pasada única mejorada hasta `tiempo_limite` segundos si se indica.
+    Devuelve el resultado como dict JSON."""
+    conf_mat = conf_mat or {}
+    if conf_mat.get('modo') == 'portafolio':
+        return optimizar_portafolio(
+            ancho_tablero, largo_tablero, margen_x, margen_y, desperdicio_sierra, piezas,
+            presupuesto_segundos=float(conf_mat.get('presupuesto_segundos') or 10),
+            reinicios=int(conf_mat.get('reinicios') or 4),
+        )
+    engine = motor_desde_configuracion(conf_mat, ancho_tablero, largo_tablero, margen_x, margen_y,
+                                       desperdicio_sierra)
+    tiempo_limite = conf_mat.get('tiempo_limite')
+    return engine.optimizar_piezas(piezas, tiempo_limite=float(tiempo_limite) if tiempo_limite else None,
+                                   progreso=progreso)
+
+
+def optimizar(piezas: Sequence[Pieza], configuracion: Configuracion,
+              progreso: Optional[Callable[[int], None]] = None) -> Resultado:
+    """Optimiza las piezas sobre el tablero de `configuracion`."""
+    c = configuracion
+    datos = ejecutar_configuracion(
+        c.como_configuracion_material(), c.ancho, c.largo, c.margen_x, c.margen_y,
+        c.desperdicio_sierra, [p.como_dict() for p in piezas], progreso=progreso,
+    )
+    return Resultado.desde_dict(datos)
@@ -0,0 +1,228 @@
+"""Benchmark del motor con listas de corte sintéticas y reproducibles.
+
+Cada escenario genera siempre la misma lista para una semilla dada (cocinas, closets, listones,
+piezas casi del tamaño del tablero, con y sin `veta_libre`). `ejecutar_suite` mide por escenario
+y configuración del motor el tiempo, la memoria pico, los tableros usados y la eficiencia, y
+devuelve un dict JSON que sirve de línea base; `comparar` lista las regresiones frente a otra.
+
+Se ejecuta con `python manage.py benchmark_optimizador` o directamente desde Python.
+"""
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+from .api import ejecutar_configuracion
+from .engine import OptimizationEngine
+
+TABLERO_ANCHO, TABLERO_LARGO = 2440, 1830
+MARGEN, KERF = 10, 3
+ESPESOR = 18  # placa de 18 mm para el despiece de muebles
+
+# Anchos típicos de módulos de cocina y closet (mm)
+ANCHOS_MODULO = (300, 400, 450, 500, 600, 800, 900)
+
+
+class _Lista:
+    """Acumula piezas agrupando por (nombre, medidas) como lo hace el formulario del optimizador."""
+
+    def __init__(self, veta_libre):
+        self.veta_libre = veta_libre
+        self.piezas = {}
+
+    def agregar(self, nombre, ancho, largo, cantidad=1, veta_libre=None, tapacantos=None):
+        veta = self.veta_libre if veta_libre is None else veta_libre
+        clave = (nombre, int(ancho), int(largo), veta)
+        if clave in self.piezas:
+            self.piezas[clave]['cantidad'] += cantidad
+        else:
+            self.piezas[clave] = {
+                'nombre': nombre, 'ancho': int(ancho), 'largo': int(largo), 'cantidad': cantidad,
+                'veta_libre': veta, 'tapacantos': dict(tapacantos or {}),
+            }
+
+    def lista(self):
+        return list(self.piezas.values())
+
+
+def lista_cocina(semilla, modulos=6, veta_libre=False):
+    """Muebles bajos (560 de fondo) y altos (320 de fondo) con puertas y cajones; las piezas
+    interiores giran libremente, las puertas respetan la veta salvo `veta_libre`."""
+    rnd = random.Random(semilla)
+    lista = _Lista(veta_libre)
+    canto_frente = {'arriba': True}
+    canto_total = {'arriba': True, 'abajo': True, 'izquierda': True, 'derecha': True}
+    for i in range(modulos):
+        ancho = rnd.choice(ANCHOS_MODULO)
+        interior = ancho - 2 * ESPESOR
+        if i % 3 == 2:
+            # mueble alto
+            alto, fondo = rnd.choice((700, 900)), 320
+        else:
+            alto, fondo = 720, 560
+        lista.agregar('Lateral', fondo, alto, 2, veta_libre=True, tapacantos=canto_frente)
+        lista.agregar('Piso/Techo', interior, fondo, 2, veta_libre=True, tapacantos=canto_frente)
+        lista.agregar('Repisa', interior - 2, fondo - 20, rnd.randint(0, 2), veta_libre=True,
+                      tapacantos=canto_frente)
+        if fondo == 560 and rnd.random() < 0.4:
+            # cajonera: frentes más costados y traseras de cajón
+            cajones = rnd.choice((2, 3, 4))
+            lista.agregar('Frente cajón', ancho - 3, alto // cajones - 3, cajones, tapacantos=canto_total)
+            lista.agregar('Costado cajón', 500, 120, 2 * cajones, veta_libre=True)
+            lista.agregar('Trasera cajón', interior - 26, 120, cajones, veta_libre=True)
+        else:
+            puertas = 2 if ancho >= 600 else 1
+            lista.agregar('Puerta', ancho // puertas - 3, alto - 3, puertas, tapacantos=canto_total)
+    return [p for p in lista.lista() if p['cantidad'] > 0]
+
+
+def lista_closet(semilla, cuerpos=3, veta_libre=False):
+    """Cuerpos de closet de 2 m de alto: laterales largos, repisas, divisiones y puertas."""
+    rnd = random.Random(semilla)
+    lista = _Lista(veta_libre)
+    canto_frente = {'arriba': True}
+    for _ in range(cuerpos):
+        ancho = rnd.choice((600, 800, 900, 1000))
+        alto, fondo = rnd.choice((1800, 2000)), rnd.choice((550, 600))
+        interior = ancho - 2 * ESPESOR
+        lista.agregar('Lateral closet', fondo, alto, 2, tapacantos=canto_frente)
+        lista.agregar('Piso/Techo closet', interior, fondo, 2, veta_libre=True, tapacantos=canto_frente)
+        lista.agregar('Repisa closet', interior - 2, fondo - 30, rnd.randint(2, 5), veta_libre=True,
+                      tapacantos=canto_frente)
+        if rnd.random() < 0.5:
+            lista.agregar('División', fondo - 30, rnd.randint(400, 900), 1, tapacantos=canto_frente)
+        lista.agregar('Puerta closet', ancho // 2 - 3, alto - 3, 2,
+                      tapacantos={'arriba': True, 'abajo': True, 'izquierda': True, 'derecha': True})
+    return lista.lista()
+
+
+def lista_listones(semilla, tipos=30, veta_libre=False):
+    """Muchas tiras angostas y largas (zócalos, cantos, refuerzos)."""
+    rnd = random.Random(semilla)
+    lista = _Lista(veta_libre)
+    for i in range(tipos):
+        lista.agregar(f'Listón {i + 1}', rnd.randint(40, 120), rnd.randint(300, 1800), rnd.randint(2, 12))
+    return lista.lista()
+
+
+def lista_casi_tablero(semilla, tipos=8, veta_libre=False):
+    """Piezas grandes, entre la mitad y casi el tablero completo: pocas caben por tablero."""
+    rnd = random.Random(semilla)
+    lista = _Lista(veta_libre)
+    util_ancho, util_largo = TABLERO_ANCHO - 2 * MARGEN, TABLERO_LARGO - 2 * MARGEN
+    for i in range(tipos):
+        lista.agregar(f'Grande {i + 1}', rnd.randint(util_ancho // 2, util_ancho),
+                      rnd.randint(util_largo // 3, util_largo), rnd.randint(1, 3))
+    return lista.lista()
+
+
+# nombre -> (generador, argumentos)
+ESCENARIOS = {
+    'cocina_chica': (lista_cocina, {'modulos': 4}),
+    'cocina_grande': (lista_cocina, {'modulos': 24}),
+    'cocina_grande_veta_libre': (lista_cocina, {'modulos': 24, 'veta_libre': True}),
+    'closet': (lista_closet, {'cuerpos': 4}),
+    'closet_veta_libre': (lista_closet, {'cuerpos': 4, 'veta_libre': True}),
+    'listones': (lista_listones, {'tipos': 40}),
+    'listones_veta_libre': (lista_listones, {'tipos': 40, 'veta_libre': True}),
+    'casi_tablero': (lista_casi_tablero, {'tipos': 10}),
+    'casi_tablero_veta_libre': (lista_casi_tablero, {'tipos': 10, 'veta_libre': True}),
+}
+
+# Configuraciones del motor medidas por defecto (formato `configuracion_material`)
+CONFIGURACIONES = {
+    'bottom_left': {'estrategia': 'bottom_left'},
+    'maxrects_bssf': {'estrategia': 'maxrects', 'heuristica': 'bssf'},
+    'maxrects_baf': {'estrategia': 'maxrects', 'heuristica': 'baf'},
+    'maxrects_bl': {'estrategia': 'maxrects', 'heuristica': 'bl'},
+    'guillotina': {'estrategia': 'guillotina'},
+}
+
+
+def generar_escenario(nombre, semilla=1):
+    generador, argumentos = ESCENARIOS[nombre]
+    return generador(semilla, **argumentos)
+
+
+def _ejecutar(conf, piezas):
+    return ejecutar_configuracion(conf, TABLERO_ANCHO, TABLERO_LARGO, MARGEN, MARGEN, KERF,
+                                  [dict(p) for p in piezas])
+
+
+def medir(piezas, conf, repeticiones=3):
+    """Mide una configuración sobre una lista: mediana y mínimo del tiempo en `repeticiones`
+    corridas y memoria pico (tracemalloc) en una corrida aparte, para no inflar los tiempos."""
+    tiempos = []
+    resultado = None
+    for _ in range(max(1, repeticiones)):
+        inicio = time.perf_counter()
+        resultado = _ejecutar(conf, piezas)
+        tiempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    try:
+        _ejecutar(conf, piezas)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'tiempo_mediana': round(statistics.median(tiempos), 4),
+        'tiempo_min': round(min(tiempos), 4),
+        'memoria_pico_kb': round(pico / 1024, 1),
+        'tableros': resultado['total_tableros'],
+        'tableros_minimo_teorico': resultado.get('tableros_minimo_teorico'),
+        'eficiencia': round(resultado['eficiencia'], 2),
+        'piezas_no_colocadas': resultado.get('piezas_no_colocadas', 0),
+    }
+
+
+def ejecutar_suite(escenarios=None, configuraciones=None, repeticiones=3, semilla=1, al_medir=None):
+    """Corre cada escenario con cada configuración. `al_medir(caso)` se llama tras cada medición
+    (para mostrar avance). Devuelve la línea base como dict JSON."""
+    escenarios = list(escenarios or ESCENARIOS)
+    configuraciones = list(configuraciones or CONFIGURACIONES)
+    casos = []
+    for escenario in escenarios:
+        piezas = generar_escenario(escenario, semilla)
+        unidades = sum(p['cantidad'] for p in piezas)
+        for nombre_conf in configuraciones:
+            caso = {'escenario': escenario, 'configuracion': nombre_conf, 'tipos': len(piezas),
+                    'unidades': unidades}
+            caso.update(medir(piezas, CONFIGURACIONES[nombre_conf], repeticiones))
+            casos.append(caso)
+            if al_medir:
+                al_medir(caso)
+    return {
+        'version_motor': OptimizationEngine.VERSION,
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'maquina': platform.machine(),
+        'semilla': semilla,
+        'repeticiones': repeticiones,
+        'tablero': {'ancho': TABLERO_ANCHO, 'largo': TABLERO_LARGO, 'margen': MARGEN, 'kerf': KERF},
+        'casos': casos,
+    }
+
+
+def comparar(actual, base, tolerancia_tiempo=0.25, tolerancia_memoria=0.25):
+    """Regresiones de `actual` frente a `base` (casos con el mismo escenario y configuración):
+    más tableros, menor eficiencia, tiempo o memoria por sobre la tolerancia relativa.
+    Tiempo y memoria sólo son comparables con líneas base de la misma máquina."""
+    previos = {(c['escenario'], c['configuracion']): c for c in base.get('casos', [])}
+    regresiones = []
+    for caso in actual.get('casos', []):
+        previo = previos.get((caso['escenario'], caso['configuracion']))
+        if not previo:
+            continue
+        nombre = f"{caso['escenario']}/{caso['configuracion']}"
+        if caso['tableros'] > previo['tableros']:
+            regresiones.append(f"{nombre}: tableros {previo['tableros']} -> {caso['tableros']}")
+        if caso['eficiencia'] < previo['eficiencia'] - 0.01:
+            regresiones.append(f"{nombre}: eficiencia {previo['eficiencia']} -> {caso['eficiencia']}")
+        if caso['tiempo_mediana'] > previo['tiempo_mediana'] * (1 + tolerancia_tiempo) + 0.005:
+            regresiones.append(f"{nombre}: tiempo {previo['tiempo_mediana']}s -> {caso['tiempo_mediana']}s")
+        if caso['memoria_pico_kb'] > previo['memoria_pico_kb'] * (1 + tolerancia_memoria) + 64:
+            regresiones.append(
+                f"{nombre}: memoria pico {previo['memoria_pico_kb']} KB -> {caso['memoria_pico_kb']} KB")
+    return regresiones
@@ -0,0 +1,127 @@
+"""Cotas inferiores del número de tableros para el optimizador.
+
+Sirven para saber cuándo un layout ya es óptimo en cantidad de tableros: si el motor encuentra
+una solución con `tableros_minimo(...)` tableros, ninguna búsqueda adicional puede mejorarla.
+
+Todas las cotas trabajan sobre tipos de pieza (con `cantidad`) y el área útil del tablero
+(sin márgenes). El desperdicio de sierra `kerf` se incorpora inflando cada pieza y el tablero
+en `kerf`: dos piezas separadas por al menos `kerf` equivalen a rectángulos inflados que no se
+solapan dentro del tablero inflado. Con `veta_libre` la pieza puede rotar, así que cada
+condición se exige en todas sus orientaciones posibles (la cota sigue siendo válida, sólo
+puede quedar algo más baja).
+
+- `cota_area`: área total / área del tablero (L0).
+- `cota_l1`: piezas de más de medio tablero de ancho (o de largo) no pueden ir lado a lado;
+  se apilan, y sobre esa pila se aplica la cota L2 de Martello-Toth para bin packing 1D.
+- `cota_l2`: variante de la cota L2 de Martello-Vigo para bin packing 2D: para umbrales (q, p),
+  las piezas que dejan menos de q de ancho y p de largo libres no comparten tablero con piezas
+  de al menos (q, p); el área de éstas se reparte en el resto de los tableros. Se evalúa en una
+  muestra de umbrales.
+"""
+import math
+from typing import Any, Dict, List, Tuple
+
+# Máximo de umbrales p/q evaluados por eje en `cota_l2`
+MAX_UMBRALES = 16
+_EPS = 1e-9
+
+
+def _techo(valor: float) -> int:
+    return max(0, math.ceil(valor - _EPS))
+
+
+def _tipos_inflados(piezas: List[Dict[str, Any]], ancho: float, largo: float,
+                    kerf: float) -> List[Tuple[List[Tuple[float, float]], int]]:
+    """(orientaciones infladas (ancho, largo), cantidad) de las piezas que caben en el tablero."""
+    tipos = []
+    for p in piezas:
+        cantidad = int(p.get('cantidad', 1) or 0)
+        a, l = float(p['ancho']), float(p['largo'])
+        if cantidad <= 0 or a <= 0 or l <= 0:
+            continue
+        orientaciones = [(a, l)]
+        if p.get('veta_libre', False) and a != l:
+            orientaciones.append((l, a))
+        orientaciones = [(w + kerf, h + kerf) for w, h in orientaciones if w <= ancho and h <= largo]
+        if orientaciones:
+            tipos.append((orientaciones, cantidad))
+    return tipos
+
+
+def _cota_1d(tamanos: List[Tuple[float, int]], capacidad: float) -> int:
+    """Cota L2 de Martello-Toth para bin packing 1D; `tamanos` es una lista de (tamaño, cantidad)."""
+    if not tamanos:
+        return 0
+    mitad = capacidad / 2
+    mejor = _techo(sum(s * c for s, c in tamanos) / capacidad)
+    for alfa in {0.0} | {s for s, _ in tamanos if s <= mitad}:
+        n_grandes = n_medianos = 0
+        suma_medianos = suma_chicos = 0.0
+        for s, c in tamanos:
+            if s > capacidad - alfa:
+                n_grandes += c
+            elif s > mitad:
+                n_medianos += c
+                suma_medianos += s * c
+            elif s >= alfa:
+                suma_chicos += s * c
+        sobrante = n_medianos * capacidad - suma_medianos
+        mejor = max(mejor, n_grandes + n_medianos + _techo((suma_chicos - sobrante) / capacidad))
+    return mejor
+
+
+def cota_area(piezas: List[Dict[str, Any]], ancho: float, largo: float, kerf: float = 0) -> int:
+    tipos = _tipos_inflados(piezas, ancho, largo, kerf)
+    area = sum(o[0][0] * o[0][1] * c for o, c in tipos)
+    return _techo(area / ((ancho + kerf) * (largo + kerf)))
+
+
+def cota_l1(piezas: List[Dict[str, Any]], ancho: float, largo: float, kerf: float = 0) -> int:
+    tipos = _tipos_inflados(piezas, ancho, largo, kerf)
+    ancho_k, largo_k = ancho + kerf, largo + kerf
+    # Piezas anchas (en toda orientación) se apilan a lo largo; piezas largas, a lo ancho
+    anchas = [(min(h for _, h in o), c) for o, c in tipos if all(w > ancho_k / 2 for w, _ in o)]
+    largas = [(min(w for w, _ in o), c) for o, c in tipos if all(h > largo_k / 2 for _, h in o)]
+    return max(_cota_1d(anchas, largo_k), _cota_1d(largas, ancho_k))
+
+
+def _umbrales(valores, maximo):
+    valores = sorted(set(valores))
+    if len(valores) > maximo:
+        paso = len(valores) / maximo
+        valores = [valores[int(i * paso)] for i in range(maximo)]
+    return valores
+
+
+def cota_l2(piezas: List[Dict[str, Any]], ancho: float, largo: float, kerf: float = 0) -> int:
+    tipos = _tipos_inflados(piezas, ancho, largo, kerf)
+    if not tipos:
+        return 0
+    W, H = ancho + kerf, largo + kerf
+    area_tablero = W * H
+    ps = _umbrales([h for o, _ in tipos for _, h in o if h <= H / 2], MAX_UMBRALES) or [H / 2]
+    qs = _umbrales([w for o, _ in tipos for w, _ in o if w <= W / 2], MAX_UMBRALES) or [W / 2]
+    mejor = 0
+    for p in ps:
+        for q in qs:
+            n_exclusivas = n_grandes = 0
+            area = 0.0
+            for o, c in tipos:
+                if all(h > H - p and w > W - q for w, h in o):
+                    # No deja espacio útil para piezas >= (q, p)
+                    n_exclusivas += c
+                elif all(h > H / 2 and w > W / 2 for w, h in o):
+                    n_grandes += c
+                    area += o[0][0] * o[0][1] * c
+                elif all(p <= h <= H / 2 and q <= w <= W / 2 for w, h in o):
+                    area += o[0][0] * o[0][1] * c
+            # Las piezas chicas sólo caben en tableros de piezas grandes o en tableros nuevos
+            mejor = max(mejor, n_exclusivas + n_grandes + _techo((area - n_grandes * area_tablero) / area_tablero))
+    return mejor
+
+
+def tableros_minimo(piezas: List[Dict[str, Any]], ancho: float, largo: float, kerf: float = 0) -> int:
+    """Mayor de las cotas inferiores: ningún layout válido usa menos tableros."""
+    return max(cota_area(piezas, ancho, largo, kerf),
+               cota_l1(piezas, ancho, largo, kerf),
+               cota_l2(piezas, ancho, largo, kerf))
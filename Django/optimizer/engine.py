@@ -0,0 +1,564 @@
+"""Motor de optimización de cortes (puro Python, sin Django).
+
+`OptimizationEngine` recibe las piezas como dicts (nombre, ancho, largo, cantidad, veta_libre,
+tapacantos) y devuelve el resultado como dict JSON (el formato que guardan los proyectos).
+La API tipada está en `optimizer.api`.
+"""
+import bisect
+import json
+import random
+import time
+
+from . import bounds
+from .geometry import EspacioLibre, IndiceEspacial, np
+from .strategies import ESTRATEGIAS
+
+
+class _PiezaColocada:
+    """Pieza colocada durante la optimización. Registro compacto (sin dict por pieza) que sólo
+    referencia el tipo de pieza de entrada; se convierte al dict del JSON en `_generar_resultado`.
+    """
+    __slots__ = ('tipo', 'id_unico', 'x', 'y', 'ancho', 'largo', 'rotada')
+
+    def __init__(self, tipo, id_unico, x, y, ancho, largo, rotada):
+        self.tipo = tipo
+        self.id_unico = id_unico
+        self.x, self.y = x, y
+        self.ancho, self.largo = ancho, largo
+        self.rotada = rotada
+
+    def como_dict(self, dx=0, dy=0):
+        return {
+            'nombre': self.tipo['nombre'],
+            'id_unico': self.id_unico,
+            'x': self.x + dx, 'y': self.y + dy,
+            'ancho': self.ancho, 'largo': self.largo,
+            'rotada': self.rotada,
+            'tapacantos': self.tipo.get('tapacantos', {}),
+            'veta_libre': self.tipo.get('veta_libre', False)
+        }
+
+
+class OptimizationEngine:
+    """Motor de optimización simplificado que evita superposiciones.
+
+    Estrategias de colocación (ver `optimizer.strategies`; se pueden registrar otras):
+    - 'bottom_left' (por defecto): esquinas de piezas colocadas en orden (y, x) y, si no
+      hay ninguna libre, la esquina más baja de un rectángulo libre maximal donde cabe.
+    - 'maxrects': elige entre los rectángulos libres maximales según `heuristica`
+      ('bssf' best-short-side-fit, 'baf' best-area-fit, 'bl' bottom-left).
+    - 'guillotina': sólo cortes pasantes; cada tablero lleva su árbol de cortes y el
+      resultado incluye la secuencia en `tablero['cortes']`.
+
+    `orden` define en qué orden se intentan las piezas: 'area' (por defecto), 'perimetro',
+    'lado_mayor', 'ancho_largo' o 'aleatorio' (orden por área perturbado con `semilla`).
+
+    Con `vectorizado=True` y NumPy instalado, 'bottom_left' prueba todos los candidatos de una
+    vez (`IndiceEspacial.primer_punto_libre`); sin NumPy se usa la ruta normal.
+    """
+    # Cambiar al modificar el resultado del motor: forma parte de la clave de `optimizer_cache`
+    VERSION = '4'
+    ORDENES = ('area', 'perimetro', 'lado_mayor', 'ancho_largo', 'aleatorio')
+
+    def __init__(self, tablero_ancho, tablero_largo, margen_x, margen_y, desperdicio_sierra,
+                 estrategia='bottom_left', heuristica='bssf', orden='area', semilla=None,
+                 vectorizado=False):
+        if estrategia not in ESTRATEGIAS:
+            raise ValueError(f"Estrategia de optimización desconocida: {estrategia}")
+        if heuristica not in EspacioLibre.HEURISTICAS:
+            raise ValueError(f"Heurística MaxRects desconocida: {heuristica}")
+        if orden not in self.ORDENES:
+            raise ValueError(f"Orden de piezas desconocido: {orden}")
+        self.tablero_ancho_original = tablero_ancho
+        self.tablero_largo_original = tablero_largo
+        self.tablero_ancho = tablero_ancho - (2 * margen_x)
+        self.tablero_largo = tablero_largo - (2 * margen_y)
+        self.margen_x = margen_x
+        self.margen_y = margen_y
+        self.desperdicio_sierra = desperdicio_sierra
+        self.estrategia = estrategia
+        self.heuristica = heuristica
+        self.orden = orden
+        self.semilla = semilla
+        self.vectorizado = bool(vectorizado) and np is not None
+        self._estrategia = ESTRATEGIAS[estrategia](self)
+        self.tableros = []
+        # Estructuras auxiliares por tablero (clave: id del tablero); no forman parte del resultado JSON
+        self._indices = {}
+        self._espacios = {}
+        self._arboles = {}
+
+    def _indice(self, tablero):
+        return self._indices[tablero['id']]
+
+    def _espacio(self, tablero):
+        return self._espacios[tablero['id']]
+
+    def optimizar_piezas(self, piezas, tiempo_limite=None, progreso=None, plazo=None):
+        """Algoritmo de optimización principal (modo anytime).
+
+        Primero se construye una solución voraz completa. Si se indica `tiempo_limite` (segundos),
+        se intenta mejorarla hasta ese plazo reempaquetando con secuencias modificadas
+        (eliminación del tablero menos lleno e intercambios locales) y se devuelve siempre el
+        mejor layout completo encontrado. El resumen queda en `resultado['anytime']`.
+        La mejora se detiene antes si el layout ya usa `tableros_minimo_teorico` tableros
+        (cota inferior de `optimizer.bounds`): no puede haber uno con menos.
+
+        `plazo` (timestamp) es un tope duro: si la pasada voraz no termina antes, las unidades
+        que faltan quedan en `piezas_no_colocadas` y el resultado lleva `plazo_vencido`.
+
+        `progreso`, si se indica, se llama con el porcentaje de avance (0-100).
+        """
+        tiempo_inicio = time.time()
+        cota = self._tableros_minimo(piezas)
+        imposibles = self._unidades_imposibles(piezas)
+
+        # Con mejora anytime, la pasada voraz cuenta como el primer 50 %
+        escala = 50 if tiempo_limite else 100
+        mejor = self._empaquetar(
+            self._secuencia(piezas),
+            progreso=(lambda pct: progreso(pct * escala // 100)) if progreso else None,
+            corte=plazo,
+        )
+        tiempo_primera = time.time() - tiempo_inicio
+        inicial = self._puntaje_empaque(mejor)
+        iteraciones = mejoras = 0
+        if tiempo_limite:
+            limite = tiempo_inicio + float(tiempo_limite)
+            if plazo is not None:
+                limite = min(limite, plazo)
+            rnd = random.Random(self.semilla if self.semilla is not None else 0)
+            while time.time() < limite and not self._en_cota(mejor, cota, imposibles):
+                if progreso:
+                    progreso(50 + int(50 * (time.time() - tiempo_inicio) / float(tiempo_limite)))
+                iteraciones += 1
+                if iteraciones % 4 == 1:
+                    secuencia = self._secuencia_sin_tablero_menor(mejor)
+                else:
+                    secuencia = list(mejor['secuencia'])
+                    i = rnd.randrange(len(secuencia))
+                    j = min(len(secuencia) - 1, i + rnd.randint(1, 5))
+                    secuencia[i], secuencia[j] = secuencia[j], secuencia[i]
+                candidato = self._empaquetar(secuencia, limite)
+                if candidato is not None and self._puntaje_empaque(candidato) < self._puntaje_empaque(mejor):
+                    mejor = candidato
+                    mejoras += 1
+
+        self.tableros, self._arboles = mejor['tableros'], mejor['arboles']
+        if progreso:
+            progreso(100)
+        # Generar resultado y ajustar métricas
+        resultado = self._generar_resultado()
+        resultado['piezas_no_colocadas'] = len(mejor['no_colocadas'])
+        resultado['tiempo_optimizacion'] = time.time() - tiempo_inicio
+        resultado['tableros_minimo_teorico'] = cota
+        if mejor.get('plazo_vencido'):
+            resultado['plazo_vencido'] = True
+        if tiempo_limite:
+            final = self._puntaje_empaque(mejor)
+            resultado['anytime'] = {
+                'tiempo_limite': float(tiempo_limite),
+                'tiempo_primera_solucion': tiempo_primera,
+                'iteraciones': iteraciones,
+                'mejoras': mejoras,
+                'tableros_iniciales': inicial[1],
+                'tableros_finales': final[1],
+                'tableros_ahorrados': inicial[1] - final[1],
+                'cota_alcanzada': self._en_cota(mejor, cota, imposibles),
+            }
+        return resultado
+
+    def _tableros_minimo(self, piezas):
+        return bounds.tableros_minimo(piezas, self.tablero_ancho, self.tablero_largo,
+                                                self.desperdicio_sierra)
+
+    def _unidades_imposibles(self, piezas):
+        """Unidades que no caben en el tablero en ninguna orientación (nunca se colocan)."""
+        return sum(p.get('cantidad', 1) for p in piezas if not self._orientaciones(p))
+
+    @staticmethod
+    def _en_cota(empaque, cota, imposibles=0):
+        """True si el empaque coloca todo lo que cabe con la cantidad mínima posible de tableros."""
+        return len(empaque['no_colocadas']) <= imposibles and len(empaque['tableros']) <= cota
+
+    def reoptimizar(self, previo, piezas, progreso=None):
+        """Re-optimización incremental a partir de un resultado anterior de este motor.
+
+        Compara las piezas colocadas en `previo` con la nueva lista `piezas` por tipo (nombre,
+        medidas, veta y tapacantos; la rotación no cuenta):
+        - Las unidades que sobran se quitan de los últimos tableros y esos tableros se
+          reempaquetan con las piezas que les quedan.
+        - Los demás tableros quedan congelados: mismas piezas en las mismas posiciones.
+        - Las unidades nuevas y las de tableros reempaquetados se colocan primero en el espacio
+          libre de los tableros congelados y recién después en tableros nuevos. Los tableros con
+          secuencia de cortes guillotina (o si la estrategia no admite tableros restaurados,
+          como 'guillotina') no reciben piezas.
+        Los tableros reempaquetados ocupan el lugar de los originales y los nuevos van al final.
+        El resumen queda en `resultado['incremental']`.
+
+        Lanza ValueError si `previo` no es un resultado del motor con las mismas medidas útiles,
+        márgenes y desperdicio de sierra.
+        """
+        tiempo_inicio = time.time()
+        margenes = previo.get('margenes') or {}
+        if (previo.get('origen') == 'frontend' or not previo.get('tableros')
+                or previo.get('tablero_ancho_efectivo') != self.tablero_ancho
+                or previo.get('tablero_largo_efectivo') != self.tablero_largo
+                or margenes.get('margen_x') != self.margen_x or margenes.get('margen_y') != self.margen_y
+                or previo.get('desperdicio_sierra') != self.desperdicio_sierra):
+            raise ValueError('El resultado anterior no corresponde a la configuración actual')
+
+        tipos, pedidas = {}, {}
+        for p in piezas:
+            clave = self._clave_tipo(p['nombre'], p['ancho'], p['largo'], p.get('veta_libre', False),
+                                     p.get('tapacantos'))
+            tipos.setdefault(clave, p)
+            pedidas[clave] = pedidas.get(clave, 0) + int(p.get('cantidad', 1))
+
+        # Tableros anteriores como registros del motor (coordenadas sin márgenes)
+        previos, colocadas = [], {}
+        for t in previo['tableros']:
+            registros = []
+            for d in t.get('piezas') or []:
+                ancho, largo = (d['largo'], d['ancho']) if d.get('rotada') else (d['ancho'], d['largo'])
+                clave = self._clave_tipo(d.get('nombre'), ancho, largo, d.get('veta_libre', False),
+                                         d.get('tapacantos'))
+                registro = _PiezaColocada(
+                    tipos.get(clave, d), d.get('id_unico') or d.get('nombre'),
+                    d['x'] - self.margen_x, d['y'] - self.margen_y, d['ancho'], d['largo'], bool(d.get('rotada')),
+                )
+                registros.append(registro)
+                colocadas.setdefault(clave, []).append((len(previos), registro))
+            previos.append({'piezas': registros, 'cortes': t.get('cortes')})
+
+        # Diferencia por tipo: quitar sobrantes (de los últimos tableros) y agregar faltantes
+        afectados, quitar, pendientes = set(), set(), []
+        piezas_quitadas = piezas_agregadas = 0
+        for clave, lista in colocadas.items():
+            sobran = len(lista) - pedidas.get(clave, 0)
+            if sobran > 0:
+                lista.sort(key=lambda e: (e[0], self._numero_unidad(e[1].id_unico)))
+                for i_tablero, registro in lista[-sobran:]:
+                    quitar.add(id(registro))
+                    afectados.add(i_tablero)
+                piezas_quitadas += sobran
+        for clave, cantidad in pedidas.items():
+            actuales = colocadas.get(clave, [])
+            faltan = cantidad - len(actuales)
+            if faltan > 0:
+                ultimo = max((self._numero_unidad(r.id_unico) for _, r in actuales), default=0)
+                pendientes.extend((tipos[clave], ultimo + k + 1) for k in range(faltan))
+                piezas_agregadas += faltan
+        piezas_reubicadas = 0
+        for i in sorted(afectados):
+            restantes = [r for r in previos[i]['piezas'] if id(r) not in quitar]
+            pendientes.extend((r.tipo, self._numero_unidad(r.id_unico)) for r in restantes)
+            piezas_reubicadas += len(restantes)
+        pendientes.sort(key=lambda u: (-(u[0]['ancho'] * u[0]['largo']), -max(u[0]['ancho'], u[0]['largo'])))
+
+        # Tableros congelados. Su índice y espacio libre se reconstruyen sólo si se intenta
+        # colocar algo en ellos; antes se descartan por área libre.
+        self.tableros = []
+        self._indices, self._espacios, self._arboles = {}, {}, {}
+        area_tablero = self.tablero_ancho * self.tablero_largo
+        congelados, abiertos, sin_restaurar, libre = {}, [], set(), {}
+        for i, t in enumerate(previos):
+            if i in afectados:
+                continue
+            tablero = self._crear_nuevo_tablero()
+            self._arboles.pop(tablero['id'], None)
+            tablero['piezas'] = t['piezas']
+            if t['cortes']:
+                tablero['cortes'] = t['cortes']
+            elif self._estrategia.admite_tableros_restaurados:
+                abiertos.append(tablero)
+            self.tableros.append(tablero)
+            congelados[i] = tablero
+            sin_restaurar.add(tablero['id'])
+            libre[tablero['id']] = area_tablero - sum(r.ancho * r.largo for r in t['piezas'])
+
+        nuevos, modificados, no_colocadas = [], set(), []
+        paso_progreso = max(1, len(pendientes) // 50)
+        for n_unidad, unidad in enumerate(pendientes):
+            if progreso and n_unidad % paso_progreso == 0:
+                progreso(n_unidad * 100 // len(pendientes))
+            pieza, numero = unidad
+            id_unico = f"{pieza['nombre']}_{numero}"
+            area = pieza['ancho'] * pieza['largo']
+            destino = None
+            for tablero in abiertos + nuevos:
+                if area > libre[tablero['id']]:
+                    continue
+                if tablero['id'] in sin_restaurar:
+                    sin_restaurar.discard(tablero['id'])
+                    for r in tablero['piezas']:
+                        self._indice(tablero).agregar(r.x, r.y, r.ancho, r.largo)
+                        self._espacio(tablero).ocupar(r.x, r.y, r.ancho, r.largo)
+                if self._colocar_pieza_en_tablero(tablero, pieza, id_unico):
+                    destino = tablero
+                    break
+            if destino is None:
+                nuevo = self._crear_nuevo_tablero()
+                if not self._colocar_pieza_en_tablero(nuevo, pieza, id_unico):
+                    no_colocadas.append(unidad)
+                    continue
+                self.tableros.append(nuevo)
+                nuevos.append(nuevo)
+                libre[nuevo['id']] = area_tablero
+                destino = nuevo
+            libre[destino['id']] -= area
+            modificados.add(destino['id'])
+
+        congelados_modificados = sum(1 for t in congelados.values() if t['id'] in modificados)
+        # Orden final: reempaquetados en el lugar de los afectados, el resto al final
+        restantes = iter(nuevos)
+        orden = []
+        for i in range(len(previos)):
+            tablero = next(restantes, None) if i in afectados else congelados[i]
+            if tablero is not None:
+                orden.append(tablero)
+        orden.extend(restantes)
+        arboles = {}
+        for numero, tablero in enumerate(orden, 1):
+            if tablero['id'] in self._arboles:
+                arboles[numero] = self._arboles[tablero['id']]
+            tablero['id'] = numero
+        self.tableros, self._arboles = orden, arboles
+
+        if progreso:
+            progreso(100)
+        resultado = self._generar_resultado()
+        resultado['piezas_no_colocadas'] = len(no_colocadas)
+        resultado['tiempo_optimizacion'] = time.time() - tiempo_inicio
+        resultado['tableros_minimo_teorico'] = self._tableros_minimo(piezas)
+        resultado['incremental'] = {
+            'tableros_conservados': len(congelados) - congelados_modificados,
+            'tableros_ampliados': congelados_modificados,
+            'tableros_reempaquetados': len(afectados),
+            'tableros_nuevos': max(0, len(nuevos) - len(afectados)),
+            'piezas_agregadas': piezas_agregadas,
+            'piezas_quitadas': piezas_quitadas,
+            'piezas_reubicadas': piezas_reubicadas,
+        }
+        return resultado
+
+    @staticmethod
+    def _clave_tipo(nombre, ancho, largo, veta_libre, tapacantos):
+        """Identidad de un tipo de pieza al comparar la entrada con un resultado anterior."""
+        return (nombre, ancho, largo, bool(veta_libre), json.dumps(tapacantos or {}, sort_keys=True))
+
+    @staticmethod
+    def _numero_unidad(id_unico):
+        """Número de unidad de un `id_unico` con formato 'nombre_numero' (0 si no lo tiene)."""
+        try:
+            return int(str(id_unico).rsplit('_', 1)[1])
+        except (IndexError, ValueError):
+            return 0
+
+    def _empaquetar(self, secuencia, limite=None, progreso=None, corte=None):
+        """Coloca las unidades (tipo, número) en el orden dado sobre tableros nuevos. Devuelve el
+        estado del empaque o None si se alcanza `limite` (timestamp) antes de terminar. Al
+        alcanzar `corte` (timestamp) devuelve en cambio el empaque parcial, con las unidades
+        restantes sin colocar y `plazo_vencido`.
+
+        Para unidades consecutivas de igual geometría se recuerdan los tableros donde la anterior
+        no cupo: esos tableros no cambiaron desde entonces, así que tampoco caben y no se vuelven
+        a probar. Una corrida de N piezas iguales cuesta así una prueba fallida por tablero en total.
+
+        Los tableros se recorren del más lleno al menos lleno (empates por orden de creación)
+        usando una lista ordenada de claves (-piezas, id) que se actualiza en cada colocación,
+        en lugar de reordenar todos los tableros por cada pieza.
+        """
+        self.tableros = []
+        self._indices, self._espacios, self._arboles = {}, {}, {}
+        orden_tableros = []  # claves (-cantidad de piezas, id), siempre ordenadas
+        por_id = {}
+        asignacion = {}
+        piezas_no_colocadas = []
+        firma_previa = None
+        descartados = set()
+        paso_progreso = max(1, len(secuencia) // 50)
+
+        plazo_vencido = False
+        for n_unidad, unidad in enumerate(secuencia):
+            if limite is not None and time.time() > limite:
+                return None
+            if corte is not None and time.time() > corte:
+                piezas_no_colocadas.extend(secuencia[n_unidad:])
+                plazo_vencido = True
+                break
+            if progreso and n_unidad % paso_progreso == 0:
+                progreso(n_unidad * 100 // len(secuencia))
+            pieza, numero = unidad
+            firma = (pieza['ancho'], pieza['largo'], bool(pieza.get('veta_libre', False)))
+            if firma != firma_previa:
+                descartados = set()
+                firma_previa = firma
+            id_unico = f"{pieza['nombre']}_{numero}"
+
+            destino = None
+            # Probar primero en tableros existentes (más llenos primero)
+            for _, tid in orden_tableros:
+                if tid in descartados:
+                    continue
+                if self._colocar_pieza_en_tablero(por_id[tid], pieza, id_unico):
+                    destino = por_id[tid]
+                    break
+                descartados.add(tid)
+
+            # Crear nuevo tablero si no cupo
+            if destino is None:
+                nuevo = self._crear_nuevo_tablero()
+                if self._colocar_pieza_en_tablero(nuevo, pieza, id_unico):
+                    self.tableros.append(nuevo)
+                    por_id[nuevo['id']] = nuevo
+                    bisect.insort(orden_tableros, (-1, nuevo['id']))
+                    destino = nuevo
+                else:
+                    piezas_no_colocadas.append(unidad)
+                    continue
+            else:
+                n = len(destino['piezas'])
+                del orden_tableros[bisect.bisect_left(orden_tableros, (-(n - 1), destino['id']))]
+                bisect.insort(orden_tableros, (-n, destino['id']))
+            asignacion.setdefault(destino['id'], []).append(unidad)
+
+        return {
+            'tableros': self.tableros, 'arboles': self._arboles, 'secuencia': secuencia,
+            'asignacion': asignacion, 'no_colocadas': piezas_no_colocadas, 'plazo_vencido': plazo_vencido,
+        }
+
+    @staticmethod
+    def _area_asignada(unidades):
+        return sum(p['ancho'] * p['largo'] for p, _ in unidades)
+
+    def _puntaje_empaque(self, empaque):
+        """Menor es mejor: piezas sin colocar, tableros y área del tablero menos lleno
+        (concentrar piezas en los demás acerca a poder eliminarlo)."""
+        areas = [self._area_asignada(ps) for ps in empaque['asignacion'].values()]
+        return (len(empaque['no_colocadas']), len(empaque['tableros']), min(areas) if areas else 0)
+
+    def _secuencia_sin_tablero_menor(self, empaque):
+        """Secuencia que adelanta las piezas del tablero menos lleno, para intentar repartirlas
+        entre los demás y eliminar ese tablero."""
+        asignacion = empaque['asignacion']
+        if not asignacion:
+            return list(empaque['secuencia'])
+        menor = min(asignacion, key=lambda tid: self._area_asignada(asignacion[tid]))
+        adelantar = {id(p) for p in asignacion[menor]}
+        secuencia = empaque['secuencia']
+        return [p for p in secuencia if id(p) in adelantar] + [p for p in secuencia if id(p) not in adelantar]
+
+    def _secuencia(self, piezas):
+        """Secuencia de colocación como unidades (tipo, número de unidad) según `self.orden`
+        (por defecto: primero áreas mayores). Las unidades comparten el dict del tipo en lugar
+        de copiarlo; los registros por unidad se crean recién al colocarlas.
+        """
+        if self.orden == 'aleatorio':
+            # Clave perturbada por unidad: las unidades de un mismo tipo pueden quedar separadas
+            rnd = random.Random(self.semilla)
+            unidades = [(p, i + 1) for p in piezas for i in range(p.get('cantidad', 1))]
+            unidades.sort(key=lambda u: -(u[0]['ancho'] * u[0]['largo']) * rnd.uniform(0.7, 1.3))
+            return unidades
+        tipos = list(piezas)
+        # Orden estable por tipo: equivale a ordenar todas las unidades, que quedan contiguas
+        if self.orden == 'perimetro':
+            tipos.sort(key=lambda p: (-(p['ancho'] + p['largo']), -(p['ancho'] * p['largo'])))
+        elif self.orden == 'lado_mayor':
+            tipos.sort(key=lambda p: (-max(p['ancho'], p['largo']), -min(p['ancho'], p['largo'])))
+        elif self.orden == 'ancho_largo':
+            tipos.sort(key=lambda p: (-p['ancho'], -p['largo']))
+        else:
+            tipos.sort(key=lambda p: (-(p['ancho'] * p['largo']), -max(p['ancho'], p['largo'])))
+        return [(p, i + 1) for p in tipos for i in range(p.get('cantidad', 1))]
+
+    def _orientaciones(self, pieza):
+        """Orientaciones (ancho, largo, rotada) que caben en el área útil; rotar sólo con veta libre."""
+        if (pieza['ancho'] > self.tablero_ancho or pieza['largo'] > self.tablero_largo):
+            if (pieza.get('veta_libre', False) and pieza['largo'] <= self.tablero_ancho and pieza['ancho'] <= self.tablero_largo):
+                return [(pieza['largo'], pieza['ancho'], True)]
+            return []
+        orientaciones = [(pieza['ancho'], pieza['largo'], False)]
+        if (pieza.get('veta_libre', False) and pieza['largo'] <= self.tablero_ancho and pieza['ancho'] <= self.tablero_largo):
+            orientaciones.append((pieza['largo'], pieza['ancho'], True))
+        return orientaciones
+
+    def _colocar_pieza_en_tablero(self, tablero, pieza, id_unico=None):
+        # Validar si cabe o intentar rotación si veta libre
+        orientaciones = self._orientaciones(pieza)
+        if not orientaciones:
+            return False
+        # Descartar sin búsqueda geométrica si ninguna orientación cabe en el espacio libre
+        espacio = self._espacio(tablero)
+        if not any(espacio.puede_contener(ancho, largo) for ancho, largo, _ in orientaciones):
+            return False
+
+        return self._estrategia.colocar(tablero, pieza, orientaciones, id_unico)
+
+    def _registrar_pieza(self, tablero, pieza, x, y, ancho, largo, rotada, id_unico=None):
+        tablero['piezas'].append(_PiezaColocada(
+            pieza, id_unico or pieza.get('id_unico', pieza['nombre']), x, y, ancho, largo, rotada
+        ))
+        self._indice(tablero).agregar(x, y, ancho, largo)
+        self._espacio(tablero).ocupar(x, y, ancho, largo)
+
+    def _posicion_libre(self, tablero, x, y, ancho, largo):
+        if (x < 0 or y < 0 or x + ancho > self.tablero_ancho or y + largo > self.tablero_largo):
+            return False
+        return self._indice(tablero).conflicto(x, y, ancho, largo) is None
+
+    def _crear_nuevo_tablero(self):
+        tablero = {
+            'id': len(self.tableros) + 1,
+            'ancho': self.tablero_ancho,
+            'largo': self.tablero_largo,
+            'piezas': [],
+            'area_usada': 0
+        }
+        self._indices[tablero['id']] = IndiceEspacial(self.desperdicio_sierra)
+        self._espacios[tablero['id']] = EspacioLibre(self.tablero_ancho, self.tablero_largo, self.desperdicio_sierra)
+        self._estrategia.preparar_tablero(tablero)
+        return tablero
+
+    def _generar_resultado(self):
+        total_area_tableros = len(self.tableros) * (self.tablero_ancho * self.tablero_largo)
+        area_utilizada = 0
+        total_piezas = 0
+        for tablero in self.tableros:
+            area_tablero = 0
+            for pieza in tablero['piezas']:
+                area_pieza = pieza.ancho * pieza.largo
+                area_utilizada += area_pieza
+                area_tablero += area_pieza
+                total_piezas += 1
+            tablero['area_usada'] = area_tablero
+            tablero['area_total'] = self.tablero_ancho * self.tablero_largo
+            tablero['area_utilizada'] = area_tablero
+            tablero['eficiencia_tablero'] = (area_tablero / (self.tablero_ancho * self.tablero_largo)) * 100
+            # Registros compactos -> dicts del JSON, con ajuste para visualización (incluir márgenes)
+            tablero['piezas'] = [p.como_dict(self.margen_x, self.margen_y) for p in tablero['piezas']]
+            if tablero['id'] in self._arboles:
+                tablero['cortes'] = self._arboles[tablero['id']].cortes(self.margen_x, self.margen_y)
+            tablero['ancho'] = self.tablero_ancho_original
+            tablero['largo'] = self.tablero_largo_original
+            tablero['ancho_trabajo'] = self.tablero_ancho
+            tablero['largo_trabajo'] = self.tablero_largo
+
+        eficiencia = (area_utilizada / total_area_tableros * 100) if total_area_tableros > 0 else 0
+        return {
+            'tableros': self.tableros,
+            'total_tableros': len(self.tableros),
+            'total_piezas': total_piezas,
+            'area_utilizada': area_utilizada / 1000000,
+            'eficiencia': round(eficiencia, 1),
+            'area_total': total_area_tableros / 1000000,
+            'desperdicio_sierra': self.desperdicio_sierra,
+            'tablero_ancho_efectivo': self.tablero_ancho,
+            'tablero_largo_efectivo': self.tablero_largo,
+            'tablero_ancho_original': self.tablero_ancho_original,
+            'tablero_largo_original': self.tablero_largo_original,
+            'margenes': {
+                'margen_x': self.margen_x,
+                'margen_y': self.margen_y
+            }
+        }
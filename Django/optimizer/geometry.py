@@ -0,0 +1,321 @@
+"""Estructuras geométricas por tablero que usan las estrategias del motor.
+
+- `IndiceEspacial`: rejilla de rectángulos ocupados y puntos candidatos (bottom-left).
+- `EspacioLibre`: rectángulos libres maximales (MaxRects).
+- `ArbolGuillotina`: árbol de cortes pasantes (guillotina).
+"""
+import bisect
+
+try:
+    import numpy as np  # opcional: prueba de solape vectorizada del motor
+except Exception:
+    np = None
+
+
+class IndiceEspacial:
+    """Índice espacial por tablero: rejilla uniforme de rectángulos ocupados + puntos candidatos.
+
+    Cada rectángulo se registra en las celdas que cubre su huella extendida por el kerf
+    ([x, x+ancho+kerf] × [y, y+largo+kerf]), de modo que una consulta de solape sólo revisa
+    las piezas cercanas. La comparación final replica exactamente la de `_posicion_libre`,
+    así que el índice es sólo un filtro y no altera el resultado.
+
+    También mantiene ordenados por (y, x) los puntos candidatos (esquinas derivadas de cada
+    pieza colocada), descartando los que quedan cubiertos por una pieza: un punto cubierto no
+    puede volver a quedar libre porque el espacio ocupado sólo crece.
+    """
+    CELDA = 200  # mm
+
+    def __init__(self, kerf):
+        self.kerf = kerf
+        self.celdas = {}
+        self.puntos = [(0, 0)]  # ordenados por (y, x)
+        self._puntos_set = {(0, 0)}
+        # Copias en arreglos NumPy para `primer_punto_libre` (sólo si se usa esa ruta)
+        self._np_rects = None
+        self._np_n = 0
+        self._np_puntos = None
+
+    def _rango(self, a, b):
+        c = self.CELDA
+        return range(int(a // c), int(b // c) + 1)
+
+    def agregar(self, x, y, ancho, largo):
+        margen = self.kerf
+        rect = (x, y, x + ancho, y + largo)
+        if self._np_rects is not None:
+            if self._np_n == len(self._np_rects):
+                self._np_rects = np.concatenate([self._np_rects, np.empty_like(self._np_rects)])
+            self._np_rects[self._np_n] = rect
+            self._np_n += 1
+            self._np_puntos = None
+        for cx in self._rango(x, rect[2] + margen):
+            for cy in self._rango(y, rect[3] + margen):
+                self.celdas.setdefault((cx, cy), []).append(rect)
+        # Descartar candidatos que quedaron dentro de la nueva huella
+        x2k, y2k = rect[2] + margen, rect[3] + margen
+        if any(x <= px < x2k and y <= py < y2k for (px, py) in self.puntos):
+            self.puntos = [(px, py) for (px, py) in self.puntos if not (x <= px < x2k and y <= py < y2k)]
+            self._puntos_set = set(self.puntos)
+        # Nuevos candidatos: mismos puntos que generaba el barrido sobre todas las piezas
+        x_der = rect[2] + margen
+        y_sup = rect[3] + margen
+        for pt in ((x_der, y), (x_der, y_sup), (x, y_sup), (x, y)):
+            if pt not in self._puntos_set and not self._cubierto(pt[0], pt[1]):
+                self._puntos_set.add(pt)
+                bisect.insort(self.puntos, pt, key=lambda p: (p[1], p[0]))
+
+    def _cubierto(self, px, py):
+        margen = self.kerf
+        for (ex1, ey1, ex2, ey2) in self.celdas.get((int(px // self.CELDA), int(py // self.CELDA)), ()):
+            if ex1 <= px < ex2 + margen and ey1 <= py < ey2 + margen:
+                return True
+        return False
+
+    def conflicto(self, x, y, ancho, largo):
+        """Devuelve un rectángulo ocupado que solapa con la pieza en (x, y), o None."""
+        nuevo_x1, nuevo_y1 = x, y
+        nuevo_x2, nuevo_y2 = x + ancho, y + largo
+        margen = self.kerf
+        c = self.CELDA
+        celdas = self.celdas
+        cy0, cy1 = int(nuevo_y1 // c), int((nuevo_y2 + margen) // c)
+        for cx in range(int(nuevo_x1 // c), int((nuevo_x2 + margen) // c) + 1):
+            for cy in range(cy0, cy1 + 1):
+                for rect in celdas.get((cx, cy), ()):
+                    exist_x1, exist_y1, exist_x2, exist_y2 = rect
+                    overlap_x = not (nuevo_x2 + margen <= exist_x1 or exist_x2 + margen <= nuevo_x1)
+                    overlap_y = not (nuevo_y2 + margen <= exist_y1 or exist_y2 + margen <= nuevo_y1)
+                    if overlap_x and overlap_y:
+                        return rect
+        return None
+
+    def primer_punto_libre(self, ancho, largo, max_x, max_y, bloque=64):
+        """Primer punto candidato (orden y, x) donde la pieza cabe dentro de max_x × max_y sin
+        solapar, probando todos los candidatos contra todos los rectángulos ocupados en una sola
+        operación NumPy (por bloques de candidatos). Mismo resultado que recorrer `puntos` con
+        `_posicion_libre`; requiere NumPy.
+        """
+        if self._np_rects is None:
+            rects = [r for celda in self.celdas.values() for r in celda]
+            rects = list(dict.fromkeys(rects))  # un rectángulo aparece en varias celdas
+            self._np_rects = np.empty((max(16, 2 * len(rects)), 4), dtype=float)
+            self._np_rects[:len(rects)] = rects if rects else np.empty((0, 4))
+            self._np_n = len(rects)
+        if self._np_puntos is None:
+            self._np_puntos = np.asarray(self.puntos, dtype=float).reshape(-1, 2)
+        k = self.kerf
+        R = self._np_rects[:self._np_n]
+        rx1, ry1, rx2, ry2 = R[:, 0], R[:, 1], R[:, 2], R[:, 3]
+        P = self._np_puntos
+        # Los puntos están ordenados por y: sólo sirven los de y + largo <= max_y
+        fin = int(np.searchsorted(P[:, 1] + largo, max_y, side='right'))
+        for ini in range(0, fin, bloque):
+            px = P[ini:min(fin, ini + bloque), 0:1]
+            py = P[ini:min(fin, ini + bloque), 1:2]
+            # Sólo los rectángulos que alcanzan la franja en y de este bloque pueden solapar
+            cerca = ~(((py[-1, 0] + largo) + k <= ry1) | (ry2 + k <= py[0, 0]))
+            bx1, by1, bx2, by2 = rx1[cerca], ry1[cerca], rx2[cerca], ry2[cerca]
+            solape_x = ~(((px + ancho) + k <= bx1) | (bx2 + k <= px))
+            solape_y = ~(((py + largo) + k <= by1) | (by2 + k <= py))
+            libre = ~(solape_x & solape_y).any(axis=1) & ((px[:, 0] + ancho) <= max_x) & (px[:, 0] >= 0) & (py[:, 0] >= 0)
+            idx = np.flatnonzero(libre)
+            if idx.size:
+                return self.puntos[ini + int(idx[0])]
+        return None
+
+
+class EspacioLibre:
+    """Espacio libre de un tablero como lista de rectángulos libres maximales (MaxRects).
+
+    Se trabaja con huellas extendidas por el kerf: una pieza en (x, y) ocupa
+    [x, x+ancho+kerf) × [y, y+largo+kerf) y el tablero útil es [0, W+kerf) × [0, H+kerf).
+    Así dos piezas no se solapan (respetando el kerf) si y sólo si sus huellas son disjuntas,
+    que es exactamente la condición de `_posicion_libre`. Cada colocación divide los
+    rectángulos libres que toca y elimina los contenidos en otros.
+    """
+    HEURISTICAS = ('bssf', 'baf', 'bl')
+
+    def __init__(self, ancho, largo, kerf):
+        self.kerf = kerf
+        self.libres = [(0, 0, ancho + kerf, largo + kerf)]  # (x1, y1, x2, y2)
+        # Resumen para descartar el tablero sin búsqueda geométrica (ver `puede_contener`)
+        self.area_libre = (ancho + kerf) * (largo + kerf)
+        self.max_ancho = ancho + kerf
+        self.max_largo = largo + kerf
+
+    def ocupar(self, x, y, ancho, largo):
+        ux1, uy1 = x, y
+        ux2, uy2 = (x + ancho) + self.kerf, (y + largo) + self.kerf
+        intactos = []
+        nuevos = []
+        for (fx1, fy1, fx2, fy2) in self.libres:
+            if ux1 >= fx2 or ux2 <= fx1 or uy1 >= fy2 or uy2 <= fy1:
+                intactos.append((fx1, fy1, fx2, fy2))
+                continue
+            if ux1 > fx1:
+                nuevos.append((fx1, fy1, ux1, fy2))
+            if ux2 < fx2:
+                nuevos.append((ux2, fy1, fx2, fy2))
+            if uy1 > fy1:
+                nuevos.append((fx1, fy1, fx2, uy1))
+            if uy2 < fy2:
+                nuevos.append((fx1, uy2, fx2, fy2))
+        self.libres = intactos + self._podar(nuevos, intactos)
+        self.area_libre -= (ux2 - ux1) * (uy2 - uy1)
+        self.max_ancho = max((r[2] - r[0] for r in self.libres), default=0)
+        self.max_largo = max((r[3] - r[1] for r in self.libres), default=0)
+
+    @staticmethod
+    def _podar(nuevos, intactos):
+        """Deja sólo los rectángulos nuevos maximales (sin duplicados ni contenidos en otro).
+        Los intactos ya eran maximales y no pueden quedar contenidos en un nuevo (cada nuevo
+        está dentro del rectángulo que se dividió), así que sólo se revisan los nuevos.
+        """
+        nuevos = sorted(set(nuevos), key=lambda r: (r[2] - r[0]) * (r[3] - r[1]), reverse=True)
+        maximales = []
+        for r in nuevos:
+            if not any(m[0] <= r[0] and m[1] <= r[1] and r[2] <= m[2] and r[3] <= m[3] for m in maximales) \
+                    and not any(m[0] <= r[0] and m[1] <= r[1] and r[2] <= m[2] and r[3] <= m[3] for m in intactos):
+                maximales.append(r)
+        return maximales
+
+    def puede_contener(self, ancho, largo):
+        """False si la pieza seguro no cabe en el tablero: toda posición válida queda dentro de
+        algún rectángulo libre maximal, así que basta revisar el área libre y esos rectángulos."""
+        k = self.kerf
+        if (ancho + k) * (largo + k) > self.area_libre + 1e-6 or ancho + k > self.max_ancho or largo + k > self.max_largo:
+            return False
+        return any((fx1 + ancho) + k <= fx2 and (fy1 + largo) + k <= fy2 for (fx1, fy1, fx2, fy2) in self.libres)
+
+    def mejor_posicion(self, ancho, largo, heuristica='bssf'):
+        """Mejor esquina inferior-izquierda de un rectángulo libre según la heurística.
+        Devuelve (puntaje, x, y) (menor es mejor) o None si la pieza no cabe.
+        """
+        k = self.kerf
+        mejor = None
+        for (fx1, fy1, fx2, fy2) in self.libres:
+            if (fx1 + ancho) + k > fx2 or (fy1 + largo) + k > fy2:
+                continue
+            sobra_w = (fx2 - fx1) - (ancho + k)
+            sobra_h = (fy2 - fy1) - (largo + k)
+            if heuristica == 'baf':
+                puntaje = ((fx2 - fx1) * (fy2 - fy1) - (ancho + k) * (largo + k), min(sobra_w, sobra_h), fy1, fx1)
+            elif heuristica == 'bl':
+                puntaje = (fy1 + largo, fx1)
+            else:  # bssf
+                puntaje = (min(sobra_w, sobra_h), max(sobra_w, sobra_h), fy1, fx1)
+            if mejor is None or puntaje < mejor[0]:
+                mejor = (puntaje, fx1, fy1)
+        return mejor
+
+    def esquina_libre(self, ancho, largo):
+        """Punto más bajo (orden y, x) donde la pieza cabe, o None. Toda posición válida está
+        dentro de algún rectángulo libre maximal y su esquina inferior-izquierda también es
+        válida, así que basta revisar esas esquinas.
+        """
+        k = self.kerf
+        mejor = None
+        for (fx1, fy1, fx2, fy2) in self.libres:
+            if (fx1 + ancho) + k > fx2 or (fy1 + largo) + k > fy2:
+                continue
+            if mejor is None or (fy1, fx1) < mejor:
+                mejor = (fy1, fx1)
+        return None if mejor is None else (mejor[1], mejor[0])
+
+
+class NodoGuillotina:
+    """Región del árbol de cortes. Coordenadas extendidas por el kerf, como en `EspacioLibre`.
+    Un nodo interno guarda su corte ('horizontal'|'vertical', posición) y dos hijos
+    (inferior/izquierdo primero); una hoja puede estar libre u ocupada por una pieza.
+    """
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'corte', 'hijos', 'ocupado')
+
+    def __init__(self, x1, y1, x2, y2):
+        self.x1, self.y1, self.x2, self.y2 = x1, y1, x2, y2
+        self.corte = None
+        self.hijos = ()
+        self.ocupado = False
+
+    def dividir(self, tipo, posicion, kerf):
+        """Corta la región de borde a borde; el kerf queda a continuación de `posicion`."""
+        self.corte = (tipo, posicion)
+        if tipo == 'horizontal':
+            self.hijos = (NodoGuillotina(self.x1, self.y1, self.x2, posicion + kerf),
+                          NodoGuillotina(self.x1, posicion + kerf, self.x2, self.y2))
+        else:
+            self.hijos = (NodoGuillotina(self.x1, self.y1, posicion + kerf, self.y2),
+                          NodoGuillotina(posicion + kerf, self.y1, self.x2, self.y2))
+        return self.hijos
+
+
+class ArbolGuillotina:
+    """Empaquetado guillotina de un tablero: cada pieza se ubica en la esquina inferior-izquierda
+    de una hoja libre y se separa con a lo más dos cortes de borde a borde de esa hoja, de modo
+    que el tablero completo se puede dimensionar sólo con cortes rectos pasantes (sierra de paneles).
+    """
+
+    def __init__(self, ancho, largo, kerf):
+        self.kerf = kerf
+        self.raiz = NodoGuillotina(0, 0, ancho + kerf, largo + kerf)
+        self.hojas = [self.raiz]  # hojas libres
+
+    def mejor_hoja(self, ancho, largo):
+        """Hoja libre con mejor ajuste por área. Devuelve (puntaje, hoja) o None."""
+        k = self.kerf
+        mejor = None
+        for hoja in self.hojas:
+            if (hoja.x1 + ancho) + k > hoja.x2 or (hoja.y1 + largo) + k > hoja.y2:
+                continue
+            puntaje = ((hoja.x2 - hoja.x1) * (hoja.y2 - hoja.y1), hoja.y1, hoja.x1)
+            if mejor is None or puntaje < mejor[0]:
+                mejor = (puntaje, hoja)
+        return mejor
+
+    def colocar(self, hoja, ancho, largo):
+        """Ubica la pieza en la hoja. Se corta primero a lo largo del eje con menor sobrante,
+        dejando el rectángulo libre mayor lo más entero posible."""
+        k = self.kerf
+        self.hojas.remove(hoja)
+        fin_x, fin_y = hoja.x1 + ancho, hoja.y1 + largo
+        sobra_w = hoja.x2 - (fin_x + k)
+        sobra_h = hoja.y2 - (fin_y + k)
+        nodo = hoja
+        if sobra_w <= sobra_h:
+            if sobra_h > 0:
+                nodo, resto = nodo.dividir('horizontal', fin_y, k)
+                self.hojas.append(resto)
+            if sobra_w > 0:
+                nodo, resto = nodo.dividir('vertical', fin_x, k)
+                self.hojas.append(resto)
+        else:
+            if sobra_w > 0:
+                nodo, resto = nodo.dividir('vertical', fin_x, k)
+                self.hojas.append(resto)
+            if sobra_h > 0:
+                nodo, resto = nodo.dividir('horizontal', fin_y, k)
+                self.hojas.append(resto)
+        nodo.ocupado = True
+
+    def cortes(self, dx=0, dy=0):
+        """Secuencia de cortes en preorden (el orden en que la sierra los ejecuta).
+        `desde`/`hasta` es la extensión real del corte dentro de su región."""
+        k = self.kerf
+        salida = []
+        pila = [(self.raiz, 0)]
+        while pila:
+            nodo, nivel = pila.pop()
+            if nodo.corte is None:
+                continue
+            tipo, posicion = nodo.corte
+            if tipo == 'horizontal':
+                posicion, desde, hasta = posicion + dy, nodo.x1 + dx, nodo.x2 - k + dx
+            else:
+                posicion, desde, hasta = posicion + dx, nodo.y1 + dy, nodo.y2 - k + dy
+            salida.append({
+                'tipo': tipo, 'posicion': posicion, 'desde': desde, 'hasta': hasta,
+                'nivel': nivel, 'orden': len(salida) + 1,
+            })
+            for hijo in reversed(nodo.hijos):
+                pila.append((hijo, nivel + 1))
+        return salida
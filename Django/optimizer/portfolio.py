@@ -0,0 +1,168 @@
+"""Modo portafolio: varias estrategias y órdenes del motor en paralelo, dentro de un
+presupuesto de tiempo. Los procesos sólo importan este paquete (no Django ni librerías de PDF).
+"""
+import logging
+import os
+import time
+from concurrent.futures import BrokenExecutor
+
+from .engine import OptimizationEngine
+
+logger = logging.getLogger(__name__)
+
+# Tope de procesos en paralelo (portafolio y optimización por lotes): en un servidor web
+# compartido no se ocupan todos los núcleos. Se ajusta con OPTIMIZADOR_MAX_PROCESOS.
+MAX_PROCESOS = 4
+
+
+def procesos_maximos(tareas=None):
+    """Procesos a usar para `tareas` trabajos: el mínimo entre el tope configurado, los núcleos
+    y la cantidad de trabajos."""
+    try:
+        tope = int(os.environ.get('OPTIMIZADOR_MAX_PROCESOS') or MAX_PROCESOS)
+    except ValueError:
+        tope = MAX_PROCESOS
+    return max(1, min(tope, os.cpu_count() or 1, tareas or tope))
+
+
+# Segundos que se espera, pasado el plazo, al candidato de respaldo (ya cortado en el plazo: sólo
+# le falta armar el resultado) cuando ningún otro terminó.
+ESPERA_RESPALDO = 2
+
+
+# Combinaciones (estrategia, heurística, orden) que evalúa el modo portafolio; además se agregan
+# reinicios con orden 'aleatorio' y semillas distintas.
+PORTAFOLIO_CANDIDATOS = [
+    ('bottom_left', 'bssf', 'area'),
+    ('bottom_left', 'bssf', 'perimetro'),
+    ('bottom_left', 'bssf', 'lado_mayor'),
+    ('bottom_left', 'bssf', 'ancho_largo'),
+    ('maxrects', 'bssf', 'area'),
+    ('maxrects', 'baf', 'area'),
+    ('maxrects', 'bssf', 'perimetro'),
+    ('maxrects', 'baf', 'lado_mayor'),
+    ('maxrects', 'bl', 'ancho_largo'),
+    ('guillotina', 'bssf', 'area'),
+    ('guillotina', 'bssf', 'lado_mayor'),
+]
+
+
+class PlazoVencido(Exception):
+    """El candidato no terminó antes del plazo del portafolio."""
+
+
+def _ejecutar_candidato(parametros, piezas, candidato, limite=None, respaldo=False):
+    """Ejecuta un candidato del portafolio (a nivel de módulo para poder enviarlo a otro proceso).
+    Con `limite` (timestamp) el propio candidato se corta al vencer el plazo: el motor informa
+    su avance durante la pasada y ahí se comprueba la hora. El candidato de `respaldo` en cambio
+    devuelve en el plazo lo que alcanzó a colocar (`plazo_vencido`), para que siempre haya un
+    resultado a tiempo."""
+    estrategia, heuristica, orden, semilla = candidato
+    engine = OptimizationEngine(*parametros, estrategia=estrategia, heuristica=heuristica,
+                                orden=orden, semilla=semilla)
+    if respaldo:
+        return candidato, engine.optimizar_piezas(piezas, plazo=limite)
+
+    def vigilar_plazo(_pct):
+        if time.time() > limite:
+            raise PlazoVencido()
+
+    return candidato, engine.optimizar_piezas(piezas, progreso=vigilar_plazo if limite else None)
+
+
+def _detener_pool(pool):
+    """Cierra el pool sin esperar: cancela los candidatos que no empezaron y termina los procesos
+    que siguen calculando (su resultado ya no se usará y no deben seguir ocupando núcleos)."""
+    # ProcessPoolExecutor no expone sus procesos antes de Python 3.14 (terminate_workers)
+    procesos = list((getattr(pool, '_processes', None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for proceso in procesos:
+        if proceso.is_alive():
+            proceso.terminate()
+
+
+def _puntaje_resultado(r):
+    """Menor es mejor: primero todas las piezas colocadas, luego menos tableros y mayor eficiencia."""
+    return (r.get('piezas_no_colocadas', 0), r.get('total_tableros', 0), -(r.get('eficiencia') or 0))
+
+
+def optimizar_portafolio(tablero_ancho, tablero_largo, margen_x, margen_y, desperdicio_sierra, piezas,
+                         presupuesto_segundos=10, reinicios=4, max_workers=None):
+    """Ejecuta varias estrategias/órdenes en paralelo (hasta `procesos_maximos()` procesos) y se
+    queda con el mejor resultado terminado dentro del presupuesto de tiempo. Si un candidato ya
+    alcanza la cota inferior de tableros (`tableros_minimo_teorico`) se descarta el resto sin
+    esperarlo. Al salir no queda ningún candidato calculando: cada uno se corta solo al vencer el
+    plazo y los que sigan vivos se terminan.
+
+    El primer candidato es el respaldo: al vencer el plazo entrega lo que alcanzó a colocar, así
+    que si ninguno termina a tiempo se devuelve ese layout parcial (`plazo_vencido`, piezas
+    restantes en `piezas_no_colocadas`) en vez de empezar una pasada completa fuera de plazo.
+    Sólo si no se pudieron usar procesos se calcula en este proceso, también con plazo.
+
+    El resultado indica el candidato ganador en `estrategia_ganadora` y un resumen de la
+    ejecución en `portafolio`.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    inicio = time.time()
+    limite = inicio + presupuesto_segundos
+    cota_alcanzada = False
+    parametros = (tablero_ancho, tablero_largo, margen_x, margen_y, desperdicio_sierra)
+    candidatos = [(e, h, o, None) for (e, h, o) in PORTAFOLIO_CANDIDATOS]
+    candidatos += [('bottom_left', 'bssf', 'aleatorio', s) for s in range(1, int(reinicios) + 1)]
+    terminados = []
+    imposibles = OptimizationEngine(*parametros)._unidades_imposibles(piezas)
+    try:
+        pool = ProcessPoolExecutor(max_workers=max_workers or procesos_maximos(len(candidatos)))
+        try:
+            futuros = {pool.submit(_ejecutar_candidato, parametros, piezas, c, limite, i == 0): c
+                       for i, c in enumerate(candidatos)}
+            respaldo = next(iter(futuros))
+            pendientes = set(futuros)
+            while pendientes and not cota_alcanzada:
+                hechos, pendientes = wait(pendientes, timeout=max(0, limite - time.time()),
+                                          return_when=FIRST_COMPLETED)
+                if not hechos:
+                    if terminados or respaldo not in pendientes:
+                        break
+                    # Nada terminó en el plazo: el respaldo se cortó en el plazo y está armando
+                    # su resultado parcial
+                    hechos, _ = wait({respaldo}, timeout=ESPERA_RESPALDO)
+                    if not hechos:
+                        break
+                    pendientes.discard(respaldo)
+                for f in hechos:
+                    try:
+                        terminados.append(f.result())
+                    except PlazoVencido:
+                        continue
+                    except BrokenExecutor:
+                        raise
+                    except Exception:
+                        logger.exception('Falló el candidato %s del portafolio', futuros[f])
+                        continue
+                    r = terminados[-1][1]
+                    if (r.get('piezas_no_colocadas', 0) <= imposibles
+                            and r['total_tableros'] <= r.get('tableros_minimo_teorico', 0)):
+                        cota_alcanzada = True
+        finally:
+            _detener_pool(pool)
+    except (OSError, NotImplementedError, BrokenExecutor):
+        logger.exception('Portafolio sin procesos disponibles; se optimiza en este proceso')
+    if not terminados:
+        # Sin procesos o sin respuesta del respaldo: respaldo en este proceso, con lo que quede
+        # del plazo (o ESPERA_RESPALDO si ya venció)
+        plazo = max(limite, time.time() + ESPERA_RESPALDO)
+        terminados.append(_ejecutar_candidato(parametros, piezas, candidatos[0], plazo, respaldo=True))
+    terminados.sort(key=lambda cr: (_puntaje_resultado(cr[1]), candidatos.index(cr[0])))
+    (estrategia, heuristica, orden, semilla), mejor = terminados[0]
+    mejor['estrategia_ganadora'] = {
+        'estrategia': estrategia, 'heuristica': heuristica, 'orden': orden, 'semilla': semilla,
+    }
+    mejor['portafolio'] = {
+        'candidatos': len(candidatos),
+        'evaluados': len(terminados),
+        'presupuesto_segundos': presupuesto_segundos,
+        'tiempo_total': time.time() - inicio,
+        'cota_alcanzada': cota_alcanzada,
+    }
+    return mejor
@@ -0,0 +1,137 @@
+"""Estrategias de colocación del motor.
+
+Una estrategia decide dónde va una pieza dentro de un tablero. El motor (`OptimizationEngine`)
+se encarga del resto: orden de las piezas, elección de tablero, tableros nuevos y resultado.
+Para agregar una estrategia basta con heredar de `Estrategia` y registrarla:
+
+    @registrar_estrategia
+    class MiEstrategia(Estrategia):
+        nombre = 'mi_estrategia'
+
+        def colocar(self, tablero, pieza, orientaciones, id_unico):
+            ...
+
+y usarla con `OptimizationEngine(..., estrategia='mi_estrategia')`.
+"""
+from .geometry import ArbolGuillotina
+
+# nombre -> clase de estrategia
+ESTRATEGIAS = {}
+
+
+def registrar_estrategia(clase):
+    """Decorador: registra la estrategia bajo `clase.nombre`."""
+    ESTRATEGIAS[clase.nombre] = clase
+    return clase
+
+
+class Estrategia:
+    """Base de las estrategias. Cada motor crea su propia instancia (`Estrategia(engine)`).
+
+    El motor mantiene por tablero un índice espacial (`engine._indice(tablero)`) y los
+    rectángulos libres (`engine._espacio(tablero)`); `engine._registrar_pieza` actualiza ambos.
+    """
+    nombre = None
+    # False si la estrategia guarda estado por tablero que no se reconstruye desde las piezas
+    # colocadas: la re-optimización incremental no agrega piezas a tableros anteriores
+    admite_tableros_restaurados = True
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def preparar_tablero(self, tablero):
+        """Crea las estructuras propias de la estrategia para un tablero nuevo."""
+
+    def colocar(self, tablero, pieza, orientaciones, id_unico):
+        """Coloca la pieza en alguna de las `orientaciones` (ancho, largo, rotada) que caben en
+        el tablero y la registra. Devuelve True si la colocó."""
+        raise NotImplementedError
+
+
+@registrar_estrategia
+class BottomLeft(Estrategia):
+    """Esquinas de piezas colocadas en orden (y, x) y, si no hay ninguna libre, la esquina más
+    baja de un rectángulo libre maximal donde cabe la pieza. Con `engine.vectorizado` prueba
+    todos los candidatos de una vez con NumPy (`IndiceEspacial.primer_punto_libre`)."""
+    nombre = 'bottom_left'
+
+    def colocar(self, tablero, pieza, orientaciones, id_unico):
+        engine = self.engine
+        for ancho, largo, rotada in orientaciones:
+            pos = self.posicion_libre(tablero, ancho, largo)
+            if pos:
+                x, y = pos['x'], pos['y']
+                if (x + ancho <= engine.tablero_ancho and y + largo <= engine.tablero_largo):
+                    engine._registrar_pieza(tablero, pieza, x, y, ancho, largo, rotada, id_unico)
+                    return True
+        return False
+
+    def posicion_libre(self, tablero, ancho, largo):
+        engine = self.engine
+        if ancho > engine.tablero_ancho or largo > engine.tablero_largo:
+            return None
+        if not tablero['piezas']:
+            return {'x': 0, 'y': 0}
+
+        indice = engine._indice(tablero)
+        if engine.vectorizado:
+            pos = indice.primer_punto_libre(ancho, largo, engine.tablero_ancho, engine.tablero_largo)
+            if pos:
+                return {'x': pos[0], 'y': pos[1]}
+        else:
+            # Candidatos (esquinas de piezas colocadas) ya ordenados por (y, x)
+            for (x, y) in indice.puntos:
+                if y + largo > engine.tablero_largo:
+                    break
+                if x + ancho <= engine.tablero_ancho and engine._posicion_libre(tablero, x, y, ancho, largo):
+                    return {'x': x, 'y': y}
+        # Sin esquina de pieza libre: esquina más baja de un rectángulo libre maximal donde cabe
+        pos = engine._espacio(tablero).esquina_libre(ancho, largo)
+        return {'x': pos[0], 'y': pos[1]} if pos else None
+
+
+@registrar_estrategia
+class MaxRects(Estrategia):
+    """Elige entre los rectángulos libres maximales según `engine.heuristica` ('bssf'
+    best-short-side-fit, 'baf' best-area-fit, 'bl' bottom-left)."""
+    nombre = 'maxrects'
+
+    def colocar(self, tablero, pieza, orientaciones, id_unico):
+        engine = self.engine
+        mejor = None
+        for ancho, largo, rotada in orientaciones:
+            pos = engine._espacio(tablero).mejor_posicion(ancho, largo, engine.heuristica)
+            if pos and (mejor is None or pos[0] < mejor[0]):
+                mejor = (pos[0], pos[1], pos[2], ancho, largo, rotada)
+        if mejor is None:
+            return False
+        engine._registrar_pieza(tablero, pieza, *mejor[1:], id_unico=id_unico)
+        return True
+
+
+@registrar_estrategia
+class Guillotina(Estrategia):
+    """Sólo cortes pasantes: cada tablero lleva su árbol de cortes (`engine._arboles`) y el
+    resultado incluye la secuencia en `tablero['cortes']`."""
+    nombre = 'guillotina'
+    admite_tableros_restaurados = False
+
+    def preparar_tablero(self, tablero):
+        engine = self.engine
+        engine._arboles[tablero['id']] = ArbolGuillotina(
+            engine.tablero_ancho, engine.tablero_largo, engine.desperdicio_sierra)
+
+    def colocar(self, tablero, pieza, orientaciones, id_unico):
+        arbol = self.engine._arboles[tablero['id']]
+        mejor = None
+        for ancho, largo, rotada in orientaciones:
+            hoja = arbol.mejor_hoja(ancho, largo)
+            if hoja and (mejor is None or hoja[0] < mejor[0]):
+                mejor = (hoja[0], hoja[1], ancho, largo, rotada)
+        if mejor is None:
+            return False
+        _, hoja, ancho, largo, rotada = mejor
+        x, y = hoja.x1, hoja.y1
+        arbol.colocar(hoja, ancho, largo)
+        self.engine._registrar_pieza(tablero, pieza, x, y, ancho, largo, rotada, id_unico)
+        return True
@@ -0,0 +1,73 @@
+"""Compara la búsqueda de posición del motor con y sin NumPy (bottom_left).
+
+Para 100, 500 y 2000 piezas pequeñas en un solo tablero mide:
+- tiempo total de optimización con `vectorizado=False` y `vectorizado=True`;
+- tiempo de consultas sueltas sobre el tablero lleno: recorrido de candidatos con
+  `_posicion_libre` frente a `IndiceEspacial.primer_punto_libre`.
+Verifica además que ambas rutas entreguen exactamente las mismas posiciones.
+
+Uso: python scripts/bench_solape_numpy.py  (desde la carpeta Django/, requiere numpy)
+"""
+import os, sys, random, time
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))  # Django/
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+from optimizer import OptimizationEngine, np
+
+if np is None:
+    print('ERROR: NumPy no está instalado.')
+    sys.exit(1)
+
+ANCHO, LARGO, KERF = 2440, 1830, 3
+
+
+def piezas_pequenas(n, semilla):
+    rnd = random.Random(semilla)
+    return [{'nombre': f'P{i}', 'ancho': rnd.randint(20, 60), 'largo': rnd.randint(20, 60),
+             'cantidad': 1, 'veta_libre': True, 'tapacantos': {}} for i in range(n)]
+
+
+def consultas_bucle(engine, tablero, medidas):
+    indice = engine._indice(tablero)
+    salida = []
+    for ancho, largo in medidas:
+        pos = None
+        for (x, y) in indice.puntos:
+            if y + largo > engine.tablero_largo:
+                break
+            if x + ancho <= engine.tablero_ancho and engine._posicion_libre(tablero, x, y, ancho, largo):
+                pos = (x, y)
+                break
+        salida.append(pos)
+    return salida
+
+
+def consultas_numpy(engine, tablero, medidas):
+    indice = engine._indice(tablero)
+    return [indice.primer_punto_libre(ancho, largo, engine.tablero_ancho, engine.tablero_largo)
+            for ancho, largo in medidas]
+
+
+for n in (100, 500, 2000):
+    piezas = piezas_pequenas(n, n)
+    resultados = {}
+    for vectorizado in (False, True):
+        engine = OptimizationEngine(ANCHO, LARGO, 0, 0, KERF, vectorizado=vectorizado)
+        t0 = time.perf_counter()
+        r = engine.optimizar_piezas([dict(p) for p in piezas])
+        resultados[vectorizado] = (time.perf_counter() - t0, r)
+    iguales = resultados[False][1]['tableros'] == resultados[True][1]['tableros']
+
+    # Tablero lleno (sin pasar por _generar_resultado) para consultas sueltas
+    engine = OptimizationEngine(ANCHO, LARGO, 0, 0, KERF)
+    engine._empaquetar(engine._secuencia(piezas))
+    tablero = max(engine.tableros, key=lambda t: len(t['piezas']))
+    rnd = random.Random(0)
+    medidas = [(rnd.randint(20, 120), rnd.randint(20, 120)) for _ in range(200)]
+    t0 = time.perf_counter(); a = consultas_bucle(engine, tablero, medidas); t_bucle = time.perf_counter() - t0
+    t0 = time.perf_counter(); b = consultas_numpy(engine, tablero, medidas); t_numpy = time.perf_counter() - t0
+
+    print(f"{n:5d} piezas | optimización: bucle {resultados[False][0]:.3f}s numpy {resultados[True][0]:.3f}s "
+          f"(layout igual: {iguales}) | 200 consultas ({len(tablero['piezas'])} piezas, "
+          f"{len(engine._indice(tablero).puntos)} candidatos): bucle {t_bucle:.3f}s numpy {t_numpy:.3f}s "
+          f"(mismas posiciones: {a == b})")
@@ -0,0 +1,75 @@
+import datetime
+import json
+
+import pytest
+from django.contrib.auth.models import User
+
+from core.models import Cliente, Material, Organizacion, PiezaColocada, Proyecto, UsuarioPerfilOptimizador
+from core.resultados import sincronizar_resultado
+from optimizer import OptimizationEngine
+
+
+@pytest.fixture(autouse=True)
+def cache_optimizador_en_memoria(settings):
+    """Los tests no leen ni escriben la caché de resultados en disco del proyecto."""
+    settings.CACHES = dict(settings.CACHES, optimizador={
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-optimizador',
+    })
+
+
+@pytest.fixture
+def organizacion(db):
+    return Organizacion.objects.create(codigo='ORG1', nombre='Organización de prueba')
+
+
+@pytest.fixture
+def operador(organizacion):
+    user = User.objects.create_user('operador', 'operador@example.com', 'clave')
+    UsuarioPerfilOptimizador.objects.create(user=user, rol='operador', organizacion=organizacion)
+    return user
+
+
+@pytest.fixture
+def cliente_operador(client, operador):
+    client.force_login(operador)
+    return client
+
+
+@pytest.fixture
+def material(organizacion):
+    return Material.objects.create(codigo='MEL18', nombre='Melamina', tipo='tablero', espesor=18,
+                                   ancho=1830, largo=2500, precio_m2=1, organizacion=organizacion)
+
+
+@pytest.fixture
+def proyecto_vacio(organizacion, operador):
+    cliente = Cliente.objects.create(rut='2-7', nombre='Cliente', organizacion=organizacion)
+    return Proyecto.objects.create(
+        codigo='P2', organizacion=organizacion, nombre='Closet', cliente=cliente,
+        fecha_inicio=datetime.date.today(), usuario=operador, creado_por=operador, operador=operador,
+    )
+
+
+@pytest.fixture
+def proyecto_optimizado(organizacion, operador):
+    """Proyecto con un resultado de dos materiales ya normalizado en las tablas."""
+    cliente = Cliente.objects.create(rut='1-9', nombre='Cliente', organizacion=organizacion)
+    proyecto = Proyecto.objects.create(
+        codigo='P1', organizacion=organizacion, nombre='Cocina', cliente=cliente,
+        fecha_inicio=datetime.date.today(), usuario=operador, creado_por=operador, operador=operador,
+        estado='optimizado',
+    )
+    materiales = []
+    for i, piezas in enumerate([
+        [{'nombre': 'Lateral', 'ancho': 560, 'largo': 720, 'cantidad': 12},
+         {'nombre': 'Repisa', 'ancho': 800, 'largo': 300, 'cantidad': 10}],
+        [{'nombre': 'Puerta', 'ancho': 400, 'largo': 700, 'cantidad': 8}],
+    ], 1):
+        resultado = OptimizationEngine(1830, 2500, 10, 10, 3).optimizar_piezas(piezas)
+        materiales.append(dict(resultado, material_index=i, material={'codigo': f'M{i}', 'nombre': f'Material {i}'}))
+    resultado = {'materiales': materiales}
+    proyecto.resultado_optimizacion = json.dumps(resultado)
+    proyecto.save()
+    sincronizar_resultado(proyecto, resultado)
+    assert PiezaColocada.objects.filter(proyecto=proyecto).count() == 30
+    return proyecto
@@ -0,0 +1,153 @@
+"""API del operador: estados de pieza, progreso y vista con ETag."""
+import json
+
+from django.urls import reverse
+
+from core.models import PiezaColocada
+from WowDash.api_views import MAX_PIEZAS_PATCH
+
+
+def _patch_piezas(client, proyecto, piezas):
+    return client.patch(reverse('api_operador_piezas_estado', args=[proyecto.id]),
+                        data=json.dumps({'piezas': piezas}), content_type='application/json')
+
+
+def _estados(proyecto):
+    return dict(((f'm{m}t{t}p{p}'), e) for m, t, p, e in PiezaColocada.objects.filter(proyecto=proyecto)
+                .values_list('material_num', 'tablero_num', 'numero', 'estado'))
+
+
+def test_patch_masivo_actualiza_varias_piezas(cliente_operador, proyecto_optimizado):
+    ids = sorted(_estados(proyecto_optimizado))
+    cambios = [{'pieza_id': ids[0], 'estado': 'cortada'}, {'pieza_id': ids[1], 'estado': 'en_corte'},
+               {'pieza_id': 'm9t9p9', 'estado': 'cortada'}]
+    respuesta = _patch_piezas(cliente_operador, proyecto_optimizado, cambios)
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()['updated'] == 2
+    assert respuesta.json()['no_encontradas'] == ['m9t9p9']
+    estados = _estados(proyecto_optimizado)
+    assert (estados[ids[0]], estados[ids[1]]) == ('cortada', 'en_corte')
+    assert sum(1 for e in estados.values() if e != 'pendiente') == 2
+
+
+def test_patch_masivo_respeta_el_limite(cliente_operador, proyecto_optimizado):
+    ids = sorted(_estados(proyecto_optimizado))
+    piezas = [{'pieza_id': ids[i % len(ids)], 'estado': 'cortada'} for i in range(MAX_PIEZAS_PATCH + 1)]
+    respuesta = _patch_piezas(cliente_operador, proyecto_optimizado, piezas)
+
+    assert respuesta.status_code == 400
+    assert set(_estados(proyecto_optimizado).values()) == {'pendiente'}
+
+
+def test_patch_masivo_es_todo_o_nada(cliente_operador, proyecto_optimizado):
+    ids = sorted(_estados(proyecto_optimizado))
+    piezas = [{'pieza_id': i, 'estado': 'cortada'} for i in ids[:5]] + [{'pieza_id': ids[5], 'estado': 'rota'}]
+    respuesta = _patch_piezas(cliente_operador, proyecto_optimizado, piezas)
+
+    assert respuesta.status_code == 400
+    assert respuesta.json()['success'] is False
+    assert set(_estados(proyecto_optimizado).values()) == {'pendiente'}
+
+
+def test_patch_de_una_pieza(cliente_operador, proyecto_optimizado):
+    url = reverse('api_operador_pieza_estado', args=[proyecto_optimizado.id, 'm2t1p1'])
+    respuesta = cliente_operador.patch(url, data=json.dumps({'estado': 'cortada'}), content_type='application/json')
+    assert respuesta.status_code == 200
+    assert _estados(proyecto_optimizado)['m2t1p1'] == 'cortada'
+
+    url = reverse('api_operador_pieza_estado', args=[proyecto_optimizado.id, 'm2t9p1'])
+    respuesta = cliente_operador.patch(url, data=json.dumps({'estado': 'cortada'}), content_type='application/json')
+    assert respuesta.status_code == 404
+
+
+def _contar(proyecto, **filtro):
+    return PiezaColocada.objects.filter(proyecto=proyecto, **filtro).count()
+
+
+def _verificar_progreso(progreso, proyecto):
+    """Contadores globales, por material y por tablero iguales a los de las filas."""
+    assert progreso['total'] == _contar(proyecto)
+    assert progreso['cortadas'] == _contar(proyecto, estado='cortada')
+    assert progreso['en_corte'] == _contar(proyecto, estado='en_corte')
+    assert progreso['pendientes'] == progreso['total'] - progreso['cortadas']
+    for material in progreso['materiales']:
+        m = material['material_num']
+        assert material['total'] == _contar(proyecto, material_num=m)
+        assert material['cortadas'] == _contar(proyecto, material_num=m, estado='cortada')
+        for tablero in material['tableros']:
+            t = tablero['tablero_num']
+            assert tablero['total'] == _contar(proyecto, material_num=m, tablero_num=t)
+            assert tablero['cortadas'] == _contar(proyecto, material_num=m, tablero_num=t, estado='cortada')
+    assert sum(m['total'] for m in progreso['materiales']) == progreso['total']
+
+
+def test_completar_con_piezas_pendientes_devuelve_progreso(cliente_operador, proyecto_optimizado):
+    ids = sorted(_estados(proyecto_optimizado))
+    _patch_piezas(cliente_operador, proyecto_optimizado,
+                  [{'pieza_id': i, 'estado': 'cortada'} for i in ids[:7]] + [{'pieza_id': ids[7], 'estado': 'en_corte'}])
+    respuesta = cliente_operador.post(reverse('api_operador_proyecto_completar', args=[proyecto_optimizado.id]))
+
+    assert respuesta.status_code == 400
+    progreso = respuesta.json()['progreso']
+    assert (progreso['total'], progreso['cortadas'], progreso['en_corte']) == (30, 7, 1)
+    _verificar_progreso(progreso, proyecto_optimizado)
+    proyecto_optimizado.refresh_from_db()
+    assert proyecto_optimizado.estado == 'optimizado'
+
+
+def test_marcar_todas_y_completar(cliente_operador, proyecto_optimizado):
+    ids = sorted(_estados(proyecto_optimizado))
+    _patch_piezas(cliente_operador, proyecto_optimizado, [{'pieza_id': i, 'estado': 'cortada'} for i in ids[:4]])
+    respuesta = cliente_operador.post(reverse('api_operador_proyecto_marcar_todas', args=[proyecto_optimizado.id]),
+                                      data=json.dumps({'estado': 'cortada'}), content_type='application/json')
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()['updated'] == 26
+    progreso = respuesta.json()['progreso']
+    assert (progreso['cortadas'], progreso['pendientes']) == (30, 0)
+    _verificar_progreso(progreso, proyecto_optimizado)
+
+    respuesta = cliente_operador.post(reverse('api_operador_proyecto_completar', args=[proyecto_optimizado.id]))
+    assert respuesta.status_code == 200
+    proyecto_optimizado.refresh_from_db()
+    assert proyecto_optimizado.estado == 'completado'
+
+
+def test_detalle_sin_cambios_responde_304(cliente_operador, proyecto_optimizado):
+    url = reverse('api_operador_proyecto_detalle', args=[proyecto_optimizado.id])
+    respuesta = cliente_operador.get(url)
+    assert respuesta.status_code == 200
+    etag = respuesta['ETag']
+    datos = respuesta.json()
+    assert len(datos['materiales']) == 2
+    ids = [p['pieza_id'] for m in datos['materiales'] for t in m['tableros'] for p in t['piezas']]
+    assert sorted(ids) == sorted(_estados(proyecto_optimizado))
+
+    respuesta = cliente_operador.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert respuesta.status_code == 304
+    assert respuesta['ETag'] == etag
+
+
+def test_detalle_cambia_de_etag_al_cambiar_una_pieza(cliente_operador, proyecto_optimizado):
+    url = reverse('api_operador_proyecto_detalle', args=[proyecto_optimizado.id])
+    etag = cliente_operador.get(url)['ETag']
+    _patch_piezas(cliente_operador, proyecto_optimizado, [{'pieza_id': 'm1t1p2', 'estado': 'cortada'}])
+
+    respuesta = cliente_operador.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert respuesta.status_code == 200
+    assert respuesta['ETag'] != etag
+    piezas = respuesta.json()['materiales'][0]['tableros'][0]['piezas']
+    assert [p['estado'] for p in piezas if p['pieza_id'] == 'm1t1p2'] == ['cortada']
+    assert cliente_operador.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code == 304
+
+
+def test_detalle_cambia_de_etag_al_cambiar_el_proyecto(cliente_operador, proyecto_optimizado):
+    url = reverse('api_operador_proyecto_detalle', args=[proyecto_optimizado.id])
+    etag = cliente_operador.get(url)['ETag']
+    proyecto_optimizado.nombre = 'Cocina y baño'
+    proyecto_optimizado.save(update_fields=['nombre'])
+
+    respuesta = cliente_operador.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert respuesta.status_code == 200
+    assert respuesta.json()['proyecto']['nombre'] == 'Cocina y baño'
@@ -0,0 +1,163 @@
+"""Motor de optimización (`optimizer`): layouts válidos y propiedades de cada modo."""
+import itertools
+import random
+import time
+
+import pytest
+
+from optimizer import OptimizationEngine, optimizar_portafolio, tableros_minimo
+from optimizer.portfolio import ESPERA_RESPALDO
+
+ANCHO, LARGO = 2440, 1830
+
+
+def lista_corte(semilla, tipos=15, cantidad_max=10):
+    rnd = random.Random(semilla)
+    return [
+        {'nombre': f'P{i}', 'ancho': rnd.randint(80, 1200), 'largo': rnd.randint(80, 900),
+         'cantidad': rnd.randint(1, cantidad_max), 'veta_libre': rnd.random() < 0.5,
+         'tapacantos': {'arriba': rnd.random() < 0.3}}
+        for i in range(tipos)
+    ]
+
+
+def validar_layout(resultado, piezas, kerf, margen=0):
+    """Piezas dentro del área útil, sin solaparse (kerf incluido) y todas contadas."""
+    colocadas = 0
+    for tablero in resultado['tableros']:
+        for p in tablero['piezas']:
+            x, y = p['x'] - margen, p['y'] - margen
+            assert x >= 0 and y >= 0
+            assert x + p['ancho'] <= ANCHO - 2 * margen + 1e-9
+            assert y + p['largo'] <= LARGO - 2 * margen + 1e-9
+        for a, b in itertools.combinations(tablero['piezas'], 2):
+            solapan_x = not (a['x'] + a['ancho'] + kerf <= b['x'] or b['x'] + b['ancho'] + kerf <= a['x'])
+            solapan_y = not (a['y'] + a['largo'] + kerf <= b['y'] or b['y'] + b['largo'] + kerf <= a['y'])
+            assert not (solapan_x and solapan_y), (a, b)
+        colocadas += len(tablero['piezas'])
+    assert colocadas + resultado['piezas_no_colocadas'] == sum(p['cantidad'] for p in piezas)
+
+
+@pytest.mark.parametrize('semilla', [1, 2, 3])
+def test_anytime_devuelve_layout_completo_dentro_del_plazo(semilla):
+    piezas = lista_corte(semilla, tipos=25)
+    engine = OptimizationEngine(ANCHO, LARGO, 10, 10, 3)
+    resultado = engine.optimizar_piezas(piezas, tiempo_limite=0.5)
+
+    validar_layout(resultado, piezas, 3, margen=10)
+    assert resultado['piezas_no_colocadas'] == 0
+    resumen = resultado['anytime']
+    assert resumen['tableros_finales'] == resultado['total_tableros']
+    assert resumen['tableros_finales'] <= resumen['tableros_iniciales']
+    assert resumen['tableros_ahorrados'] == resumen['tableros_iniciales'] - resumen['tableros_finales']
+    assert resultado['tiempo_optimizacion'] < 0.5 + 2
+
+
+def test_anytime_sin_plazo_es_la_pasada_voraz():
+    piezas = lista_corte(4)
+    resultado = OptimizationEngine(ANCHO, LARGO, 0, 0, 3).optimizar_piezas(piezas)
+    assert 'anytime' not in resultado
+    validar_layout(resultado, piezas, 3)
+
+
+def test_cantidades_grandes_se_expanden_solo_en_la_salida():
+    piezas = [
+        {'nombre': 'Repisa', 'ancho': 560, 'largo': 300, 'cantidad': 400},
+        {'nombre': 'Lateral', 'ancho': 720, 'largo': 560, 'cantidad': 60, 'veta_libre': True},
+    ]
+    resultado = OptimizationEngine(ANCHO, LARGO, 0, 0, 3).optimizar_piezas(piezas)
+
+    validar_layout(resultado, piezas, 3)
+    assert resultado['piezas_no_colocadas'] == 0
+    ids = [p['id_unico'] for t in resultado['tableros'] for p in t['piezas']]
+    assert len(ids) == len(set(ids)) == 460
+    assert sum(1 for t in resultado['tableros'] for p in t['piezas'] if p['nombre'] == 'Repisa') == 400
+
+
+def _motor():
+    return OptimizationEngine(ANCHO, LARGO, 10, 10, 3)
+
+
+def test_reoptimizar_sin_cambios_conserva_el_layout():
+    piezas = lista_corte(5)
+    previo = _motor().optimizar_piezas(piezas)
+    resultado = _motor().reoptimizar(previo, piezas)
+
+    validar_layout(resultado, piezas, 3, margen=10)
+    assert resultado['total_tableros'] == previo['total_tableros']
+    assert resultado['incremental']['tableros_conservados'] == previo['total_tableros']
+    assert [[(p['x'], p['y']) for p in t['piezas']] for t in resultado['tableros']] == \
+           [[(p['x'], p['y']) for p in t['piezas']] for t in previo['tableros']]
+
+
+@pytest.mark.parametrize('semilla', [6, 7, 8])
+def test_reoptimizar_con_piezas_agregadas_y_quitadas(semilla):
+    piezas = lista_corte(semilla)
+    previo = _motor().optimizar_piezas(piezas)
+    nuevas = [dict(p) for p in piezas]
+    nuevas[0]['cantidad'] += 3
+    nuevas[1]['cantidad'] = max(1, nuevas[1]['cantidad'] - 2)
+    nuevas.append({'nombre': 'Nueva', 'ancho': 400, 'largo': 300, 'cantidad': 5})
+    resultado = _motor().reoptimizar(previo, nuevas)
+
+    validar_layout(resultado, nuevas, 3, margen=10)
+    assert resultado['piezas_no_colocadas'] == 0
+    assert resultado['incremental']['piezas_agregadas'] == 8
+    assert resultado['incremental']['piezas_quitadas'] == piezas[1]['cantidad'] - nuevas[1]['cantidad']
+    assert resultado['tableros_minimo_teorico'] <= resultado['total_tableros']
+
+
+def test_reoptimizar_rechaza_otra_configuracion():
+    piezas = lista_corte(9)
+    previo = _motor().optimizar_piezas(piezas)
+    with pytest.raises(ValueError):
+        OptimizationEngine(ANCHO, LARGO, 10, 10, 4).reoptimizar(previo, piezas)
+
+
+@pytest.mark.parametrize('piezas, kerf, esperado', [
+    ([], 0, 0),
+    ([{'ancho': 1220, 'largo': 915, 'cantidad': 4}], 0, 1),
+    ([{'ancho': 1220, 'largo': 915, 'cantidad': 5}], 0, 2),
+    # Con kerf cada cuarto de tablero ya ocupa más de la mitad en ambos sentidos
+    ([{'ancho': 1220, 'largo': 915, 'cantidad': 4}], 3, 4),
+    ([{'ancho': 1300, 'largo': 1000, 'cantidad': 3}], 0, 3),
+    # Piezas que no caben en ningún tablero no cuentan
+    ([{'ancho': 3000, 'largo': 100, 'cantidad': 2}], 0, 0),
+])
+def test_tableros_minimo_casos_conocidos(piezas, kerf, esperado):
+    assert tableros_minimo(piezas, ANCHO, LARGO, kerf) == esperado
+
+
+@pytest.mark.parametrize('configuracion', [
+    {}, {'estrategia': 'maxrects'}, {'estrategia': 'maxrects', 'heuristica': 'baf'}, {'estrategia': 'guillotina'},
+])
+def test_tableros_minimo_nunca_supera_los_tableros_del_motor(configuracion):
+    for semilla in range(6):
+        kerf = [0, 3, 4.5][semilla % 3]
+        for piezas in (lista_corte(semilla), lista_corte(semilla + 100, tipos=6, cantidad_max=4)):
+            resultado = OptimizationEngine(ANCHO, LARGO, 0, 0, kerf, **configuracion).optimizar_piezas(piezas)
+            validar_layout(resultado, piezas, kerf)
+            cota = tableros_minimo(piezas, ANCHO, LARGO, kerf)
+            assert cota == resultado['tableros_minimo_teorico']
+            assert 1 <= cota <= resultado['total_tableros']
+
+
+def test_portafolio_respeta_el_presupuesto():
+    piezas = [{'nombre': f'P{i}', 'ancho': 50 + i % 37, 'largo': 60 + i % 23, 'cantidad': 1} for i in range(2500)]
+    inicio = time.time()
+    resultado = optimizar_portafolio(ANCHO, LARGO, 0, 0, 3, piezas, presupuesto_segundos=1)
+
+    assert time.time() - inicio < 1 + ESPERA_RESPALDO + 1
+    validar_layout(resultado, piezas, 3)
+    if resultado['piezas_no_colocadas']:
+        assert resultado['plazo_vencido'] is True
+
+
+def test_portafolio_con_tiempo_entrega_layout_completo():
+    piezas = lista_corte(10)
+    resultado = optimizar_portafolio(ANCHO, LARGO, 0, 0, 3, piezas, presupuesto_segundos=10, reinicios=1)
+
+    validar_layout(resultado, piezas, 3)
+    assert resultado['piezas_no_colocadas'] == 0
+    assert 'plazo_vencido' not in resultado
+    assert resultado['portafolio']['evaluados'] >= 1
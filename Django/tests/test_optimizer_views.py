@@ -0,0 +1,54 @@
+"""Vistas del optimizador (`WowDash.optimizer_views`): configuración persistida y reconstrucción."""
+import json
+
+from django.urls import reverse
+
+from core import optimizer_cache
+from optimizer import PARAMETROS_CONFIGURACION, OptimizationEngine
+
+
+def test_configuracion_guardada_conserva_todos_los_parametros_del_motor(cliente_operador, proyecto_vacio, material):
+    conf_mat = {
+        'material_id': material.id, 'margen_x': 10, 'margen_y': 10, 'desperdicio_sierra': 3,
+        'estrategia': 'bottom_left', 'orden': 'aleatorio', 'semilla': 7, 'vectorizado': True, 'reinicios': 2,
+    }
+    piezas = [{'nombre': 'Lateral', 'ancho': 560, 'largo': 720, 'cantidad': 6, 'veta_libre': False, 'tapacantos': {}}]
+    respuesta = cliente_operador.post(reverse('optimizar_material'), content_type='application/json', data=json.dumps({
+        'proyecto_id': proyecto_vacio.id, 'material_index': 1, 'configuracion_material': conf_mat, 'piezas': piezas,
+    }))
+    assert respuesta.json()['success'] is True
+
+    proyecto_vacio.refresh_from_db()
+    guardada = json.loads(proyecto_vacio.configuracion)['materiales'][0]['configuracion_material']
+    for clave in PARAMETROS_CONFIGURACION:
+        assert guardada[clave] == conf_mat.get(clave), clave
+
+    def clave_cache(conf):
+        return optimizer_cache.clave_resultado(OptimizationEngine.VERSION, 1830, 2500, 10, 10, 3, piezas, conf)
+    assert clave_cache(guardada) == clave_cache(conf_mat)
+
+
+def test_forzar_optimizacion_reconstruye_desde_la_configuracion(cliente_operador, proyecto_vacio, material):
+    conf_mat = {'material_id': material.id, 'margen_x': 10, 'margen_y': 10, 'desperdicio_sierra': 3,
+                'orden': 'aleatorio', 'semilla': 3}
+    piezas = [{'nombre': 'Puerta', 'ancho': 400, 'largo': 700, 'cantidad': 5}]
+    proyecto_vacio.configuracion = json.dumps({'materiales': [{'configuracion_material': conf_mat, 'piezas': piezas}]})
+    proyecto_vacio.save()
+
+    url = reverse('forzar_optimizacion', args=[proyecto_vacio.id])
+    respuesta = cliente_operador.post(url)
+    assert respuesta.status_code == 200
+    assert respuesta.json()['resumen']['piezas'] == 5
+    proyecto_vacio.refresh_from_db()
+    assert proyecto_vacio.estado == 'optimizado'
+    assert proyecto_vacio.piezas_colocadas.count() == 5
+    # Con resultado guardado no se recalcula
+    assert 'ya cuenta' in cliente_operador.post(url).json()['message']
+
+
+def test_forzar_optimizacion_sin_configuracion_suficiente(cliente_operador, proyecto_vacio):
+    url = reverse('forzar_optimizacion', args=[proyecto_vacio.id])
+    assert cliente_operador.post(url).status_code == 400
+    proyecto_vacio.configuracion = json.dumps({'materiales': [{'configuracion_material': {}, 'piezas': []}]})
+    proyecto_vacio.save()
+    assert cliente_operador.post(url).status_code == 400
@@ -0,0 +1,54 @@
+"""Copia relacional del resultado (`core.resultados`)."""
+import json
+
+from django.urls import reverse
+
+from core.models import PiezaColocada
+from core.resultados import actualizar_estados, construir_vista_operador, resultado_compatible, sincronizar_resultado
+
+
+def test_resultado_compatible_conserva_tipos_y_numeracion(proyecto_optimizado):
+    piezas = [
+        'no es una pieza',
+        {'nombre': 'A', 'id_unico': 'A_1', 'x': 10, 'y': 10, 'ancho': 560, 'largo': 720.5, 'rotada': False},
+        {'nombre': 'B', 'id_unico': 'B_1', 'x': 573, 'y': 10, 'ancho': 300, 'largo': 400, 'rotada': True,
+         'estado': 'cortada'},
+    ]
+    resultado = {'materiales': [{'material': {'nombre': 'MDF'}, 'tableros': [{'id': 1, 'piezas': piezas}]}]}
+    proyecto_optimizado.resultado_optimizacion = json.dumps(resultado)
+    proyecto_optimizado.save()
+    sincronizar_resultado(proyecto_optimizado, resultado)
+
+    salida = resultado_compatible(proyecto_optimizado)['materiales'][0]['tableros'][0]['piezas']
+    for original, pieza in zip(piezas[1:], salida):
+        for clave, valor in original.items():
+            if clave != 'estado':
+                assert pieza[clave] == valor and type(pieza[clave]) is type(valor), clave
+    assert [p['estado'] for p in salida] == ['pendiente', 'cortada']
+    vista = construir_vista_operador(resultado)[0]['tableros'][0]['piezas']
+    assert [(p['pieza_id'], p['nombre']) for p in vista] == [('m1t1p1', 'A'), ('m1t1p2', 'B')]
+
+
+def _optimizar(client, proyecto, material, material_index, piezas):
+    payload = {
+        'proyecto_id': proyecto.id, 'material_index': material_index, 'piezas': piezas,
+        'configuracion_material': {'material_id': material.id, 'margen_x': 10, 'margen_y': 10, 'desperdicio_sierra': 3},
+    }
+    respuesta = client.post(reverse('optimizar_material'), data=json.dumps(payload), content_type='application/json')
+    assert respuesta.json()['success'] is True
+    return respuesta
+
+
+def test_reoptimizar_un_material_conserva_los_estados_de_los_otros(cliente_operador, proyecto_vacio, material):
+    proyecto = proyecto_vacio
+    _optimizar(cliente_operador, proyecto, material, 1, [{'nombre': 'Lateral', 'ancho': 560, 'largo': 720, 'cantidad': 6}])
+    _optimizar(cliente_operador, proyecto, material, 2, [{'nombre': 'Puerta', 'ancho': 400, 'largo': 700, 'cantidad': 4}])
+    assert actualizar_estados(proyecto, {'m1t1p1': 'cortada', 'm2t1p1': 'cortada'})[0] == 2
+
+    _optimizar(cliente_operador, proyecto, material, 2, [{'nombre': 'Puerta', 'ancho': 450, 'largo': 700, 'cantidad': 5}])
+
+    estados = dict(((m, t, p), e) for m, t, p, e in PiezaColocada.objects.filter(proyecto=proyecto)
+                   .values_list('material_num', 'tablero_num', 'numero', 'estado'))
+    assert estados[(1, 1, 1)] == 'cortada'
+    assert {e for (m, _, _), e in estados.items() if m == 2} == {'pendiente'}
+    assert sum(1 for (m, _, _) in estados if m == 2) == 5